@@ -0,0 +1,241 @@
+#!/usr/bin/env python2.7
+from __future__ import print_function
+import argparse
+import glob
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+import heldkarp
+import heuristic
+import prunning
+import tsp
+import tsplib
+
+# Published optimum of each bundled instance (TSPLIB). Not bays29: the bundled file has no EDGE_WEIGHT_SECTION,
+# so it is loaded with the EUC_2D distances of its display coordinates, and 2020 is not its optimum.
+KNOWN_OPTIMA = {
+    "att48": 10628,
+    "berlin52": 7542,
+    "bier127": 118282,
+    "dantzig42": 699,
+    "eil51": 426,
+    "eil76": 538,
+    "lin105": 14379,
+    "lin318": 42029,
+    "ulysses16": 6859,
+    "ulysses22": 7013,
+    "usa13509": 19982859,
+}
+
+ALL_ALGORITHMS = sorted(tsp.ALGORITHMS) + [tsp.HEURISTIC_ALGORITHM, tsp.DYNAMIC_PROGRAMMING_ALGORITHM]
+
+# Largest instance whose full cost matrix is built (the heuristic needs none)
+MAX_MATRIX_VERTICES = 1000
+
+# Runs faster than this are too noisy to be compared by the regression mode
+MIN_COMPARED_SECONDS = 0.1
+
+
+def runAlgorithm(algorithm, filepath, budget, warmStart, workDirectory):
+    # Runs in the child process: solves the instance and returns the result (without the time and memory)
+    prunning.TIME_TO_RUN_ALGORITHM_IN_SECONDS = budget
+    prunning.REPORT_MODE = "final"
+    prunning.REPORT_IMAGES = False
+    prunning.STATISTICS_FILE = None
+
+    outputFile = os.path.join(workDirectory, "output.txt")
+    statisticsFile = os.path.join(workDirectory, "statistics.jsonl")
+
+    timedOut = False
+    context = None
+    try:
+        if algorithm == tsp.HEURISTIC_ALGORITHM:
+            context = heuristic.initHeuristicSolver(tsplib.readInstance(filepath), outputFile)
+        else:
+            instance, costMatrix = tsplib.readCachedInstance(filepath)
+            if algorithm == tsp.DYNAMIC_PROGRAMMING_ALGORITHM:
+                context = heldkarp.initHeldKarpSolver(instance['cities'], costMatrix, outputFile)
+            else:
+                lowerBoundFunction = tsp.ALGORITHMS[algorithm][0]
+                initialPath = heuristic.warmStartTour(costMatrix) if warmStart else None
+                prunning.STATISTICS_FILE = statisticsFile
+                prunning.STATISTICS_INTERVAL_IN_SECONDS = float("inf")
+                context = prunning.initBruteForceWithPrunning(instance['cities'], costMatrix, lowerBoundFunction, outputFile,
+                                                              "depth-first", initialPath)
+    except SystemExit:
+        timedOut = True
+
+    # The brute force returns at the time limit (see prunning.initBruteForceWithPrunning), and so does the heuristic
+    if context is not None and context.stop_reason is not None:
+        timedOut = True
+
+    nodesExpanded = None
+    if prunning.STATISTICS_FILE is not None and os.path.isfile(statisticsFile):
+        lines = open(statisticsFile).read().splitlines()
+        if lines:
+            nodesExpanded = sum(json.loads(lines[-1])["nodes_expanded_at_depth"])
+
+    cost = None
+    if context is not None and context.min_cost_so_far != float("inf"):
+        cost = context.min_cost_so_far
+    return {"cost": cost, "timed_out": timedOut, "nodes_expanded": nodesExpanded}
+
+
+def benchmarkRun(algorithm, filepath, budget, warmStart):
+    # Runs the algorithm in a child process, so its peak RSS is its own (from os.wait4)
+    workDirectory = tempfile.mkdtemp(prefix="benchmark")
+    readEnd, writeEnd = os.pipe()
+    startTime = time.time()
+
+    pid = os.fork()
+    if pid == 0:
+        os.close(readEnd)
+        # A run that does not stop at its time limit is killed
+        signal.alarm(int(2 * budget) + 60)
+        exitCode = 1
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, 1)
+            os.dup2(devnull, 2)
+            result = runAlgorithm(algorithm, filepath, budget, warmStart, workDirectory)
+            os.write(writeEnd, json.dumps(result))
+            exitCode = 0
+        finally:
+            os._exit(exitCode)
+
+    os.close(writeEnd)
+    chunks = []
+    while True:
+        chunk = os.read(readEnd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(readEnd)
+    _, status, usage = os.wait4(pid, 0)
+    wallTime = time.time() - startTime
+    shutil.rmtree(workDirectory, ignore_errors=True)
+
+    if chunks:
+        result = json.loads("".join(chunks))
+    else:
+        result = {"cost": None, "timed_out": True, "nodes_expanded": None, "failed": True}
+
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    optimum = KNOWN_OPTIMA.get(name)
+    gap = None
+    if optimum is not None and result["cost"] is not None:
+        gap = (result["cost"] - optimum) / float(optimum)
+
+    result.update({
+        "instance": name,
+        "algorithm": algorithm,
+        "wall_time": wallTime,
+        "peak_rss_kb": usage.ru_maxrss,
+        "optimum": optimum,
+        "gap": gap,
+        "exit_status": status,
+    })
+    return result
+
+
+def formatTable(results):
+    header = ("instance", "alg", "time (s)", "nodes", "cost", "gap (%)", "RSS (MB)", "status")
+    rows = []
+    for result in results:
+        if result.get("failed"):
+            status = "failed"
+        elif result["timed_out"]:
+            status = "timeout"
+        else:
+            status = "done"
+        rows.append((result["instance"],
+                     str(result["algorithm"]),
+                     "%.2f" % result["wall_time"],
+                     "-" if result["nodes_expanded"] is None else str(result["nodes_expanded"]),
+                     "-" if result["cost"] is None else str(result["cost"]),
+                     "-" if result["gap"] is None else "%.2f" % (100.0 * result["gap"]),
+                     "%.1f" % (result["peak_rss_kb"] / 1024.0),
+                     status))
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    lines = ["  ".join(cell.ljust(widths[i]) for i, cell in enumerate(row)) for row in [header] + rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def findRegressions(results, baseline, maxSlowdown):
+    # The runs that finished in both, and are slower than maxSlowdown times the baseline or end with another cost
+    baselineRuns = dict(((run["instance"], run["algorithm"]), run) for run in baseline["runs"])
+    regressions = []
+    for result in results:
+        before = baselineRuns.get((result["instance"], result["algorithm"]))
+        if before is None or before["timed_out"] or result["timed_out"]:
+            continue
+        if result["algorithm"] != tsp.HEURISTIC_ALGORITHM and result["cost"] != before["cost"]:
+            regressions.append("%s/%d: cost %s, was %s" % (result["instance"], result["algorithm"], result["cost"], before["cost"]))
+        if before["wall_time"] >= MIN_COMPARED_SECONDS and result["wall_time"] > maxSlowdown * before["wall_time"]:
+            regressions.append("%s/%d: %.2fs, was %.2fs (%.2fx)" % (result["instance"], result["algorithm"], result["wall_time"],
+                                                                 before["wall_time"], result["wall_time"] / before["wall_time"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the algorithms of tsp.py over the instances and compares them")
+    parser.add_argument("instances", nargs="*", default=sorted(glob.glob("instancias/*.tsp")),
+                        help="the .tsp files (default: instancias/*.tsp)")
+    parser.add_argument("--algorithms", default=",".join(str(algorithm) for algorithm in ALL_ALGORITHMS),
+                        help="comma-separated algorithm numbers of tsp.py (default: %(default)s)")
+    parser.add_argument("--time-budget", type=float, default=60.0,
+                        help="seconds each algorithm runs on each instance (default: %(default)s)")
+    parser.add_argument("--no-warm-start", action="store_true",
+                        help="do not start the brute force with the tour of the 2-opt/Or-opt heuristic")
+    parser.add_argument("--output", default="benchmark.json",
+                        help="machine-readable results file (default: %(default)s)")
+    parser.add_argument("--baseline",
+                        help="results file of a previous run: exits with status 1 if any run regressed against it")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="wall time ratio to the baseline that counts as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    algorithms = [int(algorithm) for algorithm in args.algorithms.split(",")]
+    for algorithm in algorithms:
+        if algorithm not in ALL_ALGORITHMS:
+            parser.error("unknown algorithm %d" % algorithm)
+
+    results = []
+    for filepath in args.instances:
+        dimension = tsplib.readInstance(filepath)['dimension']
+        for algorithm in algorithms:
+            if algorithm == tsp.DYNAMIC_PROGRAMMING_ALGORITHM and dimension > heldkarp.MAX_VERTICES:
+                continue
+            if algorithm != tsp.HEURISTIC_ALGORITHM and dimension > MAX_MATRIX_VERTICES:
+                continue
+            result = benchmarkRun(algorithm, filepath, args.time_budget, not args.no_warm_start)
+            results.append(result)
+            print("%s %d: %.2fs" % (result["instance"], algorithm, result["wall_time"]), file=sys.stderr)
+
+    print(formatTable(results))
+
+    output = {
+        "time_budget": args.time_budget,
+        "warm_start": not args.no_warm_start,
+        "runs": results,
+    }
+    outputFile = open(args.output, "w")
+    json.dump(output, outputFile, indent=2)
+    outputFile.close()
+
+    if args.baseline:
+        regressions = findRegressions(results, json.load(open(args.baseline)), args.max_slowdown)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
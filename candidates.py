@@ -0,0 +1,299 @@
+import math
+
+import numpy
+
+import tsplib
+
+'''
+=============================================================================
+CANDIDATE LISTS OF LARGE INSTANCES
+=============================================================================
+The sparse graph used by the heuristic on the instances whose cost matrix does not fit in memory:
+each vertex keeps a short list of candidate neighbours, and the weights of the edges are computed
+on demand from the coordinates (see tsplib.distanceFunction), so the memory is linear in the number
+of vertices.
+
+The candidates of a vertex are its NUM_NEAREST_NEIGHBOURS nearest vertices, and the
+NUM_QUADRANT_NEIGHBOURS nearest vertices in each of the four quadrants around it, which
+connect the vertices at the border of a cluster to the other clusters.
+
+They are found with a grid over the coordinates, of about CITIES_PER_CELL cities per cell: the
+cells of a growing square around the vertex are searched until no city outside the square can be
+closer than the candidates found. The distances of every planar EDGE_WEIGHT_TYPE of TSPLIB are
+rounded from a norm of the difference of the coordinates (euclidean, manhattan or maximum),
+and no city outside the square is closer than the border of the square in any of those norms.
+So the nearest neighbours are exact, without computing the n x n distances.
+'''
+
+'''
+CONSTANTS
+	NUM_NEAREST_NEIGHBOURS
+	NUM_QUADRANT_NEIGHBOURS
+DESCRIPTION:
+	The number of nearest vertices of each vertex, and of nearest vertices in each quadrant, in its candidates
+'''
+NUM_NEAREST_NEIGHBOURS = 10
+NUM_QUADRANT_NEIGHBOURS = 2
+
+'''
+CONSTANT
+	CITIES_PER_CELL
+DESCRIPTION:
+	The average number of cities in a cell of the grid
+'''
+CITIES_PER_CELL = 2.0
+
+'''
+CONSTANT
+	NORM_OF_EDGE_WEIGHT_TYPE
+DESCRIPTION:
+	The norm (the ord of numpy.linalg.norm) whose rounding gives the distance of each planar EDGE_WEIGHT_TYPE
+'''
+NORM_OF_EDGE_WEIGHT_TYPE = {
+	'EUC_2D': 2,
+	'CEIL_2D': 2,
+	'ATT': 2,
+	'MAN_2D': 1,
+	'MAX_2D': numpy.inf,
+}
+
+'''
+FUNCTION
+	isPlanar
+DESCRIPTION:
+	True if the candidate lists of the instance can be found with the grid: its distances are a
+	rounded norm of the difference of its coordinates (not EXPLICIT nor GEO)
+PARAMETERS:
+	instance
+		The instance read by tsplib.readInstance
+RETURNS
+	a boolean
+'''
+def isPlanar(instance):
+	return instance['explicitWeights'] is None and instance['edgeWeightType'] in NORM_OF_EDGE_WEIGHT_TYPE
+
+'''
+FUNCTION
+	candidateLists
+DESCRIPTION:
+	The candidate neighbours of every vertex of a planar instance (see isPlanar), closest first
+	(the order of the distances of the instance, ties broken by the vertex)
+PARAMETERS:
+	instance
+		The instance read by tsplib.readInstance, with at least 2 vertices
+	num_nearest_neighbours
+		The number of nearest vertices of each vertex
+	num_quadrant_neighbours
+		The number of nearest vertices of each vertex in each quadrant
+RETURNS
+	a list of lists
+		neighbours[v] is the list of the candidate neighbours of v, which starts with its
+		min(num_nearest_neighbours, number of vertices - 1) nearest vertices
+'''
+def candidateLists(instance, num_nearest_neighbours=NUM_NEAREST_NEIGHBOURS, num_quadrant_neighbours=NUM_QUADRANT_NEIGHBOURS):
+
+	coordinates = tsplib.coordinatesArray(instance['cities'])
+	num_vertices = len(coordinates)
+	num_nearest_neighbours = min(num_nearest_neighbours, num_vertices - 1)
+	norm = NORM_OF_EDGE_WEIGHT_TYPE[instance['edgeWeightType']]
+	kernel = tsplib.DISTANCE_KERNELS[instance['edgeWeightType']]
+
+	grid = buildGrid(coordinates)
+
+	neighbours = []
+	for vertex in xrange(num_vertices):
+		candidates = nearestInGrid(grid, coordinates, vertex, norm, num_nearest_neighbours, num_quadrant_neighbours)
+		weights = kernel(coordinates[vertex:vertex + 1], coordinates[candidates])[0]
+		order = numpy.lexsort((candidates, weights))
+		neighbours.append(candidates[order].tolist())
+	# END FOR
+
+	return neighbours
+
+'''
+FUNCTION
+	buildGrid
+DESCRIPTION:
+	Sorts the cities by the cell of the grid that contains them. The cells are numbered row by row,
+	so the cities of consecutive cells of a row are consecutive in that order.
+PARAMETERS:
+	coordinates
+		The coordinates of the cities (see tsplib.coordinatesArray)
+RETURNS
+	a tuple
+		(origin, the numpy array [x, y] of the corner of the first cell (the lowest coordinates of the cities),
+		far_corner, the numpy array [x, y] of the highest coordinates of the cities,
+		cell_size, the length of the side of a cell,
+		num_columns,
+		num_rows,
+		cell_of, cell_of[v] is the tuple (column, row) of the cell of the city v,
+		order, the cities sorted by cell,
+		cell_start, the cities of the cell c are order[cell_start[c]:cell_start[c + 1]])
+'''
+def buildGrid(coordinates):
+
+	num_vertices = len(coordinates)
+	origin = coordinates.min(axis=0)
+	far_corner = coordinates.max(axis=0)
+	extent = far_corner - origin
+	area = max(extent[0], 1e-9) * max(extent[1], 1e-9)
+
+	# About CITIES_PER_CELL cities in each cell, but at most num_vertices / CITIES_PER_CELL cells along the longest
+	# side, so that a degenerate extent (cities on a line) does not make O(num_vertices^2) cells
+	cell_size = max(math.sqrt(area * CITIES_PER_CELL / num_vertices), extent.max() * CITIES_PER_CELL / num_vertices, 1e-9)
+
+	num_columns = int(extent[0] / cell_size) + 1
+	num_rows = int(extent[1] / cell_size) + 1
+	columns = numpy.minimum(((coordinates[:, 0] - origin[0]) / cell_size).astype(numpy.int64), num_columns - 1)
+	rows = numpy.minimum(((coordinates[:, 1] - origin[1]) / cell_size).astype(numpy.int64), num_rows - 1)
+
+	cells = rows * num_columns + columns
+	order = numpy.argsort(cells, kind='mergesort')
+	cell_start = numpy.searchsorted(cells[order], numpy.arange(num_columns * num_rows + 1)).tolist()
+	cell_of = zip(columns.tolist(), rows.tolist())
+
+	return origin, far_corner, cell_size, num_columns, num_rows, cell_of, order, cell_start
+
+'''
+FUNCTION
+	nearestInGrid
+DESCRIPTION:
+	The nearest vertices of a vertex, and its nearest vertices in each quadrant, in the given norm.
+	Searches the cells at most radius cells away from the cell of the vertex (a square), doubling the radius
+	until the square holds all of them, which is the case when the distance from the vertex to the border of the
+	square is not smaller than the farthest of them (the sides of the square on the border of the grid do not count,
+	and for a quadrant only the two sides it faces). The quadrants are (dx > 0, dy >= 0), (dx <= 0, dy > 0),
+	(dx < 0, dy <= 0) and (dx >= 0, dy < 0), where (dx, dy) is the difference to the vertex: a city at the
+	same coordinates is in none of them.
+PARAMETERS:
+	grid
+		The grid of buildGrid
+	coordinates
+		The coordinates of the cities
+	vertex
+		The vertex
+	norm
+		The norm (see NORM_OF_EDGE_WEIGHT_TYPE)
+	num_nearest_neighbours
+		The number of nearest vertices
+	num_quadrant_neighbours
+		The number of nearest vertices in each quadrant
+RETURNS
+	a numpy array
+		The vertices found, without repetitions (in no particular order)
+'''
+def nearestInGrid(grid, coordinates, vertex, norm, num_nearest_neighbours, num_quadrant_neighbours):
+
+	origin, far_corner, cell_size, num_columns, num_rows, cell_of, order, cell_start = grid
+	column, row = cell_of[vertex]
+	x, y = coordinates[vertex]
+
+	radius = 1
+	while True:
+		first_column = max(column - radius, 0)
+		last_column = min(column + radius, num_columns - 1)
+		first_row = max(row - radius, 0)
+		last_row = min(row + radius, num_rows - 1)
+
+		# The cities of the square, one slice of order for each of its rows
+		slices = []
+		for square_row in xrange(first_row, last_row + 1):
+			first_cell = square_row * num_columns
+			slices.append(order[cell_start[first_cell + first_column]:cell_start[first_cell + last_column + 1]])
+		# END FOR
+		others = numpy.concatenate(slices)
+		others = others[others != vertex]
+
+		difference = coordinates[others] - coordinates[vertex]
+		norms = numpy.linalg.norm(difference, ord=norm, axis=1)
+		dx = difference[:, 0]
+		dy = difference[:, 1]
+		quadrants = [	(dx > 0) & (dy >= 0),
+						(dx <= 0) & (dy > 0),
+						(dx < 0) & (dy <= 0),
+						(dx >= 0) & (dy < 0)	]
+
+		# The distance from the vertex to each side of the square (left, right, bottom, top), infinite if
+		# the side is on the border of the grid. A city outside the square is beyond one of the other sides,
+		# so it is farther than that side in any of the norms.
+		left = x - (origin[0] + first_column * cell_size) if first_column > 0 else numpy.inf
+		right = origin[0] + (last_column + 1) * cell_size - x if last_column < num_columns - 1 else numpy.inf
+		bottom = y - (origin[1] + first_row * cell_size) if first_row > 0 else numpy.inf
+		top = origin[1] + (last_row + 1) * cell_size - y if last_row < num_rows - 1 else numpy.inf
+		border = min(left, right, bottom, top)
+
+		# A city of a quadrant outside the square is beyond one of the two sides the quadrant faces, and
+		# there is none if no city is strictly beyond the vertex in the direction of the quadrant (on a line
+		# of cities, two of the quadrants of every vertex are empty)
+		quadrant_borders = [	numpy.inf if x >= far_corner[0] else min(right, top),
+								numpy.inf if y >= far_corner[1] else min(left, top),
+								numpy.inf if x <= origin[0] else min(left, bottom),
+								numpy.inf if y <= origin[1] else min(right, bottom)	]
+
+		found = []
+		complete = True
+
+		nearest = nearestIndices(norms, num_nearest_neighbours)
+		if len(nearest) < num_nearest_neighbours or norms[nearest].max() > border:
+			complete = False
+		found.append(nearest)
+
+		for in_quadrant, quadrant_border in zip(quadrants, quadrant_borders):
+			indices = numpy.flatnonzero(in_quadrant)
+			nearest = indices[nearestIndices(norms[indices], num_quadrant_neighbours)]
+			# A quadrant with too few cities in the square may have more outside of it
+			if (len(nearest) < num_quadrant_neighbours and quadrant_border != numpy.inf) or (len(nearest) > 0 and norms[nearest].max() > quadrant_border):
+				complete = False
+			found.append(nearest)
+		# END FOR
+
+		if complete:
+			return numpy.unique(others[numpy.concatenate(found)])
+
+		radius = 2 * radius
+	# END WHILE
+
+'''
+FUNCTION
+	nearestIndices
+DESCRIPTION:
+	The indices of the smallest values of an array
+PARAMETERS:
+	values
+		The numpy array
+	num_indices
+		The number of indices
+RETURNS
+	a numpy array
+		The indices of the min(num_indices, len(values)) smallest values (in no particular order)
+'''
+def nearestIndices(values, num_indices):
+
+	if len(values) <= num_indices:
+		return numpy.arange(len(values))
+	return numpy.argpartition(values, num_indices - 1)[:num_indices]
+
+'''
+FUNCTION
+	nearestNeighbourLowerBound
+DESCRIPTION:
+	A lower bound of the cost of any tour: each vertex has two edges in a tour, which cost at least as much
+	as the edges to its two nearest vertices, and each edge is counted by its two vertices, so
+		cost >= ceil(sum over the vertices v of (weight to the nearest vertex of v + weight to the second nearest) / 2)
+	Valid only with neighbour lists that start with the two nearest vertices of each vertex, such as the ones of candidateLists.
+PARAMETERS:
+	distance
+		A function (u, v) -> the weight of the edge (u, v)
+	neighbours
+		The neighbour lists, of at least 3 vertices
+RETURNS
+	a number
+		The lower bound
+'''
+def nearestNeighbourLowerBound(distance, neighbours):
+
+	total = 0
+	for vertex in xrange(len(neighbours)):
+		total = total + distance(vertex, neighbours[vertex][0]) + distance(vertex, neighbours[vertex][1])
+	# END FOR
+	return int(math.ceil(total / 2.0))
@@ -0,0 +1,229 @@
+import time
+
+import numpy
+
+import prunning
+
+'''
+=============================================================================
+HELD-KARP DYNAMIC PROGRAMMING
+=============================================================================
+The exact algorithm of Held and Karp, in O(N^2 2^N) time, for the instances small
+enough for its tables (see MAX_VERTICES). Not to be confused with prunning.heldKarpBound,
+the lower bound of the 1-trees, from the same authors.
+
+The permutations start at vertex zero. A subset S of the other vertices is a bitmask whose
+bit i - 1 is vertex i. For every S and every vertex v of S:
+	cost[S][v] = the cost of the cheapest path that starts at vertex zero, visits the vertices of S
+	             and ends at v
+	           = min over the vertices u of S - {v} of cost[S - {v}][u] + costMatrix[u][v]
+and the cost of the best permutation is the min over the vertices v of cost[all][v] + costMatrix[v][0].
+cost[S - {v}] is computed before cost[S], so the subsets are computed by cardinality, and all the subsets
+of the same cardinality at once, with numpy.
+
+The tables are numpy arrays indexed by [S, v - 1]: the costs as int32 and the vertex u of the minimum (the parent)
+as uint8, 5 bytes per entry, so 24 vertices take about 1GB.
+'''
+
+'''
+CONSTANT
+	MAX_VERTICES
+DESCRIPTION:
+	The largest number of vertices solved by the dynamic programming
+'''
+MAX_VERTICES = 24
+
+'''
+CONSTANT
+	BLOCK_ROWS
+DESCRIPTION:
+	The number of subsets computed at once, which bounds the memory of the temporary arrays
+'''
+BLOCK_ROWS = 1 << 16
+
+'''
+CONSTANT
+	INFINITE_COST
+DESCRIPTION:
+	The cost of the entries cost[S][v] where v is not in S
+'''
+INFINITE_COST = numpy.iinfo(numpy.int32).max
+
+'''
+FUNCTION
+	initHeldKarpSolver
+DESCRIPTION:
+	Solves the instance with heldKarpTour. The permutation is reported as the ones of the brute force
+	(see prunning.registerNewBestPermutation), so the report functions of prunning can be used in the end.
+	Stops (as the brute force) at the time limit of its SearchContext, writing the timeout to the
+	output file and ending the program (it has no permutation to return before the end).
+PARAMETERS:
+	cities
+		The list of cities [id, x, y]
+	costMatrix
+		The matrix of the weights of the edges, with at most MAX_VERTICES vertices
+	output_file
+		The path to the output file, or None to write nothing
+RETURNS
+	a prunning.SearchContext
+		The context with the best permutation (see prunning.prepareReport)
+'''
+def initHeldKarpSolver(cities, costMatrix, output_file):
+
+	print("Algorithm started...")
+	context = prunning.prepareReport(cities, len(costMatrix), output_file)
+
+	try:
+		cost, tour = heldKarpTour(costMatrix, context)
+	except prunning.SearchStopped:
+		prunning.finishReports(context)
+		if output_file is not None:
+			file_out = open(output_file,"a")
+			file_out.write(prunning.stopMessage(context))
+			file_out.close()
+		raise
+	prunning.registerNewBestPermutation(context, tour, cost)
+
+	time_elapsed_in_seconds = time.time() - context.start_time_in_seconds
+
+	prunning.finishReports(context)
+	if output_file is not None:
+		file_out = open(output_file,"a")
+		file_out.write("Search end in " + str(time_elapsed_in_seconds) + "s\n")
+		file_out.close()
+
+	return context
+
+'''
+FUNCTION
+	heldKarpTour
+DESCRIPTION:
+	The best permutation of a small instance, by the dynamic programming. Also the exact answer
+	the lower bounds of prunning are checked against.
+PARAMETERS:
+	costMatrix
+		The matrix of the weights of the edges (need not be symmetric), with at most MAX_VERTICES vertices
+	context
+		The prunning.SearchContext whose time limit stops the dynamic programming (see prunning.checkTimeLimit),
+		or None to never stop
+RETURNS
+	a tuple
+		(the cost of the best permutation, the best permutation, starting at vertex zero)
+'''
+def heldKarpTour(costMatrix, context=None):
+
+	num_vertices = len(costMatrix)
+	if num_vertices > MAX_VERTICES:
+		raise ValueError("Held-Karp is limited to " + str(MAX_VERTICES) + " vertices, the instance has " + str(num_vertices))
+	if num_vertices == 1:
+		return costMatrix[0][0], [0]
+
+	weights = numpy.array(costMatrix, dtype=numpy.int64)
+	if weights.max() * num_vertices >= INFINITE_COST:
+		raise ValueError("The cost of a permutation may not fit in the int32 tables of Held-Karp")
+
+	cost, parent = heldKarpTables(weights, context)
+
+	# The best last vertex, then the parents back to vertex zero
+	num_others = num_vertices - 1
+	subset = (1 << num_others) - 1
+	last_costs = cost[subset].astype(numpy.int64) + weights[1:, 0]
+	vertex = int(numpy.argmin(last_costs))
+	best_cost = int(last_costs[vertex])
+
+	tour = []
+	while subset != 0:
+		tour.append(vertex + 1)
+		previous_vertex = int(parent[subset, vertex])
+		subset = subset ^ (1 << vertex)
+		vertex = previous_vertex
+	# END WHILE
+	tour.append(0)
+	tour.reverse()
+
+	return best_cost, tour
+
+'''
+FUNCTION
+	heldKarpTables
+DESCRIPTION:
+	Fills the tables of the dynamic programming
+PARAMETERS:
+	weights
+		The cost matrix, as an int64 numpy array of at least 2 vertices
+	context
+		The same of heldKarpTour
+RETURNS
+	a tuple
+		(cost, parent): cost[S, v - 1] and parent[S, v - 1] + 1 as described in the header of this file
+'''
+def heldKarpTables(weights, context):
+
+	num_others = len(weights) - 1
+	num_subsets = 1 << num_others
+	others_weights = weights[1:, 1:]
+
+	cost = numpy.full((num_subsets, num_others), INFINITE_COST, dtype=numpy.int32)
+	parent = numpy.zeros((num_subsets, num_others), dtype=numpy.uint8)
+
+	# The paths with a single vertex v after vertex zero
+	for v in xrange(num_others):
+		cost[1 << v, v] = weights[0, v + 1]
+	# END FOR
+
+	for subsets in subsetsByCardinality(num_others)[2:]:
+		if context is not None:
+			prunning.checkTimeLimit(context)
+
+		for v in xrange(num_others):
+			bit = 1 << v
+			subsets_with_v = subsets[(subsets & bit) != 0]
+
+			for first in xrange(0, len(subsets_with_v), BLOCK_ROWS):
+				block = subsets_with_v[first:first + BLOCK_ROWS]
+				previous = block ^ bit
+
+				# The entries of the vertices not in S - {v} are infinite, so they are never the minimum
+				sums = cost[previous].astype(numpy.int64)
+				sums += others_weights[:, v]
+				best_previous = numpy.argmin(sums, axis=1)
+
+				cost[block, v] = sums[numpy.arange(len(block)), best_previous]
+				parent[block, v] = best_previous
+			# END FOR
+		# END FOR
+	# END FOR
+
+	return cost, parent
+
+'''
+FUNCTION
+	subsetsByCardinality
+DESCRIPTION:
+	The subsets of num_bits bits, grouped by their number of bits
+PARAMETERS:
+	num_bits
+		The number of bits
+RETURNS
+	a list
+		Its item k is the numpy array of the subsets with k bits
+'''
+def subsetsByCardinality(num_bits):
+
+	subsets = numpy.arange(1 << num_bits, dtype=numpy.int64)
+
+	cardinality = numpy.zeros(1 << num_bits, dtype=numpy.uint8)
+	for bit in xrange(num_bits):
+		cardinality += ((subsets >> bit) & 1).astype(numpy.uint8)
+	# END FOR
+
+	order = numpy.argsort(cardinality, kind='mergesort')
+	bounds = numpy.cumsum(numpy.bincount(cardinality, minlength=num_bits + 1))
+
+	groups = []
+	first = 0
+	for k in xrange(num_bits + 1):
+		groups.append(subsets[order[first:bounds[k]]])
+		first = bounds[k]
+	# END FOR
+	return groups
@@ -0,0 +1,831 @@
+import collections
+import time
+
+import numpy
+
+import candidates
+import prunning
+import tsplib
+import twolevellist
+
+'''
+=============================================================================
+HEURISTICS
+=============================================================================
+Tours built by construction heuristics (nearest neighbour and greedy edge) and
+improved by local search (2-opt and Or-opt), restricted to the nearest neighbours
+of each vertex.
+They are used as the first upper bound of the brute force with prunning, so it prunes
+from its first node instead of waiting for its first leaf.
+
+A tour is a list with every vertex once. position[v] is the index of the vertex v in the tour.
+The moves of the local search assume the cost matrix is symmetric: reversing a segment of the tour keeps its cost.
+On an asymmetric cost matrix (an ATSP instance), the tour is only built by nearest neighbour, which follows
+the direction of the edges, and is not improved.
+'''
+
+'''
+CONSTANT
+	NUM_NEIGHBOURS
+DESCRIPTION:
+	The number of nearest neighbours of each vertex considered by the greedy edge construction and by the local search
+'''
+NUM_NEIGHBOURS = 10
+
+'''
+CONSTANT
+	OR_OPT_MAX_SEGMENT
+DESCRIPTION:
+	The number of vertices of the longest segment moved by Or-opt
+'''
+OR_OPT_MAX_SEGMENT = 3
+
+'''
+FUNCTION
+	warmStartTour
+DESCRIPTION:
+	Builds a tour with nearest neighbour and another with greedy edge, improves both with 2-opt and
+	Or-opt, and returns the cheapest, starting at vertex zero.
+	On an asymmetric cost matrix, returns the nearest neighbour tour (see the header of this file).
+PARAMETERS:
+	costMatrix
+		The matrix of the weights of the edges, a list of lists or a numpy array
+	sorted_neighbours
+		The other vertices of each vertex, closest first, such as the sorted_neighbours of the
+		prunning.SearchContext of the matrix, or None to find the neighbours here
+RETURNS
+	a list
+		The tour
+'''
+def warmStartTour(costMatrix, sorted_neighbours=None):
+
+	num_vertices = len(costMatrix)
+	if num_vertices <= 3:
+		return range(num_vertices)
+
+	weights = numpy.array(costMatrix, dtype=numpy.float64)
+
+	# The local search reads one weight at a time, which is much faster from a list
+	if isinstance(costMatrix, numpy.ndarray):
+		costMatrix = costMatrix.tolist()
+
+	if not isSymmetric(weights):
+		return nearestNeighbourTour(costMatrix)
+
+	if sorted_neighbours is None:
+		neighbours = neighbourLists(weights, NUM_NEIGHBOURS)
+	else:
+		neighbours = numpy.asarray(sorted_neighbours)[:, :NUM_NEIGHBOURS].tolist()
+
+	best_tour = None
+	best_cost = None
+	distance = lambda u, v: costMatrix[u][v]
+	for tour in [nearestNeighbourTour(costMatrix), greedyEdgeTour(distance, neighbours)]:
+		localSearch(tour, costMatrix, neighbours)
+		cost = tourCost(tour, costMatrix)
+		if best_tour is None or cost < best_cost:
+			best_tour = tour
+			best_cost = cost
+	# END FOR
+
+	start = best_tour.index(0)
+	return best_tour[start:] + best_tour[:start]
+
+'''
+FUNCTION
+	isSymmetric
+DESCRIPTION:
+	Whether the weight of every edge is the same in both directions
+PARAMETERS:
+	weights
+		The matrix of the weights of the edges, as a numpy array
+RETURNS
+	a boolean
+'''
+def isSymmetric(weights):
+	return numpy.array_equal(weights, weights.T)
+
+'''
+FUNCTION
+	tourCost
+DESCRIPTION:
+	The total cost of a tour, including the edge from its last vertex back to its first one
+PARAMETERS:
+	tour
+		The tour
+	costMatrix
+		The matrix of the weights of the edges
+RETURNS
+	a number
+		The cost
+'''
+def tourCost(tour, costMatrix):
+	return sum([costMatrix[tour[i - 1]][tour[i]] for i in xrange(len(tour))])
+
+'''
+FUNCTION
+	neighbourLists
+DESCRIPTION:
+	The nearest neighbours of every vertex, closest first
+PARAMETERS:
+	costMatrix
+		The matrix of the weights of the edges
+	num_neighbours
+		The number of neighbours of each vertex (at most the number of vertices minus one)
+RETURNS
+	a list of lists
+		neighbours[v] is the list of the nearest neighbours of v
+'''
+def neighbourLists(costMatrix, num_neighbours):
+
+	return nearestInRows(numpy.array(costMatrix, dtype=numpy.float64), 0, num_neighbours)
+
+'''
+FUNCTION
+	neighbourListsFromBlocks
+DESCRIPTION:
+	The same of neighbourLists, for an instance whose cost matrix does not fit in memory:
+	the cost matrix is computed one block of rows at a time (see tsplib.iterateCostMatrixBlocks).
+PARAMETERS:
+	instance
+		The instance read by tsplib.readInstance
+	num_neighbours
+		The number of neighbours of each vertex (at most the number of vertices minus one)
+RETURNS
+	a list of lists
+		neighbours[v] is the list of the nearest neighbours of v
+'''
+def neighbourListsFromBlocks(instance, num_neighbours):
+
+	neighbours = []
+	for first_row, block in tsplib.iterateCostMatrixBlocks(instance):
+		neighbours.extend(nearestInRows(block.astype(numpy.float64), first_row, num_neighbours))
+	# END FOR
+	return neighbours
+
+'''
+FUNCTION
+	nearestInRows
+DESCRIPTION:
+	The nearest neighbours of the vertices of some rows of the cost matrix, closest first
+PARAMETERS:
+	weights
+		The rows of the cost matrix (a float numpy array, changed here)
+	first_row
+		The vertex of the first row
+	num_neighbours
+		The number of neighbours of each vertex
+RETURNS
+	a list of lists
+		The neighbours of the vertex of each row
+'''
+def nearestInRows(weights, first_row, num_neighbours):
+
+	num_rows, num_vertices = weights.shape
+	num_neighbours = min(num_neighbours, num_vertices - 1)
+
+	# A vertex is not a neighbour of itself
+	rows = numpy.arange(num_rows)[:, numpy.newaxis]
+	weights[rows[:, 0], first_row + rows[:, 0]] = numpy.inf
+
+	nearest = numpy.argpartition(weights, num_neighbours - 1, axis=1)[:, :num_neighbours]
+	order = numpy.argsort(weights[rows, nearest], axis=1, kind='mergesort')
+	return nearest[rows, order].tolist()
+
+'''
+=============================================================================
+CONSTRUCTION
+=============================================================================
+'''
+
+'''
+FUNCTION
+	nearestNeighbourTour
+DESCRIPTION:
+	Starts at vertex zero and always goes to the nearest vertex not visited yet
+PARAMETERS:
+	costMatrix
+		The matrix of the weights of the edges
+RETURNS
+	a list
+		The tour
+'''
+def nearestNeighbourTour(costMatrix):
+
+	num_vertices = len(costMatrix)
+	tour = [0]
+	to_be_visited = set(xrange(1, num_vertices))
+	while len(to_be_visited) > 0:
+		row = costMatrix[tour[-1]]
+		next_vertex = min(to_be_visited, key=row.__getitem__)
+		tour.append(next_vertex)
+		to_be_visited.remove(next_vertex)
+	# END WHILE
+
+	return tour
+
+'''
+FUNCTION
+	greedyEdgeTour
+DESCRIPTION:
+	Takes the edges between neighbours from the cheapest to the most expensive, skipping the ones
+	that would give a vertex three edges or close a cycle. The paths left are joined by nearest neighbour
+	over their ends.
+PARAMETERS:
+	distance
+		A function (u, v) -> the weight of the edge (u, v)
+	neighbours
+		The neighbour lists (see neighbourLists)
+RETURNS
+	a list
+		The tour
+'''
+def greedyEdgeTour(distance, neighbours):
+
+	num_vertices = len(neighbours)
+
+	candidate_edges = []
+	for u in xrange(num_vertices):
+		for v in neighbours[u]:
+			if u < v or u not in neighbours[v]:
+				candidate_edges.append( (distance(u, v), u, v) )
+	# END FOR
+	candidate_edges.sort()
+
+	# Union-find of the paths, to detect cycles
+	path_of = range(num_vertices)
+	def findPath(vertex):
+		while path_of[vertex] != vertex:
+			path_of[vertex] = path_of[path_of[vertex]]
+			vertex = path_of[vertex]
+		return vertex
+
+	adjacent = [[] for vertex in xrange(num_vertices)]
+	num_edges = 0
+	for weight, u, v in candidate_edges:
+		if len(adjacent[u]) < 2 and len(adjacent[v]) < 2:
+			path_u = findPath(u)
+			path_v = findPath(v)
+			if path_u != path_v:
+				path_of[path_u] = path_v
+				adjacent[u].append(v)
+				adjacent[v].append(u)
+				num_edges = num_edges + 1
+				if num_edges == num_vertices - 1:
+					break
+		# END IF
+	# END FOR
+
+	# Joins the paths: walks each path from one end to the other, then jumps to the nearest end of another path
+	ends = set([vertex for vertex in xrange(num_vertices) if len(adjacent[vertex]) < 2])
+	tour = []
+	vertex = min(ends)
+	while True:
+		ends.discard(vertex)
+		previous = -1
+		while vertex != -1:
+			tour.append(vertex)
+			next_vertex = -1
+			for other in adjacent[vertex]:
+				if other != previous:
+					next_vertex = other
+			previous = vertex
+			vertex = next_vertex
+		# END WHILE
+		ends.discard(previous)
+
+		if len(ends) == 0:
+			break
+		vertex = min(ends, key=lambda end: distance(previous, end))
+	# END WHILE
+
+	return tour
+
+'''
+=============================================================================
+LOCAL SEARCH
+=============================================================================
+'''
+
+'''
+FUNCTION
+	localSearch
+DESCRIPTION:
+	Alternates 2-opt and Or-opt until neither improves the tour. The tour is changed in place.
+PARAMETERS:
+	tour
+		The tour
+	costMatrix
+		The matrix of the weights of the edges
+	neighbours
+		The neighbour lists (see neighbourLists)
+RETURNS
+	<nothing>
+'''
+def localSearch(tour, costMatrix, neighbours):
+
+	position = [0] * len(tour)
+	for i in xrange(len(tour)):
+		position[tour[i]] = i
+	# END FOR
+
+	twoOpt(tour, position, costMatrix, neighbours)
+	while orOpt(tour, position, costMatrix, neighbours):
+		if not twoOpt(tour, position, costMatrix, neighbours):
+			break
+	# END WHILE
+
+'''
+FUNCTION
+	reverseSegment
+DESCRIPTION:
+	Reverses the vertices of the tour from the index i to the index j (going forward, possibly wrapping around).
+	If the segment has more than half of the tour, reverses the rest of the tour instead: the cycle is the same.
+PARAMETERS:
+	tour
+		The tour
+	position
+		The index of each vertex in the tour (updated)
+	i
+		The index of the first vertex of the segment
+	j
+		The index of the last vertex of the segment
+RETURNS
+	<nothing>
+'''
+def reverseSegment(tour, position, i, j):
+
+	num_vertices = len(tour)
+	length = (j - i) % num_vertices + 1
+	if 2 * length > num_vertices:
+		i, j = (j + 1) % num_vertices, (i - 1) % num_vertices
+		length = num_vertices - length
+	# END IF
+
+	for step in xrange(length // 2):
+		u = tour[i]
+		v = tour[j]
+		tour[i] = v
+		position[v] = i
+		tour[j] = u
+		position[u] = j
+		i = i + 1
+		if i == num_vertices:
+			i = 0
+		j = j - 1
+		if j < 0:
+			j = num_vertices - 1
+	# END FOR
+
+'''
+FUNCTION
+	twoOpt
+DESCRIPTION:
+	2-opt with neighbour lists and a queue of vertices to be checked ("don't look bits").
+	For a vertex a and its successor (or predecessor) b, only the neighbours c of a closer to a than b
+	can give an improving move, which replaces the edges (a, b) and (c, d) by (a, c) and (b, d).
+PARAMETERS:
+	tour
+		The tour (changed in place)
+	position
+		The index of each vertex in the tour (updated)
+	costMatrix
+		The matrix of the weights of the edges
+	neighbours
+		The neighbour lists (see neighbourLists)
+RETURNS
+	a boolean
+		True if the tour was improved
+'''
+def twoOpt(tour, position, costMatrix, neighbours):
+
+	num_vertices = len(tour)
+	queue = collections.deque(tour)
+	is_queued = [True] * num_vertices
+	improved = False
+
+	while len(queue) > 0:
+		a = queue.popleft()
+		is_queued[a] = False
+		weights_from_a = costMatrix[a]
+		i = position[a]
+
+		for forward in (True, False):
+			if forward:
+				b = tour[(i + 1) % num_vertices]
+			else:
+				b = tour[i - 1]
+			weight_ab = weights_from_a[b]
+
+			move = None
+			for c in neighbours[a]:
+				weight_ac = weights_from_a[c]
+				if weight_ac >= weight_ab:
+					break
+				j = position[c]
+				if forward:
+					d = tour[(j + 1) % num_vertices]
+				else:
+					d = tour[j - 1]
+				if c == b or d == a:
+					continue
+				if weight_ac + costMatrix[b][d] < weight_ab + costMatrix[c][d]:
+					move = (c, d)
+					break
+			# END FOR
+
+			if move is not None:
+				c, d = move
+				if forward:
+					# a b ... c d  ->  a c ... b d
+					reverseSegment(tour, position, position[b], position[c])
+				else:
+					# d c ... b a  ->  d b ... c a
+					reverseSegment(tour, position, position[c], position[b])
+				for vertex in (a, b, c, d):
+					if not is_queued[vertex]:
+						is_queued[vertex] = True
+						queue.append(vertex)
+				# END FOR
+				improved = True
+				break
+			# END IF
+		# END FOR
+	# END WHILE
+
+	return improved
+
+'''
+FUNCTION
+	orOpt
+DESCRIPTION:
+	Or-opt with neighbour lists: moves a segment of 1 to OR_OPT_MAX_SEGMENT consecutive vertices
+	(possibly reversed) to between two consecutive vertices, one of them a neighbour of an end of the segment.
+	Applies the first improving move of each segment, until no segment can be moved.
+PARAMETERS:
+	tour
+		The tour (changed in place)
+	position
+		The index of each vertex in the tour (updated)
+	costMatrix
+		The matrix of the weights of the edges
+	neighbours
+		The neighbour lists (see neighbourLists)
+RETURNS
+	a boolean
+		True if the tour was improved
+'''
+def orOpt(tour, position, costMatrix, neighbours):
+
+	num_vertices = len(tour)
+	max_segment = min(OR_OPT_MAX_SEGMENT, num_vertices - 3)
+	improved = False
+	improved_in_the_pass = True
+
+	while improved_in_the_pass:
+		improved_in_the_pass = False
+
+		for first in xrange(num_vertices):
+			for length in xrange(1, max_segment + 1):
+				i = position[first]
+				last = tour[(i + length - 1) % num_vertices]
+				before = tour[i - 1]
+				after = tour[(i + length) % num_vertices]
+				in_segment = set([tour[(i + k) % num_vertices] for k in xrange(length)])
+
+				removal_gain = costMatrix[before][first] + costMatrix[last][after] - costMatrix[before][after]
+				if removal_gain <= 0:
+					continue
+
+				# Finds the cheapest insertion between x and its successor y, next to a neighbour of the segment
+				best_delta = 0
+				best_move = None
+				for end in (first, last):
+					for c in neighbours[end]:
+						if costMatrix[end][c] >= removal_gain:
+							break
+						if c in in_segment:
+							continue
+						j = position[c]
+						for x, y in ((c, tour[(j + 1) % num_vertices]), (tour[j - 1], c)):
+							if x in in_segment or y in in_segment:
+								continue
+							weight_xy = costMatrix[x][y]
+							delta = costMatrix[x][first] + costMatrix[last][y] - weight_xy - removal_gain
+							if delta < best_delta:
+								best_delta = delta
+								best_move = (x, False)
+							delta = costMatrix[x][last] + costMatrix[first][y] - weight_xy - removal_gain
+							if delta < best_delta:
+								best_delta = delta
+								best_move = (x, True)
+						# END FOR
+					# END FOR
+				# END FOR
+
+				if best_move is not None:
+					moveSegment(tour, position, i, length, best_move[0], best_move[1])
+					improved = True
+					improved_in_the_pass = True
+					break
+			# END FOR
+		# END FOR
+	# END WHILE
+
+	return improved
+
+'''
+FUNCTION
+	moveSegment
+DESCRIPTION:
+	Moves the length vertices of the tour from the index i to just after the vertex x (not in the segment).
+	Rebuilds the tour, in O(number of vertices).
+PARAMETERS:
+	tour
+		The tour (changed in place)
+	position
+		The index of each vertex in the tour (updated)
+	i
+		The index of the first vertex of the segment
+	length
+		The number of vertices of the segment
+	x
+		The vertex after which the segment is inserted
+	reverse
+		True to insert the segment reversed
+RETURNS
+	<nothing>
+'''
+def moveSegment(tour, position, i, length, x, reverse):
+
+	rotated = tour[i:] + tour[:i]
+	segment = rotated[:length]
+	rest = rotated[length:]
+	if reverse:
+		segment.reverse()
+	k = rest.index(x) + 1
+	tour[:] = rest[:k] + segment + rest[k:]
+	for index in xrange(len(tour)):
+		position[tour[index]] = index
+	# END FOR
+
+'''
+=============================================================================
+SOLVER FOR LARGE INSTANCES
+=============================================================================
+For the instances the brute force can never finish (and whose cost matrix may not fit
+in memory): a greedy edge tour improved by 2-opt and Or-opt over the neighbour lists,
+with the tour kept in a two-level doubly-linked list (see twolevellist.py), so each move
+costs O(sqrt(n)), and a queue of the vertices whose edges changed ("don't look bits").
+The distances are computed on demand (see tsplib.distanceFunction), and the neighbour lists
+of the planar instances are the candidate lists of candidates.py, found without the n x n distances.
+'''
+
+'''
+CONSTANT
+	TIME_CHECK_INTERVAL
+DESCRIPTION:
+	The number of vertices taken out of the queue of the local search between two checks of the time limit
+'''
+TIME_CHECK_INTERVAL = 1000
+
+'''
+FUNCTION
+	initHeuristicSolver
+DESCRIPTION:
+	Builds a tour for the instance and improves it until no 2-opt or Or-opt move between neighbours
+	improves it, or until the time limit of its prunning.SearchContext, which sets its stop_reason to 'deadline'
+	as in the brute force.
+	On planar instances, also writes the lower bound of candidates.nearestNeighbourLowerBound, and the gap of the tour to it.
+	On an asymmetric instance, the tour is the nearest neighbour one, not improved (see the header of this file).
+	The tours are reported as the permutations of the brute force (see prunning.registerNewBestPermutation),
+	so the report functions of prunning can be used in the end.
+PARAMETERS:
+	instance
+		The instance read by tsplib.readInstance
+	output_file
+		The path to the output file, or None to write nothing
+RETURNS
+	a prunning.SearchContext
+		The context with the best tour found (see prunning.prepareReport)
+'''
+def initHeuristicSolver(instance, output_file):
+
+	print("Algorithm started...")
+	num_vertices = instance['dimension']
+	context = prunning.prepareReport(instance['cities'], num_vertices, output_file)
+
+	distance = tsplib.distanceFunction(instance)
+
+	lower_bound = None
+	explicit_weights = instance['explicitWeights']
+	if num_vertices <= 3:
+		tour = range(num_vertices)
+	elif explicit_weights is not None and not isSymmetric(explicit_weights):
+		tour = nearestNeighbourTour(explicit_weights.tolist())
+	else:
+		if candidates.isPlanar(instance):
+			neighbours = candidates.candidateLists(instance, NUM_NEIGHBOURS)
+			lower_bound = candidates.nearestNeighbourLowerBound(distance, neighbours)
+		else:
+			neighbours = neighbourListsFromBlocks(instance, NUM_NEIGHBOURS)
+		tour = greedyEdgeTour(distance, neighbours)
+		prunning.registerNewBestPermutation(context, tour, tourCostFromDistance(tour, distance))
+
+		twolevellist.build(tour)
+		if improveTour(context, distance, neighbours):
+			context.stop_reason = 'deadline'
+		tour = twolevellist.toList(0)
+	# END IF
+
+	cost = tourCostFromDistance(tour, distance)
+	if cost < context.min_cost_so_far:
+		prunning.registerNewBestPermutation(context, tour, cost)
+
+	time_elapsed_in_seconds = time.time() - context.start_time_in_seconds
+
+	prunning.finishReports(context)
+	if output_file is None:
+		return context
+	file_out = open(output_file,"a")
+	if lower_bound is not None:
+		gap = (context.min_cost_so_far - lower_bound) / float(lower_bound)
+		file_out.write("Lower bound: " + str(lower_bound) + " (gap " + str(round(100 * gap, 2)) + "%)\n")
+	if context.stop_reason is not None:
+		file_out.write(prunning.stopMessage(context))
+	else:
+		file_out.write("Search end in " + str(time_elapsed_in_seconds) + "s\n")
+	file_out.close()
+
+	return context
+
+'''
+FUNCTION
+	tourCostFromDistance
+DESCRIPTION:
+	The same of tourCost, with the distances given by a function
+'''
+def tourCostFromDistance(tour, distance):
+	return sum([distance(tour[i - 1], tour[i]) for i in xrange(len(tour))])
+
+'''
+FUNCTION
+	improveTour
+DESCRIPTION:
+	2-opt and Or-opt on the tour of twolevellist, until no move between neighbours improves it.
+	Every vertex starts in the queue. A vertex taken out of the queue is the end of the edges tried by
+	2-opt and the first vertex of the segments moved by Or-opt (in both directions of the tour).
+	After a move, the ends of the edges that changed go back to the queue.
+PARAMETERS:
+	context
+		The prunning.SearchContext with the time limit
+	distance
+		A function (u, v) -> the weight of the edge (u, v)
+	neighbours
+		The neighbour lists (see neighbourLists)
+RETURNS
+	a boolean
+		True if the time limit was reached
+'''
+def improveTour(context, distance, neighbours):
+
+	num_vertices = len(neighbours)
+	queue = collections.deque(twolevellist.toList(0))
+	is_queued = [True] * num_vertices
+	vertices_until_time_check = TIME_CHECK_INTERVAL
+
+	while len(queue) > 0:
+
+		vertices_until_time_check = vertices_until_time_check - 1
+		if vertices_until_time_check < 0:
+			vertices_until_time_check = TIME_CHECK_INTERVAL
+			if time.time() - context.start_time_in_seconds > context.time_limit:
+				return True
+		# END IF
+
+		a = queue.popleft()
+		is_queued[a] = False
+
+		changed = twoOptMove(a, distance, neighbours)
+		if changed is None:
+			changed = orOptMove(a, distance, neighbours)
+
+		if changed is not None:
+			for vertex in changed:
+				if not is_queued[vertex]:
+					is_queued[vertex] = True
+					queue.append(vertex)
+			# END FOR
+			if not is_queued[a]:
+				is_queued[a] = True
+				queue.append(a)
+		# END IF
+	# END WHILE
+
+	return False
+
+'''
+FUNCTION
+	twoOptMove
+DESCRIPTION:
+	Looks for an improving 2-opt move on the edges of the vertex a (see twoOpt), and applies the first one found
+	to the tour of twolevellist.
+PARAMETERS:
+	a
+		The vertex
+	distance
+		A function (u, v) -> the weight of the edge (u, v)
+	neighbours
+		The neighbour lists (see neighbourLists)
+RETURNS
+	a tuple
+		The vertices whose edges changed, or None if no move was found
+'''
+def twoOptMove(a, distance, neighbours):
+
+	for step in (twolevellist.successor, twolevellist.predecessor):
+		b = step(a)
+		weight_ab = distance(a, b)
+
+		for c in neighbours[a]:
+			weight_ac = distance(a, c)
+			if weight_ac >= weight_ab:
+				break
+			d = step(c)
+			if c == b or d == a:
+				continue
+			if weight_ac + distance(b, d) < weight_ab + distance(c, d):
+				twolevellist.make2OptMove(a, b, c, d)
+				return (a, b, c, d)
+		# END FOR
+	# END FOR
+
+	return None
+
+'''
+FUNCTION
+	orOptMove
+DESCRIPTION:
+	Looks for an improving Or-opt move of the segments that start at the vertex a (see orOpt), and applies the first
+	one found to the tour of twolevellist.
+	With p the vertex before the segment s1..s2 and n the one after it, and the segment inserted between
+	x and y (y after x, in the direction the segment was read), the move is made of 2-opt moves:
+		p s1..s2 n ... x y  ->  p x ... n s2..s1 y  ->  p n ... x s2..s1 y  (->  p n ... x s1..s2 y)
+PARAMETERS:
+	a
+		The vertex
+	distance
+		A function (u, v) -> the weight of the edge (u, v)
+	neighbours
+		The neighbour lists (see neighbourLists)
+RETURNS
+	a tuple
+		The vertices whose edges changed, or None if no move was found
+'''
+def orOptMove(a, distance, neighbours):
+
+	num_vertices = len(neighbours)
+	max_segment = min(OR_OPT_MAX_SEGMENT, num_vertices - 3)
+	successor = twolevellist.successor
+	predecessor = twolevellist.predecessor
+
+	for step, step_back in ((successor, predecessor), (predecessor, successor)):
+		first = a
+		before = step_back(first)
+		segment = []
+		last = before
+		for length in xrange(1, max_segment + 1):
+			last = step(last)
+			segment.append(last)
+			after = step(last)
+
+			removal_gain = distance(before, first) + distance(last, after) - distance(before, after)
+			if removal_gain <= 0:
+				continue
+
+			for end in (first, last):
+				for c in neighbours[end]:
+					if distance(end, c) >= removal_gain:
+						break
+					if c in segment:
+						continue
+					for x, y in ((c, step(c)), (step_back(c), c)):
+						if x in segment or y in segment or y == before:
+							continue
+						weight_xy = distance(x, y)
+						reversed_delta = distance(x, last) + distance(first, y) - weight_xy - removal_gain
+						forward_delta = distance(x, first) + distance(last, y) - weight_xy - removal_gain
+						if reversed_delta < 0 or forward_delta < 0:
+							twolevellist.make2OptMove(before, first, x, y)
+							if x != after:
+								twolevellist.make2OptMove(before, x, after, last)
+							if forward_delta < reversed_delta:
+								twolevellist.make2OptMove(x, last, first, y)
+							return (before, first, last, after, x, y)
+					# END FOR
+				# END FOR
+			# END FOR
+		# END FOR
+	# END FOR
+
+	return None
@@ -0,0 +1,332 @@
+import math
+import multiprocessing
+import signal
+import time
+
+import prunning
+
+'''
+=============================================================================
+PARALLEL SEARCH OF THE PERMUTATION TREE
+=============================================================================
+The permutation tree is split at a fixed depth: every partial permutation with
+SPLIT_DEPTH vertices after the root is a subproblem, searched by
+prunning.bruteForceWithPrunning in one of the processes of a multiprocessing.Pool.
+The lowest cost found by any process is kept in shared memory
+(the shared_upper_bound of the SearchContext of each process), so every process prunes against it.
+
+The main process stops the search as prunning does (see prunning.ANYTIME SEARCH): at the deadline, when a process
+returns a subproblem it stopped, or on a stop signal, noticed while it waits for the results. Then it terminates
+the pool, and the lower bound of the best permutation is the lowest of the cost of the best permutation found and
+of the lower bounds of the subproblems not searched to the end.
+'''
+
+'''
+CONSTANT
+	SPLIT_DEPTH
+DESCRIPTION:
+	The default number of vertices after the root fixed in each subproblem
+'''
+SPLIT_DEPTH = 1
+
+'''
+CONSTANT
+	POLL_INTERVAL_IN_SECONDS
+DESCRIPTION:
+	The longest the main process waits for the result of a subproblem before checking for a stop signal
+	(the wait cannot be interrupted by a signal in Python 2)
+'''
+POLL_INTERVAL_IN_SECONDS = 0.1
+
+'''
+VARIABLE
+	worker_context
+DESCRIPTION:
+	The prunning.SearchContext of the process of the pool, made by initWorker and kept between its subproblems
+'''
+worker_context = None
+
+'''
+FUNCTION
+	initWorker
+DESCRIPTION:
+	Runs once in every process of the pool: makes its SearchContext with the input of the problem
+	(writing nothing to the output file) and the shared upper bound.
+PARAMETERS:
+	cities
+		The list of cities [id, x, y]
+	costMatrix
+		The matrix of the weights of the edges (see prunning.prepareSearch).
+		Every process builds its own copies of it (see prunning.SearchContext.edge_weight_array).
+	shared_upper_bound
+		The multiprocessing.RawValue with the lowest cost found by any process
+	shared_upper_bound_lock
+		The lock that protects the updates of shared_upper_bound
+	start_time_in_seconds
+		The time the search started, so every process stops at the same time limit
+	settings
+		A dictionary with the settings of the search in the main process (see prunning.SEARCH_SETTINGS)
+RETURNS
+	<nothing>
+GLOBAL VARIABLES USED:
+	TO WRITE:
+		worker_context
+'''
+def initWorker(cities, costMatrix, shared_upper_bound, shared_upper_bound_lock, start_time_in_seconds, settings):
+
+	global worker_context
+
+	# Ctrl+C is handled by the main process, which terminates the pool
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+	worker_context = prunning.prepareSearch(cities, costMatrix, None)
+	for name, value in settings.items():
+		setattr(worker_context, name, value)
+	# END FOR
+	worker_context.start_time_in_seconds = start_time_in_seconds
+	worker_context.last_time_check_in_seconds = start_time_in_seconds
+	worker_context.shared_upper_bound = shared_upper_bound
+	worker_context.shared_upper_bound_lock = shared_upper_bound_lock
+
+	# The statistics are only collected by a search in a single process
+	worker_context.statistics_file = None
+
+'''
+FUNCTION
+	searchSubproblem
+DESCRIPTION:
+	Runs in a process of the pool: searches the subtree of one partial permutation,
+	unless its lower bound is already not lower than the shared upper bound.
+PARAMETERS:
+	subproblem
+		A tuple (index, lower bound, list of visited vertices, cost so far, lower bound function, search strategy),
+		where the search strategy is one of the names of prunning.SEARCH_STRATEGIES
+RETURNS
+	a tuple
+		(the index of the subproblem,
+		the best permutation found in that subtree or [] if none is better than the shared upper bound,
+		the number of leaves visited,
+		None if the subtree was searched to the end, or else the lower bound of the part of it not searched
+		(see prunning.frontierLowerBound))
+GLOBAL VARIABLES USED:
+	TO READ:
+		worker_context
+'''
+def searchSubproblem(subproblem):
+
+	context = worker_context
+	index, lower_bound, list_nodes_visited, cost_so_far, lowerBoundFunction, search_strategy = subproblem
+	searchFunction = prunning.SEARCH_STRATEGIES[search_strategy]
+
+	if context.shared_upper_bound.value < context.min_cost_so_far:
+		context.min_cost_so_far = context.shared_upper_bound.value
+	if lower_bound >= context.min_cost_so_far:
+		return index, [], 0, None
+
+	visited = set(list_nodes_visited)
+	list_nodes_to_be_visited = [vertex for vertex in xrange(context.num_vertices) if vertex not in visited]
+
+	context.min_path_so_far = []
+	num_leaves_before = context.num_leaves_visited_so_far
+	remaining_lower_bound = None
+
+	# The open nodes of a subproblem stopped before, in this process, are not part of this one
+	del context.open_node_sources[:]
+
+	try:
+		searchFunction(	context,
+						list_nodes_visited,
+						list_nodes_to_be_visited,
+						cost_so_far,
+						lowerBoundFunction)
+	except SystemExit:
+		remaining_lower_bound = context.search_lower_bound
+
+	return index, context.min_path_so_far, context.num_leaves_visited_so_far - num_leaves_before, remaining_lower_bound
+
+'''
+FUNCTION
+	splitSubproblems
+DESCRIPTION:
+	This is a recursive function.
+	Lists the partial permutations with split_depth vertices after the root, skipping the subtrees
+	prunned by their lower bound against the min_cost_so_far of the context, in the same order the depth first search would visit them.
+PARAMETERS:
+	context
+		The prunning.SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in that partial permutation
+	list_nodes_to_be_visited
+		The list of vertices that have not been visited yet in that partial permutation
+	cost_so_far
+		The cost so far of the edges that connect the vertices in that partial permutation
+	lowerBoundFunction
+		The lower bound function to be used (see prunning.bruteForceWithPrunning)
+	split_depth
+		The number of vertices after the root in each subproblem
+	subproblems
+		The list where the subproblems (lower bound, list of visited vertices, cost so far, lower bound function)
+		are appended
+RETURNS
+	<nothing>
+'''
+def splitSubproblems(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, lowerBoundFunction, split_depth, subproblems):
+
+	list_tuples_unordered = []
+	for child_node in list(list_nodes_to_be_visited):
+		list_nodes_to_be_visited.remove(child_node)
+		list_nodes_visited.append(child_node)
+
+		cost_of_that_child = cost_so_far + context.edge_weight[list_nodes_visited[-2]][child_node]
+		lower_bound_of_that_child = lowerBoundFunction(context, list_nodes_visited, list_nodes_to_be_visited, cost_of_that_child)
+		list_tuples_unordered.append( (lower_bound_of_that_child, child_node, cost_of_that_child) )
+
+		list_nodes_visited.pop()
+		list_nodes_to_be_visited.append(child_node)
+	# END FOR
+
+	for lower_bound_of_that_child, child_node, cost_of_that_child in sorted(list_tuples_unordered):
+		if lower_bound_of_that_child >= context.min_cost_so_far:
+			break
+
+		list_nodes_to_be_visited.remove(child_node)
+		list_nodes_visited.append(child_node)
+
+		if len(list_nodes_visited) > split_depth or len(list_nodes_to_be_visited) == 0:
+			subproblems.append( (lower_bound_of_that_child, list(list_nodes_visited), cost_of_that_child, lowerBoundFunction) )
+		else:
+			splitSubproblems(context, list_nodes_visited, list_nodes_to_be_visited, cost_of_that_child, lowerBoundFunction, split_depth, subproblems)
+
+		list_nodes_visited.pop()
+		list_nodes_to_be_visited.append(child_node)
+	# END FOR
+
+'''
+FUNCTION
+	initParallelBruteForceWithPrunning
+DESCRIPTION:
+	The same search of prunning.initBruteForceWithPrunning, with the subtrees of the partial permutations
+	of split_depth vertices after the root searched by a pool of num_processes processes.
+	The best permutations are written to the output file by the main process, as the subproblems end.
+	In the end, the SearchContext returned holds the best permutation found and the number of leaves visited
+	by all the processes, so the report functions of prunning can be used, and its stop_reason, search_lower_bound
+	and end_message tell whether and why the search stopped, the lower bound of the best permutation and what was
+	written to the output file in the end, as after prunning.initBruteForceWithPrunning.
+PARAMETERS:
+	cities
+		The list of cities [id, x, y]
+	costMatrix
+		The matrix of the weights of the edges (see initWorker)
+	lowerBoundFunction
+		The lower bound function to be used (see prunning.bruteForceWithPrunning)
+	output_file
+		The path to the output file
+	num_processes
+		The number of processes of the pool (by default, the number of CPUs)
+	split_depth
+		The number of vertices after the root in each subproblem
+	search_strategy
+		The search of the subtree of each subproblem (see prunning.SEARCH_STRATEGIES)
+	initial_path
+		A permutation to start with as the best one found so far (see prunning.setInitialPermutation), or None
+RETURNS
+	a prunning.SearchContext
+		The context of the search in the main process, with the results
+'''
+def initParallelBruteForceWithPrunning(cities, costMatrix, lowerBoundFunction, output_file, num_processes=None, split_depth=SPLIT_DEPTH, search_strategy='depth-first', initial_path=None):
+
+	print("Algorithm started...")
+	context = prunning.prepareSearch(cities, costMatrix, output_file)
+
+	if num_processes is None:
+		num_processes = multiprocessing.cpu_count()
+
+	# The processes prune with the cost of the initial permutation from the start
+	if initial_path is not None:
+		prunning.setInitialPermutation(context, initial_path)
+
+	subproblems = []
+	if context.num_vertices > 1:
+		splitSubproblems(context, [0], range(1, context.num_vertices), 0, lowerBoundFunction, split_depth, subproblems)
+	else:
+		subproblems.append( (0, [0], 0, lowerBoundFunction) )
+	subproblems.sort(key=lambda subproblem: subproblem[0])
+	subproblems = [(index,) + subproblem + (search_strategy,) for index, subproblem in enumerate(subproblems)]
+
+	# The lower bound of each subproblem not searched to the end yet, by index
+	remaining_lower_bounds = dict([(subproblem[0], subproblem[1]) for subproblem in subproblems])
+
+	shared_upper_bound = multiprocessing.RawValue('d', context.min_cost_so_far)
+	shared_upper_bound_lock = multiprocessing.Lock()
+	pool = multiprocessing.Pool(num_processes,
+								initWorker,
+								(	cities,
+									costMatrix,
+									shared_upper_bound,
+									shared_upper_bound_lock,
+									context.start_time_in_seconds,
+									dict([(name, getattr(context, name)) for name in prunning.SEARCH_SETTINGS])))
+
+	searched_to_the_end = False
+	previous_handlers = prunning.installStopSignalHandlers(context)
+	try:
+		results = pool.imap_unordered(searchSubproblem, subproblems)
+		while True:
+
+			# Waits for the next result a little at a time, so a stop signal is noticed
+			try:
+				index, path, num_leaves, remaining_lower_bound = results.next(POLL_INTERVAL_IN_SECONDS)
+			except multiprocessing.TimeoutError:
+				if context.stop_signal is not None:
+					context.stop_reason = 'signal'
+					break
+				continue
+			except StopIteration:
+				searched_to_the_end = True
+				break
+
+			context.num_leaves_visited_so_far = context.num_leaves_visited_so_far + num_leaves
+
+			if len(path) > 0:
+				cost = sum([context.edge_weight[path[i - 1]][path[i]] for i in xrange(len(path))])
+				if cost < context.min_cost_so_far:
+					context.min_cost_so_far = cost
+					context.min_path_so_far = path
+					prunning.reportNewBestPermutation(context, time.time() - context.start_time_in_seconds)
+			# END IF
+
+			if remaining_lower_bound is None:
+				del remaining_lower_bounds[index]
+			else:
+				remaining_lower_bounds[index] = remaining_lower_bound
+				context.stop_reason = 'deadline'
+				break
+		# END WHILE
+	finally:
+		# The processes ignore SIGINT, so they are terminated unless the whole tree was searched
+		prunning.restoreSignalHandlers(context, previous_handlers)
+		if searched_to_the_end:
+			pool.close()
+		else:
+			pool.terminate()
+		pool.join()
+
+	time_elapsed_in_seconds = time.time() - context.start_time_in_seconds
+
+	context.search_lower_bound = min([context.min_cost_so_far] + remaining_lower_bounds.values())
+	if context.stop_reason is None:
+		end_message = "Search end in " + str(time_elapsed_in_seconds) + "s\n"
+	else:
+		if context.search_lower_bound != float('inf'):
+			context.search_lower_bound = int(math.ceil(context.search_lower_bound))
+		end_message = prunning.stopMessage(context) + prunning.gapMessage(context)
+	# END IF
+	context.end_message = end_message
+
+	prunning.finishReports(context)
+	if output_file is not None:
+		file_out = open(output_file,"a")
+		file_out.write(end_message)
+		file_out.close()
+
+	return context
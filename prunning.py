@@ -1,94 +1,295 @@
 import math
 
+import heapq
 import time
-import sys
+import os
+import threading
+import signal
+import Queue
+import struct
+import zlib
+import json
+import collections
 
 import numpy
-import skimage.io
-import skimage.draw
 '''
 =============================================================================
-CONSTANTS / INPUT OF THE PROBLEM
+CONSTANTS
 =============================================================================
 '''
 
-TIME_TO_RUN_ALGORITHM_IN_SECONDS = 3600
-
-'''
-CONSTANT
-	PATH_OUTPUT_FILE
-DESCRIPTION:
-	The path to the output file of the algorithm
-'''
-PATH_OUTPUT_FILE = "out.txt"
-CITIES = []
-
 '''
 CONSTANT
-	NUM_VERTICES
+	TIME_TO_RUN_ALGORITHM_IN_SECONDS
 DESCRIPTION:
-	The total number of vertices in the complete graph
+	The default deadline of the search (see SearchContext.time_limit), in seconds after it starts: there, it stops
+	and reports the best permutation found so far and a lower bound (see ANYTIME SEARCH)
 '''
-NUM_VERTICES = 5
+TIME_TO_RUN_ALGORITHM_IN_SECONDS = 3600
 
 '''
 CONSTANT
-	EDGE_WEIGHT
+	EXAMPLE_EDGE_WEIGHT
 DESCRIPTION:
-	A matrix where EDGE_WEIGHT[i][j] is the weight of the edge that connects the i-th 	vertex to
-	the j-th vertex.
-	Vertices start on 0.
-	The graph should be undirected. Hence, EDGE_WEIGHT[i][j] = EDGE_WEIGHT[j][i] for every i and j.
-	This matrix should be symmetric.
-	Also, EDGE_WEIGHT[i][i] = 0. (The diagonal should be filled with zeros)
-	Should have size NUM_VERTICES by NUM_VERTICES
-	Also assumes positive values for every edge.
+	A small cost matrix (see SearchContext.edge_weight), searched by main
 '''
-EDGE_WEIGHT = [	[0,		1,			10,			100,			1000 		],		
-				[1,		0,			10000,		100000,			1000000 	],		
-				[10,	10000,		0,			10000000,		100000000 	],		
-				[100,	100000,		10000000,	0,				1000000000	],		
-				[1000,	1000000,	100000000,	1000000000,		0			]]
+EXAMPLE_EDGE_WEIGHT = [	[0,		1,			10,			100,			1000 		],
+						[1,		0,			10000,		100000,			1000000 	],
+						[10,	10000,		0,			10000000,		100000000 	],
+						[100,	100000,		10000000,	0,				1000000000	],
+						[1000,	1000000,	100000000,	1000000000,		0			]]
 
 '''
 =============================================================================
-GLOBAL VARIABLES USED BY THE ALGORITHM
+SEARCH CONTEXT
 =============================================================================
+Everything a search reads and writes, but the constants of this file and the list of the searches that stop on a
+signal (see ANYTIME SEARCH), is kept in a SearchContext: the input of the problem, its settings, the best permutation
+found so far, the buffers of the lower bounds, the dominance table, the statistics, the checkpoints and why the search
+stopped. The settings (see SEARCH_SETTINGS) are copied from the constants of this file when the context is made,
+and can be changed for a single search before it runs.
+prepareSearch (or prepareReport, for the algorithms that only report their permutations) makes a new context,
+and every function of the search receives it as its first parameter. So two searches never share any state,
+and several searches can run in the same process, one after the other or at the same time in different threads
+(see solver.py).
 '''
 
-start_time_in_seconds = 0
-
 '''
-VARIABLE
-	min_cost_so_far
+CONSTANT
+	SEARCH_SETTINGS
 DESCRIPTION:
-	The total cost of the lowest-cost permutation found so far in the brute force algorithm.
-	This is an UPPER BOUND for the solution of the problem.
+	The attributes of SearchContext that configure a search, each one copied from the constant of this file of the same
+	name in upper case when the context is made (TIME_TO_RUN_ALGORITHM_IN_SECONDS for time_limit)
 '''
-min_cost_so_far = float('inf')
+SEARCH_SETTINGS = [	'time_limit', 'max_open_nodes', 'dominance_table_size', 'two_opt_prunning', 'batched_bounds', 'report_mode',
+					'statistics_file']
 
 '''
-VARIABLE
-	min_path_so_far
+CLASS
+	SearchContext
 DESCRIPTION:
-	The list, in order, of the vertices of the best (lowest-cost) permutation found so far.
-'''
-min_path_so_far = []
-
-'''
-=============================================================================
-DEBUG VARIABLES
-=============================================================================
-'''
-
-'''
-VARIABLE
+	The state of a search. The attributes below are the input of the problem, the best permutation found and the buffers
+	of the lower bounds. The other attributes are described in the sections of the code that use them: BATCHED LOWER
+	BOUNDS, REPORT OF THE PERMUTATIONS FOUND, CHECKPOINTS OF THE SEARCH, DOMINANCE TABLE, 2-OPT PRUNNING, STATISTICS OF
+	THE SEARCH, ANYTIME SEARCH and BEST-FIRST SEARCH.
+	A new context has no input (see prepareSearch), the default configuration of the constants of this file and
+	nothing found yet.
+ATTRIBUTES:
+	cities
+		The list of cities [id, x, y], used to draw the permutations
+	num_vertices
+		The total number of vertices in the complete graph
+	edge_weight
+		A matrix where edge_weight[i][j] is the weight of the edge that connects the i-th vertex to
+		the j-th vertex.
+		Vertices start on 0.
+		The graph should be undirected. Hence, edge_weight[i][j] = edge_weight[j][i] for every i and j.
+		This matrix should be symmetric.
+		Also, edge_weight[i][i] = 0. (The diagonal should be filled with zeros)
+		Should have size num_vertices by num_vertices
+		Also assumes positive values for every edge.
+	edge_weight_array
+		edge_weight as a numpy array, read by the numpy code (the edge index and the buffers of the lower bounds).
+		When the search is given the memory-mapped cost matrix of an instance cache (see tsplib.readCachedInstance),
+		it is that matrix, which is not copied into another array.
+		Every search still holds two private copies of the matrix: edge_weight, a list of lists, because the search
+		reads one weight at a time, which is much faster from a list, and q_route_weights, as floats, read by the q-route,
+		the batched bounds and the 2-opt prunning. The search is exponential in the number of vertices, so both are small.
+	output_file
+		The path to the output file of the algorithm, or None for a search that writes nothing
+	time_limit
+		The deadline of the search, in seconds after it starts (TIME_TO_RUN_ALGORITHM_IN_SECONDS by default)
+	start_time_in_seconds
+		The time the search started
+	min_cost_so_far
+		The total cost of the lowest-cost permutation found so far in the brute force algorithm.
+		This is an UPPER BOUND for the solution of the problem.
+	min_path_so_far
+		The list, in order, of the vertices of the best (lowest-cost) permutation found so far.
+	shared_upper_bound
+	shared_upper_bound_lock
+		When several processes search different subtrees of the same permutation tree (see parallel.py),
+		shared_upper_bound is a multiprocessing.RawValue with the lowest cost found by any of them,
+		and shared_upper_bound_lock the lock that protects its updates.
+		The search prunes against it as soon as another process finds a better permutation.
+		None when the search runs in a single process.
 	num_leaves_visited_so_far
-DESCRIPTION:
-	The number of leaves visited in the algorithm so far.
-	For debug purposes.
+		The number of leaves visited in the algorithm so far.
+		For debug purposes.
+
+	EDGE INDEX
+	Built once for each search by buildEdgeIndex, since the weights of the edges never change.
+	sorted_edge_weight_prefix_sum
+		sorted_edge_weight_prefix_sum[k] is the sum of the k cheapest edges of the graph.
+		An edge {u, v} weights min(edge_weight[u][v], edge_weight[v][u]).
+	sorted_neighbours
+		sorted_neighbours[v] is the numpy array of the other vertices, sorted by the weight of the edge from v,
+		cheapest first (ties broken by the vertex). Shared with the heuristics (see heuristic.warmStartTour).
+
+	BUFFERS USED BY THE LOWER BOUNDS
+	Allocated once for each search by allocateLowerBoundBuffers, so the lower bound
+	functions do not allocate memory for each node of the permutation tree.
+	vertex_bit
+		vertex_bit[v] is 2 to the power of v. A set of vertices is identified by the sum of their bits (its bitmask).
+	prim_key
+	prim_parent
+	prim_pending
+	prim_order
+		Arrays used by primMST: the cheapest edge from each vertex to the tree, the vertex of the tree
+		at the other end of that edge, the vertices not in the tree yet and the order in which the vertices
+		joined the tree.
+	tree_mask_at_depth
+	tree_cost_at_depth
+	tree_order_at_depth
+	tree_parent_at_depth
+	tree_degree_at_depth
+	tree_start_edges_at_depth
+		Per-depth arrays used by incrementalMinimumTreeBound. The slot d holds, for the last node of depth d
+		whose children were bounded, the bitmask of its set of vertices to be visited, the cost of the minimum
+		spanning tree of that set, the order in which the vertices joined the tree, the parent of every vertex
+		in the tree (-1 for the root), the number of edges of every vertex in the tree and
+		[cheapest edge from the first vertex to the set, its vertex, second cheapest edge].
+	tree_side
+		tree_side[v] tells in which of the two trees left by the removal of a vertex from a tree the vertex v is.
+	held_karp_mask_at_depth
+	held_karp_penalty_at_depth
+	held_karp_penalty
+	held_karp_degree
+		Arrays used by heldKarpBound. The slot d of the per-depth arrays holds, for the last node of depth d
+		whose children were bounded, the bitmask of its set of vertices to be visited and the penalties of
+		its vertices (indexed by vertex). held_karp_penalty holds the penalties of the child being bounded
+		and held_karp_degree the number of edges of each vertex in the last tree computed.
+	q_route_weights
+	q_route_index
+	q_route_rows
+	q_route_submatrix
+	q_route_sums
+	q_route_value
+	q_route_second_value
+	q_route_next
+	q_route_positions
+		Numpy arrays used by qRoute: edge_weight_array as floats with infinite weights on the diagonal (no edge from a vertex
+		to itself), the vertices to be visited, the rows of q_route_weights of those vertices, the submatrix of those
+		vertices, the sums of the dynamic programming step, the cheapest q-route from each vertex, the cheapest one whose
+		second vertex is not the second vertex of the cheapest, the second vertex of the cheapest and 0, 1, 2, ...
+		The matrices are flat, so that their first N*N values can be used as a contiguous N by N matrix.
+	batched_position
+		Used by the batched lower bounds: batched_position[v] is the index of the vertex v in the list of
+		vertices to be visited of the node whose children are being bounded.
 '''
-num_leaves_visited_so_far = 0
+class SearchContext(object):
+
+	__slots__ = (	'cities', 'num_vertices', 'edge_weight', 'edge_weight_array', 'output_file', 'time_limit',
+					'max_open_nodes', 'dominance_table_size', 'two_opt_prunning', 'batched_bounds', 'report_mode',
+					'start_time_in_seconds', 'min_cost_so_far', 'min_path_so_far', 'shared_upper_bound', 'shared_upper_bound_lock',
+					'num_leaves_visited_so_far',
+					'sorted_edge_weight_prefix_sum', 'sorted_neighbours',
+					'vertex_bit', 'prim_key', 'prim_parent', 'prim_pending', 'prim_order',
+					'tree_mask_at_depth', 'tree_cost_at_depth', 'tree_order_at_depth', 'tree_parent_at_depth',
+					'tree_degree_at_depth', 'tree_start_edges_at_depth', 'tree_side',
+					'held_karp_mask_at_depth', 'held_karp_penalty_at_depth', 'held_karp_penalty', 'held_karp_degree',
+					'q_route_weights', 'q_route_index', 'q_route_rows', 'q_route_submatrix', 'q_route_sums', 'q_route_value',
+					'q_route_second_value', 'q_route_next', 'q_route_positions', 'batched_position',
+					'report_queue', 'report_thread', 'city_pixels',
+					'checkpoint_file', 'last_checkpoint_time_in_seconds', 'time_searched_before_in_seconds', 'open_node_sources',
+					'dominance_table_at_depth', 'dominance_table_num_entries',
+					'two_opt_weights',
+					'statistics_file', 'statistics_nodes_expanded_at_depth', 'statistics_children_bounded_at_depth',
+					'statistics_children_prunned_at_depth', 'statistics_children_two_opt_prunned_at_depth',
+					'statistics_gap_histogram', 'statistics_bound_calls', 'statistics_bound_time_in_seconds',
+					'last_statistics_time_in_seconds',
+					'stop_signal', 'stop_reason', 'search_lower_bound', 'time_check_interval', 'last_time_check_in_seconds',
+					'end_message')
+
+	def __init__(self):
+
+		# Input of the problem
+		self.cities = []
+		self.num_vertices = 0
+		self.edge_weight = []
+		self.edge_weight_array = numpy.zeros((0, 0))
+		self.output_file = None
+
+		# Settings (see SEARCH_SETTINGS)
+		self.time_limit = TIME_TO_RUN_ALGORITHM_IN_SECONDS
+		self.max_open_nodes = MAX_OPEN_NODES
+		self.dominance_table_size = DOMINANCE_TABLE_SIZE
+		self.two_opt_prunning = TWO_OPT_PRUNNING
+		self.batched_bounds = BATCHED_BOUNDS
+		self.report_mode = REPORT_MODE
+		self.statistics_file = STATISTICS_FILE
+
+		# Best permutation found so far
+		self.start_time_in_seconds = time.time()
+		self.min_cost_so_far = float('inf')
+		self.min_path_so_far = []
+		self.shared_upper_bound = None
+		self.shared_upper_bound_lock = None
+		self.num_leaves_visited_so_far = 0
+
+		# Edge index and buffers of the lower bounds (see buildEdgeIndex and allocateLowerBoundBuffers)
+		self.sorted_edge_weight_prefix_sum = [0]
+		self.sorted_neighbours = None
+		self.vertex_bit = []
+		self.prim_key = []
+		self.prim_parent = []
+		self.prim_pending = []
+		self.prim_order = []
+		self.tree_mask_at_depth = []
+		self.tree_cost_at_depth = []
+		self.tree_order_at_depth = []
+		self.tree_parent_at_depth = []
+		self.tree_degree_at_depth = []
+		self.tree_start_edges_at_depth = []
+		self.tree_side = []
+		self.held_karp_mask_at_depth = []
+		self.held_karp_penalty_at_depth = []
+		self.held_karp_penalty = []
+		self.held_karp_degree = []
+		self.q_route_weights = None
+		self.q_route_index = None
+		self.q_route_rows = None
+		self.q_route_submatrix = None
+		self.q_route_sums = None
+		self.q_route_value = None
+		self.q_route_second_value = None
+		self.q_route_next = None
+		self.q_route_positions = None
+		self.batched_position = None
+
+		# Report of the permutations found
+		self.report_queue = None
+		self.report_thread = None
+		self.city_pixels = None
+
+		# Checkpoints
+		self.checkpoint_file = None
+		self.last_checkpoint_time_in_seconds = self.start_time_in_seconds
+		self.time_searched_before_in_seconds = 0.0
+		self.open_node_sources = []
+
+		# Dominance table and 2-opt prunning
+		self.dominance_table_at_depth = []
+		self.dominance_table_num_entries = 0
+		self.two_opt_weights = None
+
+		# Statistics
+		self.statistics_nodes_expanded_at_depth = []
+		self.statistics_children_bounded_at_depth = []
+		self.statistics_children_prunned_at_depth = []
+		self.statistics_children_two_opt_prunned_at_depth = []
+		self.statistics_gap_histogram = []
+		self.statistics_bound_calls = [0]
+		self.statistics_bound_time_in_seconds = [0.0]
+		self.last_statistics_time_in_seconds = self.start_time_in_seconds
+
+		# Anytime search
+		self.stop_signal = None
+		self.stop_reason = None
+		self.search_lower_bound = float('-inf')
+		self.time_check_interval = 1
+		self.last_time_check_in_seconds = self.start_time_in_seconds
+		self.end_message = None
 
 '''
 =============================================================================
@@ -102,6 +303,8 @@ FUNCTION
 DESCRIPTION:
 	The simplest lower bound possible (zero)
 PARAMETERS:
+	context
+		The SearchContext of the search
 	list_nodes_visited
 		The list of visited vertices so far in that partial permutation
 	list_nodes_to_be_visited
@@ -113,7 +316,7 @@ RETURNS
 		This function always return zero because zero is always a lower bound for this problem,
 		given that all the edges are positive
 '''
-def zeroLowerBound(list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+def zeroLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
 	return 0
 
 '''
@@ -124,7 +327,10 @@ DESCRIPTION:
 	of the graph, being k the number of nodes to be visited plus one.
 	This is a lower bound for the total cost of permutations that start with the given
 	partial permutation.
+	The sum is read from the prefix sums of the sorted edges, in O(1).
 PARAMETERS:
+	context
+		The SearchContext of the search
 	list_nodes_visited
 		The list of visited vertices so far in that partial permutation
 	list_nodes_to_be_visited
@@ -135,85 +341,78 @@ RETURNS
 	an integer
 		The cost of the partial permutation so far added to the sum of the lowest k edges
 		of the graph, being k the number of nodes to be visited plus one.
-GLOBAL VARIABLES USED:
+CONTEXT ATTRIBUTES USED:
 	TO READ:
-		NUM_VERTICES
-		EDGE_WEIGHT
+		sorted_edge_weight_prefix_sum
 '''
-def sumMinEdgesBound(list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
-
-	list_of_edge_costs = []
-	for i in xrange(NUM_VERTICES):
-		for j in xrange(i+1, NUM_VERTICES):
-			list_of_edge_costs.append(EDGE_WEIGHT[i][j])
-		# END FOR
-	# END FOR
+def sumMinEdgesBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
 
-	list_of_edge_costs_sorted = sorted(list_of_edge_costs)
+	num_edges = min(len(list_nodes_to_be_visited) + 1, len(context.sorted_edge_weight_prefix_sum) - 1)
 
-	lower_bound = cost_so_far
-	for i in xrange(len(list_nodes_to_be_visited) + 1):
-		lower_bound = lower_bound + list_of_edge_costs_sorted[i]
-	# END FOR
+	lower_bound = cost_so_far + context.sorted_edge_weight_prefix_sum[num_edges]
 
 	return lower_bound
 
-def minimumTreeBound(list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+'''
+FUNCTION
+	minimumTreeBound
+DESCRIPTION:
+	The cost of the partial permutation so far added to the cost of the minimum spanning tree
+	of the vertices to be visited, to the cheapest edge that connects the first vertex of the
+	permutation to a vertex to be visited and to the cheapest edge that connects the last vertex
+	of the permutation to a vertex to be visited.
+	The rest of any permutation is a path that leaves the last vertex, visits every vertex to be
+	visited and goes back to the first vertex. Hence, this is a lower bound for the total cost of
+	permutations that start with the given partial permutation.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in that partial permutation
+	list_nodes_to_be_visited
+		The list of vertices that have not been visited yet in that partial permutation
+	cost_so_far
+		The cost so far of the edges that connect the vertices in that partial permutation
+RETURNS
+	an integer
+		The lower bound described in the description
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		edge_weight
+'''
+def minimumTreeBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+	edge_weight = context.edge_weight
+
 	if len(list_nodes_to_be_visited) == 0:
-		return EDGE_WEIGHT[list_nodes_visited[0]][list_nodes_visited[-1]] + cost_so_far
+		return edge_weight[list_nodes_visited[0]][list_nodes_visited[-1]] + cost_so_far
 
-	mst_cost, mst = primMST(list_nodes_to_be_visited)
+	mst_cost = primMST(context, list_nodes_to_be_visited)
 
-	min_start = min([EDGE_WEIGHT[list_nodes_visited[0]][x] for x in list_nodes_to_be_visited])
-	min_end = min([EDGE_WEIGHT[list_nodes_visited[-1]][x] for x in list_nodes_to_be_visited])
+	min_start = min([edge_weight[list_nodes_visited[0]][x] for x in list_nodes_to_be_visited])
+	min_end = min([edge_weight[list_nodes_visited[-1]][x] for x in list_nodes_to_be_visited])
 
 	lower_bound = cost_so_far + mst_cost + min_start + min_end
 	return lower_bound
 
-def primMST(list_nodes):
-	if len(list_nodes) == 0:
-		return 0, []
-
-	minimum_spanning_tree = [[list_nodes[-1],list_nodes[-1]]]
-	cheapest_cost_list = []
-	tree_cost = 0
-
-	for i in xrange(len(list_nodes)-1):
-		cheapest_cost_list.append([list_nodes[i], EDGE_WEIGHT[list_nodes[i]][list_nodes[-1]], list_nodes[-1]])
-
-	while len(cheapest_cost_list) is not 0:
-		x = min(cheapest_cost_list, key=lambda x: x[1])
-		tree_cost += x[1]
-		minimum_spanning_tree.append([x[0],x[2]])
-		cheapest_cost_list.remove(x)
-
-		for v in cheapest_cost_list:
-			if EDGE_WEIGHT[x[0]][v[0]] < v[1]:
-				v[1] = EDGE_WEIGHT[x[0]][v[0]]
-				v[2] = x[0]
-
-	return tree_cost, minimum_spanning_tree
-
 '''
 FUNCTION
-	qRouteLowerBound
+	incrementalMinimumTreeBound
 DESCRIPTION:
-	This function returns the cost of a path that starts on vertex zero, follows the
-	permutation path until the last vertex of the list_nodes_visited, goes to a vertex in the list_nodes_to_be_visited,
-	does a q-route including only vertices of list_nodes_to_be_visited, and goes back
-	to vertex number zero.
-
-	This function returns the size of the smallest of those paths.
-
-	Let N be the size of the list list_nodes_to_be_visited.
-	The cost of going from vertex zero to the last vertex of the permutation is cost_so_far.
-	For the rest of the costs, we may calculate the q route among the list_nodes_visited initializing
-	the cost of the q route with zero edges starting on each vertex v as being the cost of the edge
-	that connects v to the vertex 0, instead of the usual flat zero.
-	Then, we calculate the q route with (N-1) vertices among list_nodes_to_be_visited.
-	In the end, we do one more iteration to calculate q-routes starting on the last vertex
-	of the partial permutation to the vertices in list_nodes_to_be_visited.
+	The same lower bound as minimumTreeBound, reusing the work done for the siblings of the node.
+	All the children of a node are bounded one after the other, and each of them moves a single
+	vertex (the child) from the set S of vertices to be visited of the parent to its list of visited vertices.
+	So, the minimum spanning tree T of S is computed only once for the parent and kept, with the cheapest
+	edges from the first vertex to S, in the slot of the parent depth of the per-depth arrays below.
+	Then, the minimum spanning tree of S without the child is obtained from T:
+		- if the child is a leaf of T, it is T without the edge of the child;
+		- if the child has two edges in T, removing it splits T in two trees, and the minimum spanning
+		  tree is those two trees joined by the cheapest edge between them;
+		- otherwise, it is computed by primMST.
+	The slot of a depth is identified by the bitmask of S, so a slot left by another node of the
+	same depth is never reused.
 PARAMETERS:
+	context
+		The SearchContext of the search
 	list_nodes_visited
 		The list of visited vertices so far in that partial permutation
 	list_nodes_to_be_visited
@@ -222,404 +421,3421 @@ PARAMETERS:
 		The cost so far of the edges that connect the vertices in that partial permutation
 RETURNS
 	an integer
-		The size of the smallest of the paths described in the description
-GLOBAL VARIABLES USED:
+		The same value of minimumTreeBound
+CONTEXT ATTRIBUTES USED:
 	TO READ:
-		NUM_VERTICES
-		EDGE_WEIGHT
+		edge_weight
+		vertex_bit
+		prim_parent
+		prim_order
+	TO WRITE:
+		tree_mask_at_depth
+		tree_cost_at_depth
+		tree_order_at_depth
+		tree_parent_at_depth
+		tree_degree_at_depth
+		tree_start_edges_at_depth
+		tree_side
 '''
-def qRouteLowerBound(list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+def incrementalMinimumTreeBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+	edge_weight = context.edge_weight
+	vertex_bit = context.vertex_bit
 
-	num_vertices_to_be_visited = len(list_nodes_to_be_visited)
-	q_values_A = []
-	q_values_B = []
-	using_list = 'A'
-	q_values_route_n_edges = q_values_A
-	q_values_route_n_minus_1_edges = q_values_B
-	last_vertex_in_permutation = list_nodes_visited[-1]
+	if len(list_nodes_to_be_visited) == 0:
+		return edge_weight[list_nodes_visited[0]][list_nodes_visited[-1]] + cost_so_far
 
-	if num_vertices_to_be_visited == 0:
-		return cost_so_far + EDGE_WEIGHT[last_vertex_in_permutation][0]
+	child_node = list_nodes_visited[-1]
+	parent_depth = len(list_nodes_visited) - 2
+	mask = sum(map(vertex_bit.__getitem__, list_nodes_to_be_visited)) + vertex_bit[child_node]
+
+	order = context.tree_order_at_depth[parent_depth]
+	parent = context.tree_parent_at_depth[parent_depth]
+	degree = context.tree_degree_at_depth[parent_depth]
+	start_edges = context.tree_start_edges_at_depth[parent_depth]
+
+	# -----------------------
+	# THE TREE OF THE PARENT IS NOT IN ITS SLOT YET: BUILD IT
+	# -----------------------
+	if context.tree_mask_at_depth[parent_depth] != mask:
+		context.tree_mask_at_depth[parent_depth] = mask
+
+		# The set S of the parent is the list to be visited of the child plus the child itself.
+		# It is built in place, and the child is the root of the tree.
+		list_nodes_to_be_visited.append(child_node)
+		context.tree_cost_at_depth[parent_depth] = primMST(context, list_nodes_to_be_visited)
+		list_nodes_to_be_visited.pop()
+
+		# Keeps the order in which the vertices joined the tree, the edge of every vertex
+		# to the tree when it joined (the root has none) and the number of edges of every vertex
+		degree[child_node] = 0
+		for vertex in list_nodes_to_be_visited:
+			degree[vertex] = 0
+		for vertex in list_nodes_to_be_visited:
+			parent[vertex] = context.prim_parent[vertex]
+			degree[vertex] = degree[vertex] + 1
+			degree[context.prim_parent[vertex]] = degree[context.prim_parent[vertex]] + 1
+		# END FOR
+		for i in xrange(len(list_nodes_to_be_visited) + 1):
+			order[i] = context.prim_order[i]
+		parent[child_node] = -1
+
+		# The two cheapest edges from the first vertex to S, and the vertex of the cheapest one
+		weights_from_start = edge_weight[list_nodes_visited[0]]
+		start_edges[0] = weights_from_start[child_node]
+		start_edges[1] = child_node
+		start_edges[2] = float('inf')
+		for vertex in list_nodes_to_be_visited:
+			weight = weights_from_start[vertex]
+			if weight < start_edges[0]:
+				start_edges[2] = start_edges[0]
+				start_edges[0] = weight
+				start_edges[1] = vertex
+			elif weight < start_edges[2]:
+				start_edges[2] = weight
+		# END FOR
 	# END IF
 
-	for vertex in list_nodes_to_be_visited:
-		q_values_route_n_edges.append( EDGE_WEIGHT[vertex][0] );
-		q_values_route_n_minus_1_edges.append( EDGE_WEIGHT[vertex][0] );
-	# END FOR
+	# -----------------------
+	# MINIMUM SPANNING TREE WITHOUT THE CHILD
+	# -----------------------
+	num_tree_vertices = len(list_nodes_to_be_visited) + 1
 
-	for k in xrange(num_vertices_to_be_visited - 1):
+	if degree[child_node] == 1:
 
-		if(using_list == 'A'):
-			q_values_route_n_minus_1_edges = q_values_A
-			q_values_route_n_edges = q_values_B
-			using_list = 'B'
+		# The child is a leaf: removes its only edge
+		if parent[child_node] >= 0:
+			mst_cost = context.tree_cost_at_depth[parent_depth] - edge_weight[child_node][parent[child_node]]
 		else:
-			q_values_route_n_minus_1_edges = q_values_B
-			q_values_route_n_edges = q_values_A
-			using_list = 'A'
+			mst_cost = context.tree_cost_at_depth[parent_depth] - edge_weight[child_node][order[1]]
+		# END IF
 
-		for source_vertex,q_value in zip(list_nodes_to_be_visited,q_values_route_n_edges):
-			q_value = min( [EDGE_WEIGHT[source_vertex][a]+b for (a,b) in zip(list_nodes_to_be_visited,q_values_route_n_minus_1_edges)])
-		#END FOR
-	# END FOR
+	elif degree[child_node] == 2:
+
+		# The child splits the tree in two. One side is the subtree of a vertex that joined the tree
+		# through the child (the first one, if the child is the root). Since every vertex joins the tree
+		# after its parent, a single pass in that order marks the whole subtree.
+		side = context.tree_side
+		side[child_node] = 0
+		subtree_root = -1
+		other_neighbour = -1
+		side_a = []
+		side_b = []
+		for i in xrange(num_tree_vertices):
+			vertex = order[i]
+			if vertex == child_node:
+				continue
+			if parent[vertex] == child_node and subtree_root < 0:
+				subtree_root = vertex
+				side[vertex] = 1
+			elif parent[vertex] == child_node:
+				other_neighbour = vertex
+				side[vertex] = 0
+			elif parent[vertex] >= 0:
+				side[vertex] = side[parent[vertex]]
+			else:
+				side[vertex] = 0
+			# END IF
+			if side[vertex]:
+				side_a.append(vertex)
+			else:
+				side_b.append(vertex)
+		# END FOR
+
+		if len(side_a) > len(side_b):
+			side_a, side_b = side_b, side_a
+		cheapest_edge = float('inf')
+		for vertex in side_a:
+			weight = min(map(edge_weight[vertex].__getitem__, side_b))
+			if weight < cheapest_edge:
+				cheapest_edge = weight
+		# END FOR
+
+		if parent[child_node] >= 0:
+			other_neighbour = parent[child_node]
+		removed_edges = edge_weight[child_node][subtree_root] + edge_weight[child_node][other_neighbour]
+		mst_cost = context.tree_cost_at_depth[parent_depth] - removed_edges + cheapest_edge
 
-	smallest_q_route = min( [EDGE_WEIGHT[last_vertex_in_permutation][a]+b for (a,b) in zip(list_nodes_to_be_visited,q_values_route_n_edges)] )
+	else:
+		mst_cost = primMST(context, list_nodes_to_be_visited)
+	# END IF
 
-	lower_bound = smallest_q_route + cost_so_far
+	# -----------------------
+	# BOUND OF THE CHILD
+	# -----------------------
+	if start_edges[1] != child_node:
+		min_start = start_edges[0]
+	else:
+		min_start = start_edges[2]
+	min_end = min(map(edge_weight[child_node].__getitem__, list_nodes_to_be_visited))
 
+	lower_bound = cost_so_far + mst_cost + min_start + min_end
 	return lower_bound
 
 '''
-=============================================================================
-ALGORITHM IMPLEMENTATION
-=============================================================================
+FUNCTION
+	primMST
+DESCRIPTION:
+	Prim's algorithm for the minimum spanning tree of the complete graph induced by the given vertices,
+	in O(N^2) where N is the number of vertices.
+	The tree grows from the last vertex of the list. The vertices not in the tree yet are kept in the front of
+	the preallocated array prim_pending, and the same pass over them that updates the cheapest edge
+	to the tree (prim_key) also finds the next vertex to be added, so nothing is allocated in each call.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes
+		The list of vertices of the tree
+RETURNS
+	an integer
+		The cost of the minimum spanning tree.
+		The tree itself is left in prim_parent: for every vertex v of the list but the last one,
+		(v, prim_parent[v]) is an edge of the tree. The first N entries of prim_order are the vertices
+		in the order they joined the tree.
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		edge_weight
+	TO WRITE:
+		prim_key
+		prim_parent
+		prim_pending
+		prim_order
+'''
+def primMST(context, list_nodes):
+	edge_weight = context.edge_weight
+
+	num_nodes = len(list_nodes)
+	if num_nodes <= 1:
+		return 0
+
+	key = context.prim_key
+	parent = context.prim_parent
+	pending = context.prim_pending
+	order = context.prim_order
+
+	root = list_nodes[-1]
+	order[0] = root
+	weights_from_root = edge_weight[root]
+	best_key = float('inf')
+	best_index = 0
+	for i in xrange(num_nodes - 1):
+		vertex = list_nodes[i]
+		pending[i] = vertex
+		key[vertex] = weights_from_root[vertex]
+		parent[vertex] = root
+		if key[vertex] < best_key:
+			best_key = key[vertex]
+			best_index = i
+	# END FOR
+
+	num_pending = num_nodes - 1
+	tree_cost = 0
+
+	while num_pending > 0:
+
+		# Adds to the tree the vertex with the cheapest edge to the tree
+		new_vertex = pending[best_index]
+		tree_cost = tree_cost + best_key
+		num_pending = num_pending - 1
+		pending[best_index] = pending[num_pending]
+		order[num_nodes - 1 - num_pending] = new_vertex
+
+		# Updates the cheapest edges with the edges of the new vertex,
+		# looking for the next vertex to be added at the same time
+		weights_from_new_vertex = edge_weight[new_vertex]
+		best_key = float('inf')
+		for i in xrange(num_pending):
+			vertex = pending[i]
+			vertex_key = key[vertex]
+			if weights_from_new_vertex[vertex] < vertex_key:
+				vertex_key = weights_from_new_vertex[vertex]
+				key[vertex] = vertex_key
+				parent[vertex] = new_vertex
+			if vertex_key < best_key:
+				best_key = vertex_key
+				best_index = i
+		# END FOR
+	# END WHILE
+
+	return tree_cost
+
+'''
+CONSTANTS
+	HELD_KARP_ROOT_ITERATIONS
+	HELD_KARP_NODE_ITERATIONS
+	HELD_KARP_CHILD_ITERATIONS
+DESCRIPTION:
+	The number of subgradient iterations done by heldKarpBound for the root of the permutation tree
+	(starting with all penalties zero), for a node whose children are being bounded (starting with the
+	penalties of its parent) and for each child (starting with the penalties of the node).
 '''
+HELD_KARP_ROOT_ITERATIONS = 100
+HELD_KARP_NODE_ITERATIONS = 10
+HELD_KARP_CHILD_ITERATIONS = 5
+
+'''
+CONSTANTS
+	HELD_KARP_ROOT_STEP
+	HELD_KARP_WARM_STEP
+	HELD_KARP_STEP_DECAY
+DESCRIPTION:
+	The step of the subgradient ascent is
+		lambda * (upper bound - lagrangian bound) / (sum of the squares of the subgradient)
+	where lambda starts as HELD_KARP_ROOT_STEP from zero penalties or as HELD_KARP_WARM_STEP
+	from the penalties of another node, and is multiplied by HELD_KARP_STEP_DECAY at every iteration.
+'''
+HELD_KARP_ROOT_STEP = 2.0
+HELD_KARP_WARM_STEP = 0.5
+HELD_KARP_STEP_DECAY = 0.9
 
 '''
 FUNCTION
-	bruteForceWithPrunning
+	heldKarpBound
 DESCRIPTION:
-	This is a recursive function.
-	Runs the brute force of all permutations starting in a already defined partial permutation.
-	This partial permutation is defined by the parameters: visited, to_be_visited and cost_so_far
-	This function generates the rest of the permutations missing, and stores in the global variables
-	min_cost_so_far and min_path_so_far any permutation that has a lower cost than the values previously
-	present in those variables.
+	The Held-Karp lower bound: a lagrangian relaxation of the tree of minimumTreeBound.
+	The rest of any permutation is a path that leaves the last vertex, visits every vertex of the set S of
+	vertices to be visited and goes back to the first vertex: each vertex of S has exactly two edges in it.
+	Given a penalty p[v] for every vertex v of S, the weight of every edge (u, v) is increased by p[u] + p[v]
+	(p is zero for the first and last vertices) and the tree of minimumTreeBound (the minimum spanning tree
+	of S and the cheapest edges from the first and from the last vertex to S) is computed with those weights.
+	Its cost minus 2 * sum(p) is a lower bound for the rest of the permutation, whatever the penalties are.
+	The penalties are tuned by subgradient ascent: the penalty of the vertices with more than two edges in
+	the tree goes up and the penalty of the leaves goes down, towards a tree that is itself a path.
+
+	All the children of a node are bounded one after the other. The first time a child of a node is bounded,
+	the penalties of the node itself are tuned (HELD_KARP_NODE_ITERATIONS) starting from the penalties
+	of its parent, and kept in the slot of the depth of the node of the per-depth arrays below.
+	Then, each child only does HELD_KARP_CHILD_ITERATIONS starting from the penalties of the node.
+	The slot of a depth is identified by the bitmask of the set of vertices to be visited of the node.
+	The ascent stops as soon as the child can be prunned, and the bound is rounded up, since all the
+	costs are integers.
+	The root of the permutation tree has no parent to tune penalties for: it gets the bound of minimumTreeBound.
 PARAMETERS:
+	context
+		The SearchContext of the search
 	list_nodes_visited
 		The list of visited vertices so far in that partial permutation
 	list_nodes_to_be_visited
 		The list of vertices that have not been visited yet in that partial permutation
 	cost_so_far
 		The cost so far of the edges that connect the vertices in that partial permutation
-	lowerBoundFunction
-		The lower bound function to be used. This function should receive as parameters the following:
-				list_nodes_visited
-					The list of visited vertices so far in that partial permutation
-				list_nodes_to_be_visited
-					The list of vertices that have not been visited yet in that partial permutation
-				cost_so_far
-					The cost so far of the edges that connect the vertices in that partial permutation
 RETURNS
-	<nothing>
-GLOBAL VARIABLES USED:
+	an integer
+		The best lower bound found by the subgradient ascent
+CONTEXT ATTRIBUTES USED:
 	TO READ:
-		EDGE_WEIGHT
-	TO WRITE:
+		edge_weight
+		vertex_bit
 		min_cost_so_far
-		min_path_so_far
-		num_leaves_visited_so_far
+	TO WRITE:
+		held_karp_mask_at_depth
+		held_karp_penalty_at_depth
+		held_karp_penalty
 '''
-MAX_COUNT = 20000
-COUNT = 0
-def bruteForceWithPrunning( list_nodes_visited,
-							list_nodes_to_be_visited,
-							cost_so_far,
-							lowerBoundFunction):
-
-	# Global variables potentially writen in this function.
-	global min_cost_so_far
-	global min_path_so_far
-	global num_leaves_visited_so_far
-	global COUNT
+def heldKarpBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+	edge_weight = context.edge_weight
+	vertex_bit = context.vertex_bit
 
-	time_elapsed_in_seconds = time.time() - start_time_in_seconds
-	if(time_elapsed_in_seconds > TIME_TO_RUN_ALGORITHM_IN_SECONDS):
-		file_out = open(PATH_OUTPUT_FILE,"a")
-		file_out.write("Timeout: 1 hour executing\n")
-		file_out.close()
-		sys.exit();
+	if len(list_nodes_to_be_visited) == 0:
+		return edge_weight[list_nodes_visited[0]][list_nodes_visited[-1]] + cost_so_far
 
-	# The current node being "investigated" is the last node that has been visited
-	current_node = list_nodes_visited[-1]
+	if len(list_nodes_visited) < 2:
+		return minimumTreeBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far)
 
-	COUNT = COUNT + 1
-	if COUNT > MAX_COUNT:
-		print list_nodes_visited
-		print "Upper Bound = " + str(min_cost_so_far)
-		print "Time Elapsed (Seconds) =" + str(time_elapsed_in_seconds)
-		COUNT = 0
+	start_node = list_nodes_visited[0]
+	child_node = list_nodes_visited[-1]
+	parent_depth = len(list_nodes_visited) - 2
+	mask = sum(map(vertex_bit.__getitem__, list_nodes_to_be_visited)) + vertex_bit[child_node]
 
 	# -----------------------
-	# CASE 1) IS A LEAF (BASE CASE)
+	# THE PENALTIES OF THE PARENT ARE NOT IN ITS SLOT YET: TUNE THEM
 	# -----------------------
-	# Checks if the current node is a leaf of the permutation tree.
-	# A node is a leaf if there are no more vertices to be visited.
-	if(len(list_nodes_to_be_visited) == 0):
-
-		# cost_total is the total cost of that permutation.
-		# It is the cost_so_far added to the weight of the edge of the last node to the first node.
-		# This is necessary to conclude the cycle.
-		cost_total = cost_so_far + EDGE_WEIGHT[current_node][0]
-
-		num_leaves_visited_so_far = num_leaves_visited_so_far + 1
-
-		# If the total cost of the current permutation is better than the one we had previously,
-		# update the global variables min_cost_so_far and min_path_so_far
-		if(cost_total < min_cost_so_far):
-
-			min_cost_so_far = cost_total
-			min_path_so_far = list(list_nodes_visited)
-
-			file_out = open(PATH_OUTPUT_FILE,"a")
-			file_out.write("-----------\n")
-			file_out.write("Permutation = " + str(min_path_so_far) + "\n")
-			file_out.write("Cost = " + str(min_cost_so_far) + "\n")
-			file_out.write("Time Elapsed (seconds) = " + str(time_elapsed_in_seconds) + "\n")
-			file_out.close()
-
-			min_x = min(CITIES, key = lambda t: t[1])[1]
-			min_y = min(CITIES, key = lambda t: t[2])[2]
-			max_x = max(CITIES, key = lambda t: t[1])[1]
-			max_y = max(CITIES, key = lambda t: t[2])[2]
-			max_d = max(max_x - min_x, max_y - min_y)
-			image = numpy.zeros( (1200, 1200) )
-			for city in CITIES:
-				rr, cc = skimage.draw.circle( 100+int((city[1] - min_x)*1000/max_d), 100+int((city[2] - min_y)*1000/max_d), 5)
-				image[rr, cc] = 1
-			for  i in xrange(1,NUM_VERTICES):
-				city_end = CITIES[list_nodes_visited[i]]
-				city_start = CITIES[list_nodes_visited[i-1]]
-				rr, cc = skimage.draw.line(100+int((city_start[1] - min_x)*1000/max_d), 100+int((city_start[2] - min_y)*1000/max_d), 100+int((city_end[1] - min_x)*1000/max_d), 100+int((city_end[2] - min_y)*1000/max_d))
-				image[rr, cc] = 1
-			city_end = CITIES[list_nodes_visited[NUM_VERTICES-1]]
-			city_start = CITIES[list_nodes_visited[0]]
-			rr, cc = skimage.draw.line(100+int((city_start[1] - min_x)*1000/max_d), 100+int((city_start[2] - min_y)*1000/max_d), 100+int((city_end[1] - min_x)*1000/max_d), 100+int((city_end[2] - min_y)*1000/max_d))
-			image[rr, cc] = 1
-			image = 1.0 - image
-			skimage.io.imsave(PATH_OUTPUT_FILE+str(min_cost_so_far)+".png",image)
-
-
+	if context.held_karp_mask_at_depth[parent_depth] != mask:
+		context.held_karp_mask_at_depth[parent_depth] = mask
+
+		parent_penalty = context.held_karp_penalty_at_depth[parent_depth]
+		list_nodes_to_be_visited.append(child_node)
+		if parent_depth == 0:
+			for vertex in list_nodes_to_be_visited:
+				parent_penalty[vertex] = 0.0
+			iterations = HELD_KARP_ROOT_ITERATIONS
+			step = HELD_KARP_ROOT_STEP
+		else:
+			grandparent_penalty = context.held_karp_penalty_at_depth[parent_depth - 1]
+			for vertex in list_nodes_to_be_visited:
+				parent_penalty[vertex] = grandparent_penalty[vertex]
+			iterations = HELD_KARP_NODE_ITERATIONS
+			step = HELD_KARP_WARM_STEP
 		# END IF
-		return
-	#END IF
+
+		heldKarpAscent(	context,
+						start_node,
+						list_nodes_visited[-2],
+						list_nodes_to_be_visited,
+						parent_penalty,
+						context.min_cost_so_far - cost_so_far + edge_weight[list_nodes_visited[-2]][child_node],
+						iterations,
+						step)
+		list_nodes_to_be_visited.pop()
+	# END IF
 
 	# -----------------------
-	# CASE 2) IS NOT A LEAF (RECURSION)
+	# BOUND OF THE CHILD
 	# -----------------------
-	# The current partial permutation is NOT a leaf:
-	else:
+	penalty = context.held_karp_penalty
+	parent_penalty = context.held_karp_penalty_at_depth[parent_depth]
+	for vertex in list_nodes_to_be_visited:
+		penalty[vertex] = parent_penalty[vertex]
+
+	bound_of_the_rest = heldKarpAscent(	context,
+										start_node,
+										child_node,
+										list_nodes_to_be_visited,
+										penalty,
+										context.min_cost_so_far - cost_so_far,
+										HELD_KARP_CHILD_ITERATIONS,
+										HELD_KARP_WARM_STEP)
+
+	lower_bound = cost_so_far + int(math.ceil(bound_of_the_rest - 1e-6))
+	return lower_bound
 
-		# -----------------------
-		# STEP 1: SORT THE LIST OF CHILDREN BY LOWERBOUND (DESCENDING ORDER)
-		# -----------------------
+'''
+FUNCTION
+	heldKarpAscent
+DESCRIPTION:
+	Subgradient ascent on the penalties of the lagrangian bound of heldKarpBound.
+	Stops after the given number of iterations, when the tree is a path (the bound is then the cost of
+	the cheapest path, and cannot be improved) or when the bound reaches the upper bound.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	start_node
+		The first vertex of the partial permutation
+	end_node
+		The last vertex of the partial permutation
+	list_nodes
+		The list of vertices to be visited (the set S). Should not be empty.
+	penalty
+		An array indexed by vertex with the penalties of the vertices of S.
+		The penalties are updated in place.
+	upper_bound
+		The cost of the best path from end_node to start_node through S found so far (possibly infinite)
+	iterations
+		The maximum number of iterations
+	step
+		The initial value of lambda
+RETURNS
+	a float
+		The best lagrangian bound found
+CONTEXT ATTRIBUTES USED:
+	TO WRITE:
+		held_karp_degree
+'''
+def heldKarpAscent(context, start_node, end_node, list_nodes, penalty, upper_bound, iterations, step):
 
-		# We will store in this array tuples (child, lower bound) where
-		# child will be every child of the current node and
-		# lower bound will the lower bound of that child 
-		list_tuples_unordered = []
-
-		# Iterates through every child
-		# Specifically, iterates N times, where N is the number of children
-		for i in xrange(len(list_nodes_to_be_visited)):
-
-			# Picks the first child of the list of nodes to be visited. This is our child node.
-			# Also, to generate the list of nodes visited for that child, appends the child node to
-			# the list of nodes visited of the current node.
-			child_node = list_nodes_to_be_visited.pop(0) 	# pop front
-			list_nodes_visited.append(child_node) 			# push back
-
-			# The cost of the partial permutation of the child will be the cost so far added to the edge
-			# that connect the current node to the child.
-			# Then, we can just call the lowerBound Funcion provided.
-			cost_of_that_child = cost_so_far + EDGE_WEIGHT[current_node][child_node]
-
-			lower_bound_of_that_child = lowerBoundFunction( 	list_nodes_visited, 
-																list_nodes_to_be_visited,
-																cost_of_that_child)
-			
-			# Now, we need to recover the list of nodes to be visited and the list of nodes already visited.
-			# Since we are picking children from the front of the list to be visited, we can just
-			# push the already iterated child to the back of the list, like a QUEUE
-			# Also, since we pushed the child in the back of the list already visited,
-			# we can just pop the child out of the list, like a STACK
-			list_nodes_to_be_visited.append(child_node) # push back
-			list_nodes_visited.pop() 					# pop back
-
-			# Concatenated the new tuple to the list of tuples
-			list_tuples_unordered.append( (child_node,lower_bound_of_that_child) )
+	degree = context.held_karp_degree
+	best_bound = float('-inf')
 
-		# END FOR
+	for iteration in xrange(iterations):
 
-		# Sort the list of tuples by the second entry, that is the lower bound.
-		# Also, make sure it is reversed, so we have higher lower bounds first.
-		list_tuples_ordered = list((sorted(	list_tuples_unordered, key=lambda tupleChildLowerBound: tupleChildLowerBound[1])))
+		bound = heldKarpOneTree(context, start_node, end_node, list_nodes, penalty, degree)
+		if bound > best_bound:
+			best_bound = bound
+		if best_bound >= upper_bound:
+			break
 
-		# -----------------------
-		# STEP 2: ITERATE THROUGH SORTED CHILDREN, POSSIBLY PRUNNING SUB-TREES
-		# -----------------------
+		norm = 0
+		for vertex in list_nodes:
+			norm = norm + (degree[vertex] - 2) * (degree[vertex] - 2)
+		if norm == 0:
+			break
 
-		# Iterates through every tuple previously obtained and sorted
-		for tuple_element in list_tuples_ordered:
+		if upper_bound < float('inf'):
+			distance_to_target = upper_bound - bound
+		else:
+			distance_to_target = 0.05 * abs(bound) + 1
+		scale = step * distance_to_target / norm
+		for vertex in list_nodes:
+			penalty[vertex] = penalty[vertex] + scale * (degree[vertex] - 2)
+		step = step * HELD_KARP_STEP_DECAY
+	# END FOR
 
-			# Recovers the members of the tuple: the child and its lower bound
-			child_node, lower_bound_of_that_child = tuple_element
+	return best_bound
 
-			# To build the lists of nodes visited and to be visited of the child,
-			# we remove that child from the list to be visited
-			# and add it to the end the list of nodes already visited
-			list_nodes_to_be_visited.remove(child_node) 	# removes the first (and only) occurence of child_node
-			list_nodes_visited.append(child_node) 			# push back
+'''
+FUNCTION
+	heldKarpOneTree
+DESCRIPTION:
+	Computes the tree of minimumTreeBound with the weights modified by the penalties (see heldKarpBound),
+	with Prim's algorithm over the same buffers of primMST.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	start_node
+		The first vertex of the partial permutation
+	end_node
+		The last vertex of the partial permutation
+	list_nodes
+		The list of vertices to be visited (the set S). Should not be empty.
+	penalty
+		An array indexed by vertex with the penalties of the vertices of S
+	degree
+		An array indexed by vertex where the number of edges of each vertex of S in the tree is written
+RETURNS
+	a float
+		The cost of the tree with the modified weights minus twice the sum of the penalties
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		edge_weight
+	TO WRITE:
+		prim_key
+		prim_parent
+		prim_pending
+'''
+def heldKarpOneTree(context, start_node, end_node, list_nodes, penalty, degree):
+
+	edge_weight = context.edge_weight
+
+	key = context.prim_key
+	pending = context.prim_pending
+	parent = context.prim_parent
+	num_nodes = len(list_nodes)
+
+	# Cheapest modified edges from the first and from the last vertex to S
+	weights_from_start = edge_weight[start_node]
+	weights_from_end = edge_weight[end_node]
+	best_start = float('inf')
+	best_end = float('inf')
+	penalty_sum = 0.0
+	for vertex in list_nodes:
+		degree[vertex] = 0
+		penalty_of_vertex = penalty[vertex]
+		penalty_sum = penalty_sum + penalty_of_vertex
+		if weights_from_start[vertex] + penalty_of_vertex < best_start:
+			best_start = weights_from_start[vertex] + penalty_of_vertex
+			best_start_node = vertex
+		if weights_from_end[vertex] + penalty_of_vertex < best_end:
+			best_end = weights_from_end[vertex] + penalty_of_vertex
+			best_end_node = vertex
+	# END FOR
+	degree[best_start_node] = degree[best_start_node] + 1
+	degree[best_end_node] = degree[best_end_node] + 1
+
+	# Prim's algorithm from the last vertex of S, with the modified weights
+	root = list_nodes[-1]
+	weights_from_root = edge_weight[root]
+	penalty_of_root = penalty[root]
+	best_key = float('inf')
+	best_index = 0
+	for i in xrange(num_nodes - 1):
+		vertex = list_nodes[i]
+		pending[i] = vertex
+		key[vertex] = weights_from_root[vertex] + penalty_of_root + penalty[vertex]
+		parent[vertex] = root
+		if key[vertex] < best_key:
+			best_key = key[vertex]
+			best_index = i
+	# END FOR
 
-			# DO THE PRUNNING
-			# We will only continue with the permutations by descending into the child if the lower bound
-			# of that child is smaller (or equal) the upper bound so far, that is the cost
-			# of the best permutation found so far.
-			# That is, if the lower bound of that child is greater than the upper bound that we have,
-			# there is no point in continuing to descend in that branch.
-			if(lower_bound_of_that_child < min_cost_so_far):
+	num_pending = num_nodes - 1
+	tree_cost = best_start + best_end
+
+	while num_pending > 0:
+
+		new_vertex = pending[best_index]
+		tree_cost = tree_cost + best_key
+		degree[new_vertex] = degree[new_vertex] + 1
+		degree[parent[new_vertex]] = degree[parent[new_vertex]] + 1
+		num_pending = num_pending - 1
+		pending[best_index] = pending[num_pending]
+
+		weights_from_new_vertex = edge_weight[new_vertex]
+		penalty_of_new_vertex = penalty[new_vertex]
+		best_key = float('inf')
+		for i in xrange(num_pending):
+			vertex = pending[i]
+			vertex_key = key[vertex]
+			weight = weights_from_new_vertex[vertex] + penalty_of_new_vertex + penalty[vertex]
+			if weight < vertex_key:
+				vertex_key = weight
+				key[vertex] = vertex_key
+				parent[vertex] = new_vertex
+			if vertex_key < best_key:
+				best_key = vertex_key
+				best_index = i
+		# END FOR
+	# END WHILE
 
-				cost_of_that_child = cost_so_far + EDGE_WEIGHT[current_node][child_node]
+	return tree_cost - 2 * penalty_sum
 
-				bruteForceWithPrunning(		list_nodes_visited, 
-											list_nodes_to_be_visited, 
-											cost_of_that_child, 
-											lowerBoundFunction)
+'''
+FUNCTION
+	qRouteLowerBound
+DESCRIPTION:
+	This function returns the cost of a path that starts on vertex zero, follows the
+	permutation path until the last vertex of the list_nodes_visited, goes to a vertex in the list_nodes_to_be_visited,
+	does a q-route including only vertices of list_nodes_to_be_visited, and goes back
+	to vertex number zero.
 
-			# END IF
+	This function returns the size of the smallest of those paths.
 
-			# To recover the list of nodes visited and to be visited of the current node,
-			# we undo the changes made before.
-			# We add the child of the nodes to be visited to end of its list
-			# and remove it from the nodes already visited
-			# (from the end, since we added to the end, like a STACK)
-			list_nodes_to_be_visited.append(child_node) 	# push back
-			list_nodes_visited.pop() 						# pop back
+	A q-route is a walk with a given number of vertices, which may repeat vertices. Since the
+	rest of any permutation is one of those walks (with N = len(list_nodes_to_be_visited) vertices),
+	the cheapest walk is a lower bound (see qRoute).
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in that partial permutation
+	list_nodes_to_be_visited
+		The list of vertices that have not been visited yet in that partial permutation
+	cost_so_far
+		The cost so far of the edges that connect the vertices in that partial permutation
+RETURNS
+	an integer
+		The size of the smallest of the paths described in the description
+CONTEXT ATTRIBUTES USED:
+	(the ones of qRoute)
+'''
+def qRouteLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+	return qRoute(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, False)
 
-	return
+'''
+FUNCTION
+	qRouteNoTwoCycleLowerBound
+DESCRIPTION:
+	The same of qRouteLowerBound, but the walks never go from a vertex u to a vertex v and straight back to u,
+	which no permutation does. Costs about twice as much, but is never lower than qRouteLowerBound.
+PARAMETERS:
+	(the same of qRouteLowerBound)
+RETURNS
+	an integer
+		The lower bound
+CONTEXT ATTRIBUTES USED:
+	(the ones of qRoute)
+'''
+def qRouteNoTwoCycleLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+	return qRoute(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, True)
 
 '''
 FUNCTION
-	initBruteForceWithPrunning
+	qRoute
 DESCRIPTION:
-	This is the first call of a recursive function.
-	Starts the brute force algorithm with the prunning on the first node (node zero) of the complete graph.
+	Let S be the set of vertices to be visited, N its size, and q_k(v) the cost of the cheapest walk that starts
+	at the vertex v of S, visits k vertices of S in total (not necessarily different) and ends at vertex zero:
+		q_1(v) = edge_weight[v][0]
+		q_k+1(v) = min over the vertices u of S, u != v, of edge_weight[v][u] + q_k(u)
+	Each step is one min-plus product of the submatrix of S by the vector q_k, computed by numpy.
+	The bound is cost_so_far + min over the vertices v of S of edge_weight[last][v] + q_N(v).
+	Every weight is read in the direction the walk goes, so the bound also holds on asymmetric graphs.
+
+	Excluding the 2-cycles (walks u, v, u), q_k(v) keeps also the second vertex of its cheapest walk, next_k(v),
+	and the cheapest walk whose second vertex is another one, q2_k(v). Then q_k+1(v) uses, for each u,
+	q2_k(u) instead of q_k(u) if next_k(u) is v.
 PARAMETERS:
-	lowerBoundFunction
-		The lower bound function to be used. This function should receive as parameters the following:
-				list_nodes_visited
-					The list of visited vertices so far in that partial permutation
-				list_nodes_to_be_visited
-					The list of vertices that have not been visited yet in that partial permutation
-				cost_so_far
-					The cost so far of the edges that connect the vertices in that partial permutation
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in that partial permutation
+	list_nodes_to_be_visited
+		The list of vertices that have not been visited yet in that partial permutation
+	cost_so_far
+		The cost so far of the edges that connect the vertices in that partial permutation
+	exclude_two_cycles
+		True to exclude the 2-cycles
 RETURNS
-	<nothing>
-GLOBAL VARIABLES USED:
+	an integer
+		The lower bound
+CONTEXT ATTRIBUTES USED:
 	TO READ:
-		NUM_VERTICES
-		EDGE_WEIGHT
+		edge_weight
+		q_route_weights
+		q_route_positions
 	TO WRITE:
-		min_cost_so_far
-		min_path_so_far
-		num_leaves_visited_so_far
+		q_route_index
+		q_route_rows
+		q_route_submatrix
+		q_route_sums
+		q_route_value
+		q_route_second_value
+		q_route_next
 '''
-def initBruteForceWithPrunning(cities, costMatrix, lowerBoundFunction, output_file):
+def qRoute(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, exclude_two_cycles):
 
-	# Global variables potentially writen in this function.
-	global min_cost_so_far
-	global min_path_so_far
-	global num_leaves_visited_so_far
-	global EDGE_WEIGHT
-	global NUM_VERTICES
-	global PATH_OUTPUT_FILE
-	global CITIES
-	global start_time_in_seconds
+	start_node = list_nodes_visited[0]
+	last_vertex_in_permutation = list_nodes_visited[-1]
+	num_vertices_to_be_visited = len(list_nodes_to_be_visited)
 
-	print("Algorithm started...")
-	start_time_in_seconds = time.time()
+	if num_vertices_to_be_visited == 0:
+		return cost_so_far + context.edge_weight[last_vertex_in_permutation][start_node]
+	# END IF
 
-	CITIES = cities
-	PATH_OUTPUT_FILE = output_file
-	EDGE_WEIGHT = costMatrix
-	NUM_VERTICES = len(costMatrix)
+	n = num_vertices_to_be_visited
+	index = context.q_route_index[:n]
+	index[:] = list_nodes_to_be_visited
+	rows = context.q_route_rows[:n * context.num_vertices].reshape(n, context.num_vertices)
+	submatrix = context.q_route_submatrix[:n * n].reshape(n, n)
+	sums = context.q_route_sums[:n * n].reshape(n, n)
+	q_value = context.q_route_value[:n]
+	second_value = context.q_route_second_value[:n]
+	next_vertex = context.q_route_next[:n]
+	positions = context.q_route_positions[:n]
 
-	file_out = open(PATH_OUTPUT_FILE,"w")
-	file_out.write("BEST PERMUTATIONS FOUND SO FAR\n")
-	file_out.close()
+	numpy.take(context.q_route_weights, index, axis=0, out=rows)
+	numpy.take(rows, index, axis=1, out=submatrix)
 
-	# For the beginning, only node zero, the root, has already been visited
-	list_nodes_visited = [0]
+	# q-routes with a single vertex: straight back to the start
+	q_value[:] = rows[:, start_node]
 
-	# All the other nodes have not been visited yet.
-	# For that, we iterate through all of them, adding them to this list.
-	list_nodes_to_be_visited = []
-	for i in xrange(1,NUM_VERTICES):
-		list_nodes_to_be_visited.append(i)
-	# END FOR
+	for k in xrange(num_vertices_to_be_visited - 1):
 
-	# The permutation with only the vertex zero has no cost
-	cost_initial_partial_permutation = 0
+		numpy.add(submatrix, q_value, out=sums)
 
-	# Initialize Global Variables
-	min_cost_so_far = float('inf')
-	num_leaves_visited_so_far = 0
-	min_path_so_far = []
+		if not exclude_two_cycles:
+			numpy.min(sums, axis=1, out=q_value)
+			continue
+		# END IF
 
-	# Starts the recursion
-	bruteForceWithPrunning( 	list_nodes_visited,
-								list_nodes_to_be_visited,
-								cost_initial_partial_permutation,
-								lowerBoundFunction);
+		# Going from v to u, u cannot go back to v (next_k(u) = v): uses the second cheapest q-route of u
+		if k > 0:
+			sums[next_vertex, positions] = submatrix[next_vertex, positions] + second_value
 
-	time_elapsed_in_seconds = time.time() - start_time_in_seconds
+		numpy.argmin(sums, axis=1, out=next_vertex)
+		q_value[:] = sums[positions, next_vertex]
+		sums[positions, next_vertex] = numpy.inf
+		numpy.min(sums, axis=1, out=second_value)
+	# END FOR
 
-	file_out = open(PATH_OUTPUT_FILE,"a")
-	file_out.write("Search end in " + str(time_elapsed_in_seconds) + "s\n")
-	file_out.close()
+	smallest_q_route = numpy.min(context.q_route_weights[last_vertex_in_permutation, index] + q_value)
 
+	lower_bound = cost_so_far + int(smallest_q_route)
 
-def reportNumberPermutations():
-	return math.factorial(NUM_VERTICES-1)
+	return lower_bound
+
+'''
+FUNCTION
+	buildEdgeIndex
+DESCRIPTION:
+	Builds the edge index of edge_weight, in O(N^2 log N) (sorted by numpy).
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+		edge_weight_array
+	TO WRITE:
+		sorted_edge_weight_prefix_sum
+		sorted_neighbours
+'''
+def buildEdgeIndex(context):
 
-def reportLowestCost():
-	return min_cost_so_far
+	# The edges {i, j} with i < j, sorted by numpy
+	weights = context.edge_weight_array
+	rows, columns = numpy.triu_indices(context.num_vertices, 1)
+	edge_costs = numpy.sort(numpy.minimum(weights[rows, columns], weights[columns, rows]))
 
-def reportLowestCostPath():
-	return min_path_so_far
+	# A list of Python numbers, so the bounds built from it are not numpy scalars
+	context.sorted_edge_weight_prefix_sum = [0] + numpy.cumsum(edge_costs).tolist()
 
-def reportNumberOfLeavesVisisted():
-	return num_leaves_visited_so_far
+	# A vertex is sorted last in its own row (its weight made infinite), and dropped.
+	# Kept as an int32 array, a small fraction of the memory of a list of lists.
+	row_weights = numpy.array(weights, dtype=numpy.float64)
+	numpy.fill_diagonal(row_weights, numpy.inf)
+	context.sorted_neighbours = numpy.argsort(row_weights, axis=1, kind='mergesort')[:, :-1].astype(numpy.int32)
 
-def reportPruningPercentage():
-	number_of_possible_permutations = math.factorial(NUM_VERTICES-1)
-	return (1.0 - float(num_leaves_visited_so_far)/float(number_of_possible_permutations))*100.0
 '''
-=============================================================================
+FUNCTION
+	allocateLowerBoundBuffers
+DESCRIPTION:
+	Allocates the buffers used by the lower bound functions for a graph of num_vertices vertices.
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+	TO WRITE:
+		vertex_bit
+		prim_key
+		prim_parent
+		prim_pending
+		prim_order
+		tree_mask_at_depth
+		tree_cost_at_depth
+		tree_order_at_depth
+		tree_parent_at_depth
+		tree_degree_at_depth
+		tree_start_edges_at_depth
+		tree_side
+		held_karp_mask_at_depth
+		held_karp_penalty_at_depth
+		held_karp_penalty
+		held_karp_degree
+		q_route_weights
+		q_route_index
+		q_route_rows
+		q_route_submatrix
+		q_route_sums
+		q_route_value
+		q_route_second_value
+		q_route_next
+		q_route_positions
+		batched_position
+'''
+def allocateLowerBoundBuffers(context):
+
+	num_vertices = context.num_vertices
+
+	context.vertex_bit = [1 << vertex for vertex in xrange(num_vertices)]
+
+	context.prim_key = [0] * num_vertices
+	context.prim_parent = [0] * num_vertices
+	context.prim_pending = [0] * num_vertices
+	context.prim_order = [0] * num_vertices
+
+	context.tree_mask_at_depth = [0] * num_vertices
+	context.tree_cost_at_depth = [0] * num_vertices
+	context.tree_order_at_depth = [[0] * num_vertices for depth in xrange(num_vertices)]
+	context.tree_parent_at_depth = [[0] * num_vertices for depth in xrange(num_vertices)]
+	context.tree_degree_at_depth = [[0] * num_vertices for depth in xrange(num_vertices)]
+	context.tree_start_edges_at_depth = [[0, 0, 0] for depth in xrange(num_vertices)]
+	context.tree_side = [0] * num_vertices
+
+	context.held_karp_mask_at_depth = [0] * num_vertices
+	context.held_karp_penalty_at_depth = [[0.0] * num_vertices for depth in xrange(num_vertices)]
+	context.held_karp_penalty = [0.0] * num_vertices
+	context.held_karp_degree = [0] * num_vertices
+
+	context.q_route_weights = context.edge_weight_array.astype(numpy.float64)
+	numpy.fill_diagonal(context.q_route_weights, numpy.inf)
+	context.q_route_index = numpy.zeros(num_vertices, dtype=numpy.intp)
+	context.q_route_rows = numpy.zeros(num_vertices * num_vertices)
+	context.q_route_submatrix = numpy.zeros(num_vertices * num_vertices)
+	context.q_route_sums = numpy.zeros(num_vertices * num_vertices)
+	context.q_route_value = numpy.zeros(num_vertices)
+	context.q_route_second_value = numpy.zeros(num_vertices)
+	context.q_route_next = numpy.zeros(num_vertices, dtype=numpy.intp)
+	context.q_route_positions = numpy.arange(num_vertices)
+	context.batched_position = numpy.zeros(num_vertices, dtype=numpy.intp)
+
+'''
+=============================================================================
+BATCHED LOWER BOUNDS
+=============================================================================
+A batched lower bound computes the lower bounds of all the children of a node in a single call, with numpy:
+it receives the node and the list of its children to be bounded, and returns a numpy array with the lower
+bound of each child, which bruteForceWithPrunning argsorts to order the children.
+The values are the same of the lower bound function called once for each child, but the python loop over the
+children is replaced by operations over arrays with one row for each child (the weights are read from
+q_route_weights). heldKarpBound has no batched version: the subgradient ascent of each child stops as soon as
+the child can be prunned.
+'''
+
+'''
+CONSTANTS
+	BATCHED_BOUNDS
+	BATCHED_BOUND_MAX_ELEMENTS
+DESCRIPTION:
+	True to bound the children with the batched version of the lower bound function, if it has one
+	(see batchedLowerBoundOf), and the maximum number of elements of the arrays of the children bounded together:
+	the children of a node with many vertices to be visited are bounded in chunks, so the memory stays bounded.
+'''
+BATCHED_BOUNDS = True
+BATCHED_BOUND_MAX_ELEMENTS = 1 << 20
+
+'''
+ATTRIBUTE OF SearchContext
+	batched_bounds
+DESCRIPTION:
+	True to use the batched lower bounds in this search (BATCHED_BOUNDS by default)
+'''
+
+'''
+FUNCTION
+	batchedZeroLowerBound
+DESCRIPTION:
+	zeroLowerBound for all the children of a node
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in the partial permutation of the node
+	list_nodes_to_be_visited
+		The list of vertices that have not been visited yet in the partial permutation of the node
+	cost_so_far
+		The cost so far of the edges that connect the vertices in the partial permutation of the node
+	children
+		The children to be bounded: a non-empty list of vertices of list_nodes_to_be_visited
+RETURNS
+	a numpy array
+		The lower bound of each child, in the order of children
+'''
+def batchedZeroLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children):
+	return numpy.zeros(len(children))
+
+'''
+FUNCTION
+	batchedSumMinEdgesBound
+DESCRIPTION:
+	sumMinEdgesBound for all the children of a node: every child has one vertex less to be visited,
+	so they all add the same sum of the cheapest edges to the cost of their partial permutation.
+PARAMETERS:
+	(the same of batchedZeroLowerBound)
+RETURNS
+	a numpy array
+		The lower bound of each child, in the order of children
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		sorted_edge_weight_prefix_sum
+		q_route_weights
+'''
+def batchedSumMinEdgesBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children):
+
+	num_edges = min(len(list_nodes_to_be_visited), len(context.sorted_edge_weight_prefix_sum) - 1)
+
+	return cost_so_far + context.sorted_edge_weight_prefix_sum[num_edges] + context.q_route_weights[list_nodes_visited[-1], children]
+
+'''
+FUNCTION
+	batchedMinimumTreeBound
+DESCRIPTION:
+	minimumTreeBound (and incrementalMinimumTreeBound) for all the children of a node, on symmetric graphs.
+	Let S be the set of vertices to be visited of the node. Prim's algorithm runs once for all the children,
+	on a matrix of cheapest edges to the tree with one row for each child: the row of the child c grows the
+	minimum spanning tree of S without c, so each step adds one vertex to the tree of every child.
+	The cheapest edge from the first vertex to S without c is the cheapest one to S, unless it goes to c,
+	and the cheapest edge from c to the rest of S is the minimum of the row of c in the submatrix of S.
+PARAMETERS:
+	(the same of batchedZeroLowerBound)
+RETURNS
+	a numpy array
+		The lower bound of each child, in the order of children
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		q_route_weights
+	TO WRITE:
+		batched_position
+'''
+def batchedMinimumTreeBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children):
+
+	start_node = list_nodes_visited[0]
+	weights = context.q_route_weights
+	cost_of_children = cost_so_far + weights[list_nodes_visited[-1], children]
+
+	n = len(list_nodes_to_be_visited)
+	if n == 1:
+		return cost_of_children + weights[children, start_node]
+	# END IF
+
+	index = numpy.array(list_nodes_to_be_visited, dtype=numpy.intp)
+	submatrix = weights[index][:, index]
+	context.batched_position[index] = numpy.arange(n)
+	removed = context.batched_position[children]
+	rows = numpy.arange(len(children))
+
+	# Cheapest edge from the first vertex to S without the child
+	weights_from_start = weights[start_node, index]
+	cheapest = numpy.argmin(weights_from_start)
+	min_start = numpy.repeat(weights_from_start[cheapest], len(children))
+	weights_from_start[cheapest] = numpy.inf
+	min_start[removed == cheapest] = numpy.min(weights_from_start)
+
+	# Cheapest edge from the child to S without the child (the diagonal is infinite)
+	min_end = numpy.min(submatrix[removed], axis=1)
+
+	# Prim's algorithm for every child at once. The tree of a child grows from the first vertex of S,
+	# or from the second one if the child is the first one. The vertices already in the tree of a child
+	# (and the child itself) have an infinite penalty, added to their cheapest edge to the tree.
+	root = (removed == 0).astype(numpy.intp)
+	penalty = numpy.zeros((len(children), n))
+	penalty[rows, removed] = numpy.inf
+	penalty[rows, root] = numpy.inf
+	key = submatrix[root]
+	key += penalty
+	tree_cost = numpy.zeros(len(children))
+
+	for step in xrange(n - 2):
+		new_vertex = key.argmin(axis=1)
+		tree_cost += key[rows, new_vertex]
+		penalty[rows, new_vertex] = numpy.inf
+		numpy.minimum(key, submatrix[new_vertex], out=key)
+		key += penalty
+	# END FOR
+
+	return cost_of_children + tree_cost + min_start + min_end
+
+'''
+FUNCTION
+	batchedQRouteLowerBound
+DESCRIPTION:
+	qRouteLowerBound for all the children of a node (see batchedQRoute)
+PARAMETERS:
+	(the same of batchedZeroLowerBound)
+RETURNS
+	a numpy array
+		The lower bound of each child, in the order of children
+CONTEXT ATTRIBUTES USED:
+	(the ones of batchedQRoute)
+'''
+def batchedQRouteLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children):
+	return batchedQRoute(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children, False)
+
+'''
+FUNCTION
+	batchedQRouteNoTwoCycleLowerBound
+DESCRIPTION:
+	qRouteNoTwoCycleLowerBound for all the children of a node (see batchedQRoute)
+PARAMETERS:
+	(the same of batchedZeroLowerBound)
+RETURNS
+	a numpy array
+		The lower bound of each child, in the order of children
+CONTEXT ATTRIBUTES USED:
+	(the ones of batchedQRoute)
+'''
+def batchedQRouteNoTwoCycleLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children):
+	return batchedQRoute(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children, True)
+
+'''
+FUNCTION
+	batchedQRoute
+DESCRIPTION:
+	qRoute for all the children of a node. Let S be the set of vertices to be visited of the node and N its size.
+	The q-routes of the child c are the ones of S without c: row c of the matrix of q_k values holds them,
+	with an infinite value at c, so no q-route of the child goes through c. Each step of the dynamic programming
+	is then a single min-plus product of the submatrix of S by that matrix (an array of sums with one N by N
+	matrix for each child). The children are bounded in chunks of BATCHED_BOUND_MAX_ELEMENTS sums.
+PARAMETERS:
+	(the same of batchedZeroLowerBound)
+	exclude_two_cycles
+		True to exclude the 2-cycles
+RETURNS
+	a numpy array
+		The lower bound of each child, in the order of children
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		q_route_weights
+	TO WRITE:
+		batched_position
+'''
+def batchedQRoute(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children, exclude_two_cycles):
+
+	start_node = list_nodes_visited[0]
+	weights = context.q_route_weights
+	cost_of_children = cost_so_far + weights[list_nodes_visited[-1], children]
+
+	n = len(list_nodes_to_be_visited)
+	if n == 1:
+		return cost_of_children + weights[children, start_node]
+	# END IF
+
+	index = numpy.array(list_nodes_to_be_visited, dtype=numpy.intp)
+	submatrix = weights[index][:, index]
+	context.batched_position[index] = numpy.arange(n)
+	removed_of_children = context.batched_position[children]
+	columns = numpy.arange(n)
+	smallest_q_route = numpy.zeros(len(children))
+
+	chunk_size = max(1, BATCHED_BOUND_MAX_ELEMENTS // (n * n))
+	for first in xrange(0, len(children), chunk_size):
+		removed = removed_of_children[first:first + chunk_size]
+		rows = numpy.arange(len(removed))
+		row_of_sum = rows[:, None]
+
+		# q-routes with a single vertex: straight back to the start
+		q_value = numpy.repeat(weights[index, start_node][None, :], len(removed), axis=0)
+		q_value[rows, removed] = numpy.inf
+
+		for k in xrange(n - 2):
+
+			# sums[c, v, u] is the weight of (v, u) plus the q-route of u of the child c
+			sums = submatrix[None, :, :] + q_value[:, None, :]
+
+			if not exclude_two_cycles:
+				q_value = numpy.min(sums, axis=2)
+				q_value[rows, removed] = numpy.inf
+				continue
+			# END IF
+
+			# Going from v to u, u cannot go back to v (next_k(u) = v): uses the second cheapest q-route of u
+			if k > 0:
+				sums[row_of_sum, next_vertex, columns] = submatrix[next_vertex, columns] + second_value
+
+			next_vertex = numpy.argmin(sums, axis=2)
+			q_value = sums[row_of_sum, columns, next_vertex]
+			sums[row_of_sum, columns, next_vertex] = numpy.inf
+			second_value = numpy.min(sums, axis=2)
+			q_value[rows, removed] = numpy.inf
+			second_value[rows, removed] = numpy.inf
+		# END FOR
+
+		# The child goes to a vertex v of S without it, and does the q-route of v
+		smallest_q_route[first:first + len(removed)] = numpy.min(submatrix[removed] + q_value, axis=1)
+	# END FOR
+
+	return cost_of_children + smallest_q_route
+
+'''
+CONSTANT
+	BATCHED_LOWER_BOUNDS
+DESCRIPTION:
+	The batched version of each lower bound function that has one, and the minimum number of vertices to be
+	visited of the nodes whose children are bounded by it. Each numpy call costs about a microsecond, whatever
+	the size of its arrays, so the children of the deepest nodes are cheaper to bound one by one, mostly with
+	the bounds that are cheap for a single child. incrementalMinimumTreeBound already reuses the tree of the node
+	for its children, so it gains only on large nodes.
+'''
+BATCHED_LOWER_BOUNDS = {
+	zeroLowerBound: (batchedZeroLowerBound, 2),
+	sumMinEdgesBound: (batchedSumMinEdgesBound, 8),
+	minimumTreeBound: (batchedMinimumTreeBound, 12),
+	incrementalMinimumTreeBound: (batchedMinimumTreeBound, 24),
+	qRouteLowerBound: (batchedQRouteLowerBound, 2),
+	qRouteNoTwoCycleLowerBound: (batchedQRouteNoTwoCycleLowerBound, 2),
+}
+
+'''
+FUNCTION
+	batchedLowerBoundOf
+DESCRIPTION:
+	The batched version of a lower bound function, to be used by the search. A function wrapped by
+	instrumentedLowerBound gets the batched version of the function it wraps, wrapped by instrumentedBatchedLowerBound.
+	batchedMinimumTreeBound is only used on symmetric graphs, since primMST grows the tree in a given direction.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	lowerBoundFunction
+		The lower bound function (see bruteForceWithPrunning)
+RETURNS
+	a tuple
+		(the batched lower bound, the minimum number of vertices to be visited of the nodes bounded by it),
+		or (None, 0) if batched_bounds is False or the function has no batched version
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		batched_bounds
+		q_route_weights
+'''
+def batchedLowerBoundOf(context, lowerBoundFunction):
+
+	wrapped_function = getattr(lowerBoundFunction, 'wrapped_function', lowerBoundFunction)
+	if not context.batched_bounds or wrapped_function not in BATCHED_LOWER_BOUNDS:
+		return None, 0
+
+	batchedLowerBound, min_vertices_to_be_visited = BATCHED_LOWER_BOUNDS[wrapped_function]
+	if batchedLowerBound is batchedMinimumTreeBound and not numpy.array_equal(context.q_route_weights, context.q_route_weights.T):
+		return None, 0
+
+	if wrapped_function is not lowerBoundFunction:
+		batchedLowerBound = instrumentedBatchedLowerBound(context, batchedLowerBound)
+	return batchedLowerBound, min_vertices_to_be_visited
+
+'''
+=============================================================================
+REPORT OF THE PERMUTATIONS FOUND
+=============================================================================
+The permutations found are written to the output file, and drawn to images, by a
+background thread (see reportWriter), so the search does not wait for the disk or
+for skimage. The search only puts the permutation in a queue.
+skimage is only imported when the first image is drawn, so the searches that draw
+no image (REPORT_IMAGES False, or no output file) do not wait for its import either.
+'''
+
+'''
+CONSTANTS
+	REPORT_MODE
+	REPORT_IMAGE_INTERVAL_IN_SECONDS
+DESCRIPTION:
+	How the permutations found are reported:
+		'every'
+			Every permutation is written and drawn
+		'throttled'
+			Every permutation is written, but at most one image is drawn every REPORT_IMAGE_INTERVAL_IN_SECONDS
+			(the image of the last permutation found is always drawn)
+		'final'
+			Only the last permutation found is written and drawn, when the search ends
+'''
+REPORT_MODE = 'throttled'
+REPORT_IMAGE_INTERVAL_IN_SECONDS = 10.0
+
+'''
+CONSTANT
+	REPORT_IMAGES
+DESCRIPTION:
+	False to only write the permutations to the output file, without drawing them
+'''
+REPORT_IMAGES = True
+
+'''
+CONSTANTS
+	IMAGE_SIZE
+	IMAGE_MARGIN
+	IMAGE_CITY_RADIUS
+DESCRIPTION:
+	The size in pixels of the images of the permutations, the margin around the cities and the radius of each city
+'''
+IMAGE_SIZE = 1200
+IMAGE_MARGIN = 100
+IMAGE_CITY_RADIUS = 5
+
+'''
+ATTRIBUTES OF SearchContext
+	report_mode
+	report_queue
+	report_thread
+DESCRIPTION:
+	How the permutations found by this search are reported (REPORT_MODE by default), the queue of the permutations
+	to be reported and the thread that reports them (None if not started)
+'''
+
+'''
+ATTRIBUTE OF SearchContext
+	city_pixels
+DESCRIPTION:
+	city_pixels[v] is the (row, column) of the city of the vertex v in the images, computed once by prepareReport.
+	None if there is nothing to draw (no coordinates, or REPORT_IMAGES False).
+'''
+
+'''
+FUNCTION
+	reportNewBestPermutation
+DESCRIPTION:
+	Reports the best permutation found so far (min_path_so_far): puts it in the queue of the thread that writes it
+	to the output file and draws it, starting the thread if needed.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	time_elapsed_in_seconds
+		The time elapsed since the beginning of the algorithm
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		output_file
+		report_mode
+		city_pixels
+		min_cost_so_far
+		min_path_so_far
+	TO WRITE:
+		report_queue
+		report_thread
+'''
+def reportNewBestPermutation(context, time_elapsed_in_seconds):
+
+	if context.output_file is None:
+		return
+
+	if context.report_thread is None:
+		context.report_queue = Queue.Queue()
+		context.report_thread = threading.Thread(	target=reportWriter,
+													args=(context.report_queue, context.output_file, context.city_pixels, context.report_mode))
+		context.report_thread.daemon = True
+		context.report_thread.start()
+	# END IF
+
+	# min_path_so_far is never changed in place (a new list is made for each permutation), so it is not copied
+	context.report_queue.put( (context.min_path_so_far, context.min_cost_so_far, time_elapsed_in_seconds) )
+
+'''
+FUNCTION
+	finishReports
+DESCRIPTION:
+	Waits until every permutation in the queue has been reported and stops the thread.
+	Should be called before writing anything else to the output file.
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO WRITE:
+		report_queue
+		report_thread
+'''
+def finishReports(context):
+
+	if context.report_thread is None:
+		return
+
+	context.report_queue.put(None)
+	context.report_thread.join()
+	context.report_queue = None
+	context.report_thread = None
+
+'''
+FUNCTION
+	reportWriter
+DESCRIPTION:
+	The body of the thread that reports the permutations.
+	Runs until it takes None from the queue.
+PARAMETERS:
+	queue
+		The queue of tuples (permutation, cost, time elapsed in seconds)
+	output_file
+		The path to the output file
+	pixels
+		The pixels of the cities (see city_pixels)
+	report_mode
+		How the permutations are reported (see REPORT_MODE)
+RETURNS
+	<nothing>
+'''
+def reportWriter(queue, output_file, pixels, report_mode):
+
+	file_out = open(output_file,"a")
+	background = None
+	not_drawn = None
+	time_of_last_image = float('-inf')
+
+	while True:
+
+		# Waits for the next permutation, or until it is time to draw the one not drawn yet
+		if not_drawn is None or report_mode == 'final':
+			item = queue.get()
+		else:
+			try:
+				item = queue.get(True, max(0.0, time_of_last_image + REPORT_IMAGE_INTERVAL_IN_SECONDS - time.time()))
+			except Queue.Empty:
+				item = not_drawn
+		# END IF
+
+		if item is None:
+			if not_drawn is not None:
+				if report_mode == 'final':
+					writePermutation(file_out, not_drawn)
+				background = drawPermutation(output_file, pixels, background, not_drawn)
+			break
+		# END IF
+
+		if item is not not_drawn:
+			if report_mode != 'final':
+				writePermutation(file_out, item)
+			not_drawn = item
+		# END IF
+
+		if report_mode == 'every' or (report_mode == 'throttled' and time.time() >= time_of_last_image + REPORT_IMAGE_INTERVAL_IN_SECONDS):
+			background = drawPermutation(output_file, pixels, background, not_drawn)
+			time_of_last_image = time.time()
+			not_drawn = None
+		# END IF
+	# END WHILE
+
+	file_out.close()
+
+'''
+FUNCTION
+	writePermutation
+DESCRIPTION:
+	Writes a permutation to the output file
+PARAMETERS:
+	file_out
+		The output file
+	item
+		A tuple (permutation, cost, time elapsed in seconds)
+RETURNS
+	<nothing>
+'''
+def writePermutation(file_out, item):
+
+	path, cost, time_elapsed_in_seconds = item
+	file_out.write("-----------\n")
+	file_out.write("Permutation = " + str(path) + "\n")
+	file_out.write("Cost = " + str(cost) + "\n")
+	file_out.write("Time Elapsed (seconds) = " + str(time_elapsed_in_seconds) + "\n")
+	file_out.flush()
+
+'''
+FUNCTION
+	drawPermutation
+DESCRIPTION:
+	Saves an image of a permutation drawn over the cities, named after the output file and the cost.
+PARAMETERS:
+	output_file
+		The path to the output file
+	pixels
+		The pixels of the cities (see city_pixels), or None to draw nothing
+	background
+		The image of the cities alone, or None if not drawn yet
+	item
+		A tuple (permutation, cost, time elapsed in seconds)
+RETURNS
+	an image
+		The image of the cities alone, to be given back as background
+'''
+def drawPermutation(output_file, pixels, background, item):
+
+	if pixels is None:
+		return background
+
+	import skimage.draw
+	import skimage.io
+
+	if background is None:
+		background = numpy.ones( (IMAGE_SIZE, IMAGE_SIZE) )
+		for row, column in pixels:
+			rr, cc = skimage.draw.circle(row, column, IMAGE_CITY_RADIUS)
+			background[rr, cc] = 0
+		# END FOR
+	# END IF
+
+	path, cost, time_elapsed_in_seconds = item
+	image = background.copy()
+	for i in xrange(len(path)):
+		row_start, column_start = pixels[path[i - 1]]
+		row_end, column_end = pixels[path[i]]
+		rr, cc = skimage.draw.line(row_start, column_start, row_end, column_end)
+		image[rr, cc] = 0
+	# END FOR
+	skimage.io.imsave(output_file+str(cost)+".png",image)
+
+	return background
+
+'''
+FUNCTION
+	projectCities
+DESCRIPTION:
+	The pixels of the cities in the images: the cities are scaled to fit IMAGE_SIZE - 2 * IMAGE_MARGIN pixels,
+	keeping their aspect ratio.
+PARAMETERS:
+	cities
+		The list of cities [id, x, y]
+	num_vertices
+		The number of vertices of the graph
+RETURNS
+	a list
+		The (row, column) of each city, or None if there are no coordinates to draw
+'''
+def projectCities(cities, num_vertices):
+
+	# Instances with explicit edge weights may have no coordinates to draw
+	if len(cities) != num_vertices or num_vertices == 0:
+		return None
+
+	min_x = min(cities, key = lambda t: t[1])[1]
+	min_y = min(cities, key = lambda t: t[2])[2]
+	max_x = max(cities, key = lambda t: t[1])[1]
+	max_y = max(cities, key = lambda t: t[2])[2]
+	max_d = max(max_x - min_x, max_y - min_y)
+	if max_d == 0:
+		return None
+
+	scale = (IMAGE_SIZE - 2 * IMAGE_MARGIN) / float(max_d)
+	return [ (IMAGE_MARGIN + int((city[1] - min_x) * scale), IMAGE_MARGIN + int((city[2] - min_y) * scale)) for city in cities ]
+
+'''
+=============================================================================
+CHECKPOINTS OF THE SEARCH
+=============================================================================
+A checkpoint is a binary file with everything needed to continue a search that was
+stopped (by the time limit or by a batch scheduler): the best permutation found so far,
+the counters and the open nodes of the permutation tree, the roots of the subtrees not
+searched yet. The subtrees of the open nodes are all the permutations not searched yet
+that may be better than the best one, so searching them (see initBruteForceWithPrunning)
+ends the same search.
+
+Every running search (there may be one inside another, as the depth first search inside
+bestFirstSearch) keeps in open_node_sources a function that lists its open nodes.
+A checkpoint is written by checkTimeLimit, every CHECKPOINT_INTERVAL_IN_SECONDS and on timeout.
+
+The file, little-endian:
+	8 bytes     CHECKPOINT_MAGIC
+	uint32      num_vertices
+	uint32      CRC-32 of edge_weight, so a checkpoint of another instance is never resumed
+	double      min_cost_so_far
+	int64       num_leaves_visited_so_far
+	double      seconds searched so far, by all the runs
+	uint32      the number of vertices of min_path_so_far (0 or num_vertices)
+	uint16 * n  min_path_so_far
+	uint64      the number of open nodes
+	and, for every open node:
+	double      lower bound
+	double      cost of the partial permutation
+	uint16      the number of vertices of the partial permutation
+	uint16 * n  the partial permutation
+'''
+
+'''
+CONSTANTS
+	CHECKPOINT_INTERVAL_IN_SECONDS
+	CHECKPOINT_MAGIC
+DESCRIPTION:
+	The time between two checkpoints, and the first bytes of every checkpoint file
+'''
+CHECKPOINT_INTERVAL_IN_SECONDS = 600.0
+CHECKPOINT_MAGIC = 'TSPCKPT1'
+
+'''
+ATTRIBUTES OF SearchContext
+	checkpoint_file
+	last_checkpoint_time_in_seconds
+	time_searched_before_in_seconds
+	open_node_sources
+DESCRIPTION:
+	The path to the checkpoint file (None for no checkpoints), the time the last checkpoint was written,
+	the seconds searched by the runs before this one (see readCheckpoint) and the functions that list the open
+	nodes of the running searches, outermost first, as tuples (function, tuple of its parameters).
+'''
+
+'''
+FUNCTION
+	writeCheckpoint
+DESCRIPTION:
+	Writes the checkpoint file. The file is written under another name and then renamed,
+	so a run stopped in the middle of the writing leaves the previous checkpoint intact.
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		checkpoint_file
+		num_vertices
+		min_cost_so_far
+		min_path_so_far
+		num_leaves_visited_so_far
+		start_time_in_seconds
+		time_searched_before_in_seconds
+		open_node_sources
+	TO WRITE:
+		last_checkpoint_time_in_seconds
+'''
+def writeCheckpoint(context):
+
+	# The innermost search is the one being searched right now: its nodes come first
+	open_nodes = []
+	for function, parameters in reversed(context.open_node_sources):
+		open_nodes.extend(function(*parameters))
+	# END FOR
+
+	time_searched_in_seconds = context.time_searched_before_in_seconds + time.time() - context.start_time_in_seconds
+
+	data = [	CHECKPOINT_MAGIC,
+				struct.pack('<IIdqdI',	context.num_vertices,
+										costMatrixChecksum(context),
+										context.min_cost_so_far,
+										context.num_leaves_visited_so_far,
+										time_searched_in_seconds,
+										len(context.min_path_so_far)),
+				struct.pack('<%dH' % len(context.min_path_so_far), *context.min_path_so_far),
+				struct.pack('<Q', len(open_nodes))]
+	for lower_bound, list_nodes_visited, cost_so_far in open_nodes:
+		data.append(struct.pack('<ddH', lower_bound, cost_so_far, len(list_nodes_visited)))
+		data.append(struct.pack('<%dH' % len(list_nodes_visited), *list_nodes_visited))
+	# END FOR
+
+	file_out = open(context.checkpoint_file + ".tmp", "wb")
+	file_out.write(''.join(data))
+	file_out.close()
+	os.rename(context.checkpoint_file + ".tmp", context.checkpoint_file)
+
+	context.last_checkpoint_time_in_seconds = time.time()
+
+'''
+FUNCTION
+	readCheckpoint
+DESCRIPTION:
+	Reads a checkpoint file written by writeCheckpoint for the same instance: keeps its best permutation
+	and counters and returns its open nodes.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	checkpoint_file
+		The path to the checkpoint file
+RETURNS
+	a list
+		The open nodes, tuples (lower bound, list of visited vertices, cost so far), in the order to be searched
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+	TO WRITE:
+		min_cost_so_far
+		min_path_so_far
+		num_leaves_visited_so_far
+		time_searched_before_in_seconds
+'''
+def readCheckpoint(context, checkpoint_file):
+
+	file_in = open(checkpoint_file, "rb")
+	data = file_in.read()
+	file_in.close()
+
+	if data[:len(CHECKPOINT_MAGIC)] != CHECKPOINT_MAGIC:
+		raise ValueError(checkpoint_file + " is not a checkpoint file")
+	offset = len(CHECKPOINT_MAGIC)
+
+	num_vertices, checksum, min_cost, num_leaves, time_searched, path_length = struct.unpack_from('<IIdqdI', data, offset)
+	offset = offset + struct.calcsize('<IIdqdI')
+	if num_vertices != context.num_vertices or checksum != costMatrixChecksum(context):
+		raise ValueError(checkpoint_file + " is the checkpoint of another instance")
+
+	path = list(struct.unpack_from('<%dH' % path_length, data, offset))
+	offset = offset + 2 * path_length
+	if len(path) > 0:
+		setInitialPermutation(context, path)
+	context.num_leaves_visited_so_far = num_leaves
+	context.time_searched_before_in_seconds = time_searched
+
+	num_open_nodes, = struct.unpack_from('<Q', data, offset)
+	offset = offset + 8
+
+	open_nodes = []
+	for i in xrange(num_open_nodes):
+		lower_bound, cost_so_far, depth = struct.unpack_from('<ddH', data, offset)
+		offset = offset + struct.calcsize('<ddH')
+		list_nodes_visited = list(struct.unpack_from('<%dH' % depth, data, offset))
+		offset = offset + 2 * depth
+		open_nodes.append( (lower_bound, list_nodes_visited, cost_so_far) )
+	# END FOR
+
+	return open_nodes
+
+'''
+FUNCTION
+	costMatrixChecksum
+DESCRIPTION:
+	The CRC-32 of the weights of edge_weight
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	an integer
+		The checksum
+'''
+def costMatrixChecksum(context):
+
+	checksum = 0
+	for row in context.edge_weight:
+		checksum = zlib.crc32(struct.pack('<%dd' % len(row), *row), checksum)
+	# END FOR
+	return checksum & 0xffffffff
+
+'''
+FUNCTION
+	depthFirstOpenNodes
+DESCRIPTION:
+	The open nodes of bruteForceWithPrunning, at the moment it checks the time limit, when the node at the
+	top of its stack has just been reached: that node, and then the children not searched yet (nor prunned)
+	of the nodes below it in the stack, deepest first.
+	The lower bound of the root of the search, which is not kept by the search, is computed here.
+PARAMETERS:
+	The parameters and local variables of bruteForceWithPrunning with the same names
+RETURNS
+	a list
+		The open nodes, tuples (lower bound, list of visited vertices, cost so far)
+'''
+def depthFirstOpenNodes(context, root_depth, list_nodes_visited, children_at_depth, next_child_at_depth, bound_at_depth, cost_at_depth, lowerBoundFunction):
+
+	depth = len(list_nodes_visited) - 1
+	if depth > root_depth:
+		lower_bound = bound_at_depth[depth - 1][list_nodes_visited[-1]]
+	else:
+		visited = set(list_nodes_visited)
+		list_nodes_to_be_visited = [vertex for vertex in xrange(context.num_vertices) if vertex not in visited]
+		lower_bound = lowerBoundFunction(context, list(list_nodes_visited), list_nodes_to_be_visited, cost_at_depth[depth])
+	# END IF
+	open_nodes = [ (lower_bound, list(list_nodes_visited), cost_at_depth[depth]) ]
+
+	for parent_depth in xrange(depth - 1, root_depth - 1, -1):
+		prefix = list_nodes_visited[:parent_depth + 1]
+		bounds = bound_at_depth[parent_depth]
+		for child_node in children_at_depth[parent_depth][next_child_at_depth[parent_depth]:]:
+			if bounds[child_node] < context.min_cost_so_far:
+				cost_of_that_child = cost_at_depth[parent_depth] + context.edge_weight[prefix[-1]][child_node]
+				open_nodes.append( (bounds[child_node], prefix + [child_node], cost_of_that_child) )
+		# END FOR
+	# END FOR
+
+	return open_nodes
+
+'''
+FUNCTION
+	bestFirstOpenNodes
+DESCRIPTION:
+	The open nodes of bestFirstSearch: the node it has just taken (if any) and the ones in its priority queue,
+	lowest lower bound first. The lower bound of the root of the search, which is not kept by the search, is computed here.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	open_nodes
+		The priority queue of bestFirstSearch
+	taken_node
+		A list with the node taken (or None)
+	lowerBoundFunction
+		The lower bound function of the search
+RETURNS
+	a list
+		The open nodes, tuples (lower bound, list of visited vertices, cost so far)
+'''
+def bestFirstOpenNodes(context, open_nodes, taken_node, lowerBoundFunction):
+
+	nodes = sorted(open_nodes)
+	if taken_node[0] is not None:
+		nodes.insert(0, taken_node[0])
+
+	list_open_nodes = []
+	for lower_bound, negative_depth, node_number, cost_so_far, prefix in nodes:
+		if lower_bound >= context.min_cost_so_far:
+			continue
+		list_nodes_visited = []
+		while prefix is not None:
+			vertex, prefix = prefix
+			list_nodes_visited.append(vertex)
+		# END WHILE
+		list_nodes_visited.reverse()
+		if lower_bound == float('-inf'):
+			visited = set(list_nodes_visited)
+			list_nodes_to_be_visited = [vertex for vertex in xrange(context.num_vertices) if vertex not in visited]
+			lower_bound = lowerBoundFunction(context, list(list_nodes_visited), list_nodes_to_be_visited, cost_so_far)
+		# END IF
+		list_open_nodes.append( (lower_bound, list_nodes_visited, cost_so_far) )
+	# END FOR
+
+	return list_open_nodes
+
+'''
+FUNCTION
+	pendingOpenNodes
+DESCRIPTION:
+	The open nodes not searched yet by searchOpenNodes
+PARAMETERS:
+	pending_nodes
+		The open nodes not searched yet, the next one last
+RETURNS
+	a list
+		The open nodes, the next one first
+'''
+def pendingOpenNodes(pending_nodes):
+	return pending_nodes[::-1]
+
+'''
+FUNCTION
+	searchOpenNodes
+DESCRIPTION:
+	Searches the subtrees of a list of open nodes, in order, skipping the ones prunned by their lower bound.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	open_nodes
+		The open nodes, tuples (lower bound, list of visited vertices, cost so far)
+	searchFunction
+		The search of each subtree (see SEARCH_STRATEGIES)
+	lowerBoundFunction
+		The lower bound function to be used (see bruteForceWithPrunning)
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+		min_cost_so_far
+	TO WRITE:
+		open_node_sources
+'''
+def searchOpenNodes(context, open_nodes, searchFunction, lowerBoundFunction):
+
+	pending_nodes = open_nodes[::-1]
+	context.open_node_sources.append( (pendingOpenNodes, (pending_nodes,)) )
+
+	while len(pending_nodes) > 0:
+		lower_bound, list_nodes_visited, cost_so_far = pending_nodes.pop()
+		if lower_bound >= context.min_cost_so_far:
+			continue
+
+		visited = set(list_nodes_visited)
+		list_nodes_to_be_visited = [vertex for vertex in xrange(context.num_vertices) if vertex not in visited]
+		searchFunction(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, lowerBoundFunction)
+	# END WHILE
+
+	context.open_node_sources.pop()
+
+'''
+=============================================================================
+DOMINANCE TABLE
+=============================================================================
+Two partial permutations that start at vertex zero, visit the same set of vertices and end at the
+same vertex have the same completions. If the first one has been searched and the second one does
+not cost less, no completion of the second one is better than the same completion of the first one,
+which was either found or prunned by a valid lower bound against a higher (or equal) upper bound.
+So bruteForceWithPrunning keeps the cost of every partial permutation it descends into, keyed by its
+set of vertices (a bitmask, see vertex_bit) and its last vertex, and prunes the ones that do not cost
+less than the kept one.
+
+The table has a table per depth. Its size is limited by dominance_table_size: when full, the tables
+of the deepest depths, whose entries prune the smallest subtrees, are emptied until it is half full.
+'''
+
+'''
+CONSTANTS
+	DOMINANCE_TABLE_SIZE
+	DOMINANCE_MIN_DEPTH
+DESCRIPTION:
+	The maximum number of entries of the dominance table (0 for no dominance prunning; each entry takes about 100 bytes),
+	and the first depth with entries (with fewer vertices after vertex zero, no two orders of the same set end at the same vertex).
+'''
+DOMINANCE_TABLE_SIZE = 1000000
+DOMINANCE_MIN_DEPTH = 3
+
+'''
+ATTRIBUTES OF SearchContext
+	dominance_table_size
+	dominance_table_at_depth
+	dominance_table_num_entries
+DESCRIPTION:
+	The maximum number of entries of the dominance table of this search (DOMINANCE_TABLE_SIZE by default).
+	dominance_table_at_depth[d] is a dict from the key (bitmask * num_vertices + last vertex) of a partial
+	permutation of depth d to its lowest cost searched, and dominance_table_num_entries the number of entries of all of them.
+'''
+
+'''
+FUNCTION
+	resetDominanceTable
+DESCRIPTION:
+	Empties the dominance table, for a graph of num_vertices vertices
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+	TO WRITE:
+		dominance_table_at_depth
+		dominance_table_num_entries
+'''
+def resetDominanceTable(context):
+
+	context.dominance_table_at_depth = [{} for depth in xrange(context.num_vertices)]
+	context.dominance_table_num_entries = 0
+
+'''
+FUNCTION
+	isDominated
+DESCRIPTION:
+	True if a partial permutation with the same key and a cost not higher has been searched.
+	Otherwise, keeps its cost in the dominance table, since it is about to be searched.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	depth
+		The depth of the partial permutation
+	key
+		Its key (see dominance_table_at_depth)
+	cost_so_far
+		Its cost
+RETURNS
+	a boolean
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		dominance_table_size
+	TO WRITE:
+		dominance_table_at_depth
+		dominance_table_num_entries
+'''
+def isDominated(context, depth, key, cost_so_far):
+
+	table = context.dominance_table_at_depth[depth]
+	cost_kept = table.get(key)
+	if cost_kept is not None:
+		if cost_kept <= cost_so_far:
+			return True
+		table[key] = cost_so_far
+		return False
+	# END IF
+
+	# Batched eviction: empties the deepest tables until the table is half full
+	if context.dominance_table_num_entries >= context.dominance_table_size:
+		for deepest in xrange(len(context.dominance_table_at_depth) - 1, -1, -1):
+			context.dominance_table_num_entries = context.dominance_table_num_entries - len(context.dominance_table_at_depth[deepest])
+			context.dominance_table_at_depth[deepest].clear()
+			if 2 * context.dominance_table_num_entries <= context.dominance_table_size:
+				break
+		# END FOR
+	# END IF
+
+	table[key] = cost_so_far
+	context.dominance_table_num_entries = context.dominance_table_num_entries + 1
+	return False
+
+'''
+=============================================================================
+2-OPT PRUNNING
+=============================================================================
+A partial permutation p_0 ... p_k c that a 2-opt move shortens is not part of any best permutation:
+if for an edge (p_i, p_i+1) of the path, with i < k - 1,
+	edge_weight[p_i][p_k] + edge_weight[p_i+1][c] < edge_weight[p_i][p_i+1] + edge_weight[p_k][c]
+then the partial permutation p_0 ... p_i p_k ... p_i+1 c (the segment reversed) visits the same vertices,
+ends at the same vertex and costs less, so every completion of the first one is improved by the same move.
+Reversing the segment keeps its cost only if the graph is symmetric, so the rule is only used then.
+
+For a node p_0 ... p_k, writing gain_i = edge_weight[p_i][p_k] - edge_weight[p_i][p_i+1], the child c is
+prunned if the min over i of gain_i + edge_weight[p_i+1][c] is smaller than edge_weight[p_k][c].
+That min is computed for all the children at once, with numpy, when the node is expanded, so each child
+costs O(1) and its lower bound is not computed.
+'''
+
+'''
+CONSTANT
+	TWO_OPT_PRUNNING
+DESCRIPTION:
+	True to prune the partial permutations shortened by a 2-opt move (on symmetric graphs)
+'''
+TWO_OPT_PRUNNING = True
+
+'''
+ATTRIBUTES OF SearchContext
+	two_opt_prunning
+	two_opt_weights
+DESCRIPTION:
+	True to use the 2-opt prunning in this search (TWO_OPT_PRUNNING by default), if the graph is symmetric.
+	two_opt_weights is the cost matrix as a numpy array, or None if the graph is not symmetric.
+	It is q_route_weights, since the 2-opt prunning never reads its diagonal.
+'''
+
+'''
+FUNCTION
+	prepareTwoOptPrunning
+DESCRIPTION:
+	Sets two_opt_weights, if edge_weight is symmetric (after allocateLowerBoundBuffers)
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		edge_weight_array
+		q_route_weights
+	TO WRITE:
+		two_opt_weights
+'''
+def prepareTwoOptPrunning(context):
+
+	context.two_opt_weights = None
+	if numpy.array_equal(context.edge_weight_array, context.edge_weight_array.T):
+		context.two_opt_weights = context.q_route_weights
+	# END IF
+
+'''
+FUNCTION
+	twoOptImprovableChildren
+DESCRIPTION:
+	Which children of a node are shortened by a 2-opt move (see the header of this section)
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in the partial permutation of the node, with at least 3 vertices
+RETURNS
+	a list
+		Its item v is True if the child v is shortened by a 2-opt move (meaningless for the visited vertices)
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		two_opt_weights
+'''
+def twoOptImprovableChildren(context, list_nodes_visited):
+
+	path = numpy.array(list_nodes_visited)
+	last_node = path[-1]
+	before = path[:-2]
+	after = path[1:-1]
+
+	gains = context.two_opt_weights[before, last_node] - context.two_opt_weights[before, after]
+	smallest = numpy.min(context.two_opt_weights[after] + gains[:, numpy.newaxis], axis=0)
+	return (smallest < context.two_opt_weights[last_node]).tolist()
+
+'''
+=============================================================================
+STATISTICS OF THE SEARCH
+=============================================================================
+Counters of the search, written as JSON lines to the statistics file every STATISTICS_INTERVAL_IN_SECONDS
+(by checkTimeLimit) and when the search ends, to compare the lower bounds on an instance:
+	- the nodes expanded (whose children were bounded) at each depth;
+	- the children bounded and prunned at each depth, and the rate of the prunned ones;
+	- the children dropped by the 2-opt prunning at each depth (without being bounded);
+	- the time spent in the lower bound function and in the rest of the search;
+	- the histogram of the gaps between the lower bounds of the children and the upper bound
+	  at the time they were bounded, (upper bound - lower bound) / upper bound.
+With no statistics file (the default) nothing is counted, and the search only tests a local boolean
+for each node expanded.
+'''
+
+'''
+CONSTANTS
+	STATISTICS_FILE
+	STATISTICS_INTERVAL_IN_SECONDS
+	STATISTICS_GAP_BINS
+DESCRIPTION:
+	The default path to the file the statistics are appended to (see SearchContext.statistics_file), the time
+	between two lines of statistics, and the number of bins of the histogram of the gaps in [0, 1].
+	The first bin of the histogram counts the lower bounds not lower than the upper bound.
+'''
+STATISTICS_FILE = None
+STATISTICS_INTERVAL_IN_SECONDS = 10.0
+STATISTICS_GAP_BINS = 10
+
+'''
+ATTRIBUTES OF SearchContext
+	statistics_file
+	statistics_nodes_expanded_at_depth
+	statistics_children_bounded_at_depth
+	statistics_children_prunned_at_depth
+	statistics_children_two_opt_prunned_at_depth
+	statistics_gap_histogram
+	statistics_bound_calls
+	statistics_bound_time_in_seconds
+	last_statistics_time_in_seconds
+DESCRIPTION:
+	The path to the file the statistics are appended to (STATISTICS_FILE by default, None for no statistics),
+	the counters described above, and the time the last line of statistics was written.
+	statistics_bound_calls and statistics_bound_time_in_seconds are lists with a single number,
+	so the lower bound wrapped by instrumentedLowerBound changes them in place.
+'''
+
+'''
+FUNCTION
+	resetStatistics
+DESCRIPTION:
+	Sets every counter to zero, for a graph of num_vertices vertices
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+		start_time_in_seconds
+	TO WRITE:
+		(the variables of the statistics)
+'''
+def resetStatistics(context):
+
+	context.statistics_nodes_expanded_at_depth = [0] * context.num_vertices
+	context.statistics_children_bounded_at_depth = [0] * context.num_vertices
+	context.statistics_children_prunned_at_depth = [0] * context.num_vertices
+	context.statistics_children_two_opt_prunned_at_depth = [0] * context.num_vertices
+	context.statistics_gap_histogram = [0] * (STATISTICS_GAP_BINS + 1)
+	context.statistics_bound_calls = [0]
+	context.statistics_bound_time_in_seconds = [0.0]
+	context.last_statistics_time_in_seconds = context.start_time_in_seconds
+
+'''
+FUNCTION
+	instrumentedLowerBound
+DESCRIPTION:
+	Wraps a lower bound function so that each call counts a child bounded at its depth, its time and its gap
+PARAMETERS:
+	context
+		The SearchContext of the search
+	lowerBoundFunction
+		The lower bound function (see bruteForceWithPrunning)
+RETURNS
+	a function
+		A lower bound function that returns the same values, with the wrapped function in its attribute wrapped_function
+'''
+def instrumentedLowerBound(context, lowerBoundFunction):
+
+	children_bounded_at_depth = context.statistics_children_bounded_at_depth
+	gap_histogram = context.statistics_gap_histogram
+	bound_calls = context.statistics_bound_calls
+	bound_time_in_seconds = context.statistics_bound_time_in_seconds
+	clock = time.time
+
+	def lowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+		time_before = clock()
+		lower_bound = lowerBoundFunction(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far)
+		bound_time_in_seconds[0] = bound_time_in_seconds[0] + (clock() - time_before)
+		bound_calls[0] = bound_calls[0] + 1
+
+		children_bounded_at_depth[len(list_nodes_visited) - 1] += 1
+		if context.min_cost_so_far < float('inf'):
+			if lower_bound >= context.min_cost_so_far:
+				gap_histogram[0] += 1
+			else:
+				gap = (context.min_cost_so_far - lower_bound) / float(context.min_cost_so_far)
+				gap_histogram[min(STATISTICS_GAP_BINS, 1 + int(gap * STATISTICS_GAP_BINS))] += 1
+		# END IF
+		return lower_bound
+
+	lowerBound.wrapped_function = lowerBoundFunction
+	return lowerBound
+
+'''
+FUNCTION
+	instrumentedBatchedLowerBound
+DESCRIPTION:
+	Wraps a batched lower bound (see batchedLowerBoundOf) so that each call counts its children as bounded
+	at their depth, its time and their gaps, as instrumentedLowerBound does for each child.
+	statistics_bound_calls counts the children, so that it means the same with or without the batched lower bounds.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	batchedLowerBound
+		The batched lower bound
+RETURNS
+	a function
+		A batched lower bound that returns the same values
+'''
+def instrumentedBatchedLowerBound(context, batchedLowerBound):
+
+	children_bounded_at_depth = context.statistics_children_bounded_at_depth
+	gap_histogram = context.statistics_gap_histogram
+	bound_calls = context.statistics_bound_calls
+	bound_time_in_seconds = context.statistics_bound_time_in_seconds
+	clock = time.time
+
+	def lowerBounds(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children):
+		time_before = clock()
+		lower_bounds = batchedLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, children)
+		bound_time_in_seconds[0] = bound_time_in_seconds[0] + (clock() - time_before)
+		bound_calls[0] = bound_calls[0] + len(children)
+
+		children_bounded_at_depth[len(list_nodes_visited)] += len(children)
+		if context.min_cost_so_far < float('inf'):
+			for lower_bound in lower_bounds.tolist():
+				if lower_bound >= context.min_cost_so_far:
+					gap_histogram[0] += 1
+				else:
+					gap = (context.min_cost_so_far - lower_bound) / float(context.min_cost_so_far)
+					gap_histogram[min(STATISTICS_GAP_BINS, 1 + int(gap * STATISTICS_GAP_BINS))] += 1
+			# END FOR
+		# END IF
+		return lower_bounds
+
+	return lowerBounds
+
+'''
+FUNCTION
+	writeStatistics
+DESCRIPTION:
+	Appends a line with the statistics so far, as a JSON object, to the statistics file
+PARAMETERS:
+	context
+		The SearchContext of the search
+	final
+		True for the line written when the search ends
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		statistics_file
+		(the variables of the statistics)
+	TO WRITE:
+		last_statistics_time_in_seconds
+'''
+def writeStatistics(context, final):
+
+	time_now_in_seconds = time.time()
+	time_elapsed_in_seconds = time_now_in_seconds - context.start_time_in_seconds
+
+	prune_rate_at_depth = []
+	for depth in xrange(context.num_vertices):
+		if context.statistics_children_bounded_at_depth[depth] > 0:
+			prune_rate_at_depth.append(context.statistics_children_prunned_at_depth[depth] / float(context.statistics_children_bounded_at_depth[depth]))
+		else:
+			prune_rate_at_depth.append(None)
+	# END FOR
+
+	upper_bound = context.min_cost_so_far
+	if upper_bound == float('inf'):
+		upper_bound = None
+
+	line = collections.OrderedDict([	("time", time_elapsed_in_seconds),
+										("final", final),
+										("upper_bound", upper_bound),
+										("leaves_visited", context.num_leaves_visited_so_far),
+										("nodes_expanded_at_depth", context.statistics_nodes_expanded_at_depth),
+										("children_bounded_at_depth", context.statistics_children_bounded_at_depth),
+										("children_prunned_at_depth", context.statistics_children_prunned_at_depth),
+										("prune_rate_at_depth", prune_rate_at_depth),
+										("children_two_opt_prunned_at_depth", context.statistics_children_two_opt_prunned_at_depth),
+										("bound_calls", context.statistics_bound_calls[0]),
+										("bound_time", context.statistics_bound_time_in_seconds[0]),
+										("search_time", time_elapsed_in_seconds - context.statistics_bound_time_in_seconds[0]),
+										("gap_histogram", context.statistics_gap_histogram) ])
+
+	file_out = open(context.statistics_file, "a")
+	file_out.write(json.dumps(line) + "\n")
+	file_out.close()
+
+	context.last_statistics_time_in_seconds = time_now_in_seconds
+
+'''
+=============================================================================
+ANYTIME SEARCH
+=============================================================================
+The search can be stopped at any moment, and still returns the best permutation found so far (the incumbent)
+with a lower bound of the cost of the best permutation, which certifies how far from the best one the incumbent
+can be (the gap). It stops:
+	- at the deadline, the time_limit of its SearchContext after it started;
+	- after one of the STOP_SIGNALS, received while runBruteForceWithPrunning runs in the main thread
+	  (see installStopSignalHandlers).
+The signal handler only keeps the signal in the context of the searches, which checkTimeLimit notices the next time it
+is called, with the search in a consistent state. Then checkTimeLimit computes the lower bound (see frontierLowerBound)
+and raises SearchStopped, which runBruteForceWithPrunning catches to report the incumbent, the lower bound and the gap
+before returning.
+'''
+
+'''
+CONSTANT
+	TIME_CHECK_PERIOD_IN_SECONDS
+DESCRIPTION:
+	The time aimed at between two calls to checkTimeLimit. The searches call it every time_check_interval nodes,
+	which checkTimeLimit halves when the calls are further apart (the nodes of the slow lower bounds) and doubles,
+	up to TIME_CHECK_INTERVAL, when they are much closer. So the deadline and the stop signals are noticed in time,
+	without reading the clock at every node.
+'''
+TIME_CHECK_PERIOD_IN_SECONDS = 0.1
+
+'''
+CONSTANT
+	STOP_SIGNALS
+DESCRIPTION:
+	The signals that stop the search cleanly. Empty in the processes of a pool, which the pool ends with SIGTERM.
+'''
+STOP_SIGNALS = [signal.SIGINT, signal.SIGTERM]
+
+'''
+VARIABLE
+	stop_signal_contexts
+DESCRIPTION:
+	The SearchContexts of the searches that installed the handlers of the STOP_SIGNALS and have not ended yet,
+	outermost first. A stop signal stops these searches, and no other: the searches of the other threads, which
+	cannot handle signals, only stop at their deadline. Only the main thread changes the list.
+'''
+stop_signal_contexts = []
+
+'''
+ATTRIBUTES OF SearchContext
+	stop_signal
+	stop_reason
+	search_lower_bound
+	time_check_interval
+	last_time_check_in_seconds
+	end_message
+DESCRIPTION:
+	The stop signal received by the search (None if none), why the search stopped before the end ('deadline' or
+	'signal', None if it searched the whole permutation tree), the lower bound of the cost of the best permutation
+	when the search ended (min_cost_so_far if it searched the whole tree), the number of nodes between two calls to
+	checkTimeLimit and the time of the last call, and the lines written to the output file when the search ended
+	(None while it runs). The search prints nothing: the programs that run it print end_message if they want to.
+'''
+
+'''
+CLASS
+	SearchStopped
+DESCRIPTION:
+	Raised by checkTimeLimit to stop the search, at the deadline or after a stop signal.
+	It is a SystemExit, so a search not run by initBruteForceWithPrunning (such as the subproblems of parallel.py)
+	still ends there, as it did when checkTimeLimit ended the program.
+'''
+class SearchStopped(SystemExit):
+	pass
+
+'''
+FUNCTION
+	handleStopSignal
+DESCRIPTION:
+	The handler of the STOP_SIGNALS: keeps the signal in the context of the searches that handle it, for checkTimeLimit.
+	A second signal, if a search has not stopped yet, interrupts it right away (KeyboardInterrupt).
+PARAMETERS:
+	signal_number
+		The signal
+	frame
+		The frame interrupted by the signal
+RETURNS
+	<nothing>
+GLOBAL VARIABLES USED:
+	TO READ:
+		stop_signal_contexts
+'''
+def handleStopSignal(signal_number, frame):
+
+	for context in stop_signal_contexts:
+		if context.stop_signal is not None:
+			raise KeyboardInterrupt()
+	# END FOR
+
+	for context in stop_signal_contexts:
+		context.stop_signal = signal_number
+	# END FOR
+
+'''
+FUNCTION
+	installStopSignalHandlers
+DESCRIPTION:
+	Installs handleStopSignal for the STOP_SIGNALS, but the ones ignored by the process, so they stop the search.
+	Only the main thread can handle signals: called from another thread (see solver.py), it installs nothing,
+	and the search only stops at the deadline.
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	a dictionary
+		The previous handler of each signal handled, for restoreSignalHandlers
+CONTEXT ATTRIBUTES USED:
+	TO WRITE:
+		stop_signal
+GLOBAL VARIABLES USED:
+	TO WRITE:
+		stop_signal_contexts
+'''
+def installStopSignalHandlers(context):
+
+	previous_handlers = {}
+	for signal_number in STOP_SIGNALS:
+		previous_handler = signal.getsignal(signal_number)
+		if previous_handler == signal.SIG_IGN or previous_handler is None:
+			continue
+		try:
+			signal.signal(signal_number, handleStopSignal)
+		except ValueError:
+			# Not the main thread
+			break
+		previous_handlers[signal_number] = previous_handler
+	# END FOR
+
+	if len(previous_handlers) > 0:
+		context.stop_signal = None
+		stop_signal_contexts.append(context)
+	return previous_handlers
+
+'''
+FUNCTION
+	restoreSignalHandlers
+DESCRIPTION:
+	Restores the handlers replaced by installStopSignalHandlers, once the search has ended
+PARAMETERS:
+	context
+		The SearchContext of the search
+	previous_handlers
+		The dictionary returned by installStopSignalHandlers
+RETURNS
+	<nothing>
+GLOBAL VARIABLES USED:
+	TO WRITE:
+		stop_signal_contexts
+'''
+def restoreSignalHandlers(context, previous_handlers):
+
+	for signal_number, previous_handler in previous_handlers.items():
+		signal.signal(signal_number, previous_handler)
+	# END FOR
+
+	if context in stop_signal_contexts:
+		stop_signal_contexts.remove(context)
+
+'''
+FUNCTION
+	frontierLowerBound
+DESCRIPTION:
+	A lower bound of the cost of the best permutation, while the search is running (from checkTimeLimit).
+	Every permutation is either in a subtree searched or prunned, where none is cheaper than min_cost_so_far,
+	or in the subtree of an open node (the nodes listed by open_node_sources, the same ones of a checkpoint).
+	The partial permutations dropped by the dominance table or by the 2-opt prunning are not the best one, or have
+	one as cheap in one of those subtrees. So the bound is the lowest of min_cost_so_far and of the lower bounds of
+	the open nodes. The lower bound of an open node is at least its sumMinEdgesBound (the root of the permutation
+	tree has none).
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	a number
+		The lower bound, rounded up to an integer (the costs are integers), or infinite if there is no open node
+		nor any permutation found
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+		sorted_edge_weight_prefix_sum
+		min_cost_so_far
+		open_node_sources
+'''
+def frontierLowerBound(context):
+
+	lower_bound = context.min_cost_so_far
+	for function, parameters in context.open_node_sources:
+		for node_lower_bound, list_nodes_visited, cost_so_far in function(*parameters):
+			num_edges = min(context.num_vertices - len(list_nodes_visited) + 1, len(context.sorted_edge_weight_prefix_sum) - 1)
+			node_lower_bound = max(node_lower_bound, cost_so_far + context.sorted_edge_weight_prefix_sum[num_edges])
+			if node_lower_bound < lower_bound:
+				lower_bound = node_lower_bound
+		# END FOR
+	# END FOR
+
+	if lower_bound == float('inf'):
+		return lower_bound
+	return int(math.ceil(lower_bound))
+
+'''
+FUNCTION
+	stopMessage
+DESCRIPTION:
+	The line written to the output file when the search stops before the end, with the time limit it reached
+	or the signal that stopped it
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	a string
+		The line, with its end of line
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		stop_reason
+		stop_signal
+		start_time_in_seconds
+		time_limit
+'''
+def stopMessage(context):
+
+	if context.stop_reason == 'signal':
+		return "Stopped by signal " + str(context.stop_signal) + " after " + str(time.time() - context.start_time_in_seconds) + "s\n"
+	return "Time limit of " + str(context.time_limit) + "s reached\n"
+
+'''
+FUNCTION
+	gapMessage
+DESCRIPTION:
+	The line with the lower bound of the last search and the gap of the best permutation found to it
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	a string
+		The line, with its end of line
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		search_lower_bound
+		min_cost_so_far
+'''
+def gapMessage(context):
+
+	message = "Lower bound: " + str(context.search_lower_bound)
+	if 0 < context.search_lower_bound < float('inf') and context.min_cost_so_far < float('inf'):
+		gap = (context.min_cost_so_far - context.search_lower_bound) / float(context.search_lower_bound)
+		message = message + " (gap " + str(round(100 * gap, 2)) + "%)"
+	return message + "\n"
+
+'''
+=============================================================================
+ALGORITHM IMPLEMENTATION
+=============================================================================
+'''
+
+'''
+FUNCTION
+	checkTimeLimit
+DESCRIPTION:
+	Stops the search (raising SearchStopped) if it has been running for more than its time_limit or a stop signal
+	was received, after computing the lower bound of the cost of the best permutation (see ANYTIME SEARCH).
+	Writes a checkpoint (if checkpoint_file is set) before stopping, and every CHECKPOINT_INTERVAL_IN_SECONDS.
+	The same for the statistics (if statistics_file is set), every STATISTICS_INTERVAL_IN_SECONDS.
+PARAMETERS:
+	context
+		The SearchContext of the search
+RETURNS
+	an integer
+		The number of nodes to be visited before the next call (see TIME_CHECK_PERIOD_IN_SECONDS)
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		start_time_in_seconds
+		time_limit
+		checkpoint_file
+		last_checkpoint_time_in_seconds
+		statistics_file
+		last_statistics_time_in_seconds
+		stop_signal
+	TO WRITE:
+		stop_reason
+		search_lower_bound
+		time_check_interval
+		last_time_check_in_seconds
+'''
+def checkTimeLimit(context):
+
+	time_now_in_seconds = time.time()
+	time_elapsed_in_seconds = time_now_in_seconds - context.start_time_in_seconds
+	timed_out = time_elapsed_in_seconds > context.time_limit or context.stop_signal is not None
+
+	# Fewer nodes until the next call if this one came late, more if it came early
+	time_since_last_check_in_seconds = time_now_in_seconds - context.last_time_check_in_seconds
+	if time_since_last_check_in_seconds > TIME_CHECK_PERIOD_IN_SECONDS:
+		context.time_check_interval = max(1, context.time_check_interval // 2)
+	elif time_since_last_check_in_seconds < TIME_CHECK_PERIOD_IN_SECONDS / 4:
+		context.time_check_interval = min(TIME_CHECK_INTERVAL, 2 * context.time_check_interval)
+	context.last_time_check_in_seconds = time_now_in_seconds
+
+	if context.checkpoint_file is not None:
+		if timed_out or time_now_in_seconds - context.last_checkpoint_time_in_seconds >= CHECKPOINT_INTERVAL_IN_SECONDS:
+			writeCheckpoint(context)
+	# END IF
+
+	if context.statistics_file is not None:
+		if timed_out or time_now_in_seconds - context.last_statistics_time_in_seconds >= STATISTICS_INTERVAL_IN_SECONDS:
+			writeStatistics(context, timed_out)
+	# END IF
+
+	if timed_out:
+		if context.stop_signal is not None:
+			context.stop_reason = 'signal'
+		else:
+			context.stop_reason = 'deadline'
+		context.search_lower_bound = frontierLowerBound(context)
+		raise SearchStopped()
+	# END IF
+
+	return context.time_check_interval
+
+'''
+FUNCTION
+	registerNewBestPermutation
+DESCRIPTION:
+	Keeps a permutation that is better than the best one found so far: stores it in the context,
+	reports it and publishes its cost to the other processes (if any).
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The permutation (copied)
+	cost_total
+		The total cost of the permutation, including the edge back to the first vertex
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		shared_upper_bound_lock
+	TO WRITE:
+		min_cost_so_far
+		min_path_so_far
+		shared_upper_bound
+'''
+def registerNewBestPermutation(context, list_nodes_visited, cost_total):
+
+	context.min_cost_so_far = cost_total
+	context.min_path_so_far = list(list_nodes_visited)
+	reportNewBestPermutation(context, time.time() - context.start_time_in_seconds)
+
+	if context.shared_upper_bound is not None:
+		context.shared_upper_bound_lock.acquire()
+		if cost_total < context.shared_upper_bound.value:
+			context.shared_upper_bound.value = cost_total
+		context.shared_upper_bound_lock.release()
+
+'''
+CONSTANT
+	TIME_CHECK_INTERVAL
+DESCRIPTION:
+	The maximum number of nodes of the permutation tree visited between two checks of the time limit
+	(see TIME_CHECK_PERIOD_IN_SECONDS)
+'''
+TIME_CHECK_INTERVAL = 1000
+
+'''
+FUNCTION
+	bruteForceWithPrunning
+DESCRIPTION:
+	Runs the brute force of all permutations starting in a already defined partial permutation.
+	This partial permutation is defined by the parameters: visited, to_be_visited and cost_so_far
+	This function generates the rest of the permutations missing, and stores in the context
+	min_cost_so_far and min_path_so_far any permutation that has a lower cost than the values previously
+	present in those variables.
+
+	The permutation tree is searched depth-first with an explicit stack instead of recursion, so the
+	depth of the tree is not limited by the interpreter's recursion limit.
+	Every level of the tree owns a preallocated slot in the per-depth arrays below:
+		children_at_depth[d]
+			The children of the node at depth d, sorted by lower bound (ascending order)
+		bound_at_depth[d]
+			bound_at_depth[d][v] is the lower bound of the child v of the node at depth d
+		next_child_at_depth[d]
+			The index in children_at_depth[d] of the next child to be descended into
+		cost_at_depth[d]
+			The cost of the partial permutation of the node at depth d
+		mask_at_depth[d]
+			The bitmask of the vertices of the partial permutation of the node at depth d (see vertex_bit)
+	A child that is not prunned by its lower bound may still be prunned by the dominance table (see isDominated).
+	On symmetric graphs, the children shortened by a 2-opt move are dropped before computing their lower bound
+	(see twoOptImprovableChildren).
+	If the lower bound function has a batched version (see batchedLowerBoundOf), all the children of a node with
+	enough vertices to be visited are bounded by a single call to it, instead of one call for each child.
+	The lists list_nodes_visited and list_nodes_to_be_visited are modified in place while descending
+	and restored while going back up, so no list is created for each node of the tree.
+	A vertex is taken out of list_nodes_to_be_visited by moving the last vertex of the list into its
+	place (O(1)), and put back by undoing that move, so the list is left as it was received.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in that partial permutation
+	list_nodes_to_be_visited
+		The list of vertices that have not been visited yet in that partial permutation
+	cost_so_far
+		The cost so far of the edges that connect the vertices in that partial permutation
+	lowerBoundFunction
+		The lower bound function to be used. This function should receive as parameters the following:
+				context
+					The SearchContext of the search
+				list_nodes_visited
+					The list of visited vertices so far in that partial permutation
+				list_nodes_to_be_visited
+					The list of vertices that have not been visited yet in that partial permutation
+				cost_so_far
+					The cost so far of the edges that connect the vertices in that partial permutation
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		edge_weight
+		num_vertices
+		shared_upper_bound
+		dominance_table_size
+		two_opt_prunning
+		two_opt_weights
+	TO WRITE:
+		min_cost_so_far
+		min_path_so_far
+		num_leaves_visited_so_far
+		shared_upper_bound
+'''
+def bruteForceWithPrunning(	context,
+							list_nodes_visited,
+							list_nodes_to_be_visited,
+							cost_so_far,
+							lowerBoundFunction):
+
+	edge_weight = context.edge_weight
+	shared_upper_bound = context.shared_upper_bound
+	collect_statistics = context.statistics_file is not None
+	nodes_expanded_at_depth = context.statistics_nodes_expanded_at_depth
+	children_prunned_at_depth = context.statistics_children_prunned_at_depth
+
+	root_depth = len(list_nodes_visited) - 1
+	leaf_depth = root_depth + len(list_nodes_to_be_visited)
+
+	# Per-depth arrays, allocated once for the whole search
+	children_at_depth = [[0] * (leaf_depth - depth) for depth in xrange(leaf_depth + 1)]
+	bound_at_depth = [[0] * context.num_vertices for depth in xrange(leaf_depth + 1)]
+	bound_key_at_depth = [bounds.__getitem__ for bounds in bound_at_depth]
+	next_child_at_depth = [0] * (leaf_depth + 1)
+	cost_at_depth = [0] * (leaf_depth + 1)
+	mask_at_depth = [0] * (leaf_depth + 1)
+
+	# All the children of a node are bounded by a single call, if the lower bound has a batched version
+	batchedLowerBound, min_batched_vertices = batchedLowerBoundOf(context, lowerBoundFunction)
+	argsort = numpy.argsort
+
+	# The children shortened by a 2-opt move get an infinite bound, instead of their lower bound
+	two_opt_prunning = context.two_opt_prunning and context.two_opt_weights is not None
+	no_improvable_children = [False] * context.num_vertices
+	infinite_bound = float('inf')
+	children_two_opt_prunned_at_depth = context.statistics_children_two_opt_prunned_at_depth
+
+	# The partial permutations of the depths between these are looked up in the dominance table
+	vertex_bit = context.vertex_bit
+	first_dominance_depth = DOMINANCE_MIN_DEPTH
+	last_dominance_depth = leaf_depth - 1
+	if context.dominance_table_size <= 0:
+		last_dominance_depth = -1
+
+	# position_to_be_visited[v] is the index of the vertex v in list_nodes_to_be_visited
+	position_to_be_visited = [0] * context.num_vertices
+	for i in xrange(len(list_nodes_to_be_visited)):
+		position_to_be_visited[list_nodes_to_be_visited[i]] = i
+	# END FOR
+
+	depth = root_depth
+	cost_at_depth[depth] = cost_so_far
+	mask_at_depth[depth] = sum(map(vertex_bit.__getitem__, list_nodes_visited))
+	nodes_until_time_check = 0
+	entering_node = True
+
+	# Lists the open nodes for the checkpoints (see depthFirstOpenNodes)
+	context.open_node_sources.append( (depthFirstOpenNodes, (	context,
+														root_depth,
+														list_nodes_visited,
+														children_at_depth,
+														next_child_at_depth,
+														bound_at_depth,
+														cost_at_depth,
+														lowerBoundFunction)) )
+
+	while True:
+
+		# -----------------------
+		# STEP 1: THE NODE AT THE TOP OF THE STACK HAS JUST BEEN REACHED
+		# -----------------------
+		if entering_node:
+			entering_node = False
+
+			nodes_until_time_check = nodes_until_time_check - 1
+			if nodes_until_time_check < 0:
+				nodes_until_time_check = checkTimeLimit(context)
+			# END IF
+
+			# Another process may have found a better permutation
+			if shared_upper_bound is not None and shared_upper_bound.value < context.min_cost_so_far:
+				context.min_cost_so_far = shared_upper_bound.value
+
+			# The current node being "investigated" is the last node that has been visited
+			current_node = list_nodes_visited[-1]
+			cost_of_current_node = cost_at_depth[depth]
+			next_child_at_depth[depth] = 0
+
+			# CASE 1) IS A LEAF
+			# A node is a leaf if there are no more vertices to be visited.
+			# Its list of children is empty, so STEP 2 goes straight back up.
+			if depth == leaf_depth:
+
+				# cost_total is the total cost of that permutation.
+				# It is the cost_so_far added to the weight of the edge of the last node to the first node.
+				# This is necessary to conclude the cycle.
+				cost_total = cost_of_current_node + edge_weight[current_node][0]
+
+				context.num_leaves_visited_so_far = context.num_leaves_visited_so_far + 1
+
+				# If the total cost of the current permutation is better than the one we had previously,
+				# update min_cost_so_far and min_path_so_far
+				if(cost_total < context.min_cost_so_far):
+					registerNewBestPermutation(context, list_nodes_visited, cost_total)
+				# END IF
+
+			# CASE 2) IS NOT A LEAF
+			# Computes the lower bound of every child and sorts the children by it (ascending order).
+			else:
+				children = children_at_depth[depth]
+				bounds = bound_at_depth[depth]
+				children[:] = list_nodes_to_be_visited
+				weights_from_current_node = edge_weight[current_node]
+
+				if collect_statistics:
+					nodes_expanded_at_depth[depth] += 1
+
+				improvable = no_improvable_children
+				if two_opt_prunning and depth >= 2:
+					improvable = twoOptImprovableChildren(context, list_nodes_visited)
+
+				# BATCHED LOWER BOUND
+				# The children shortened by a 2-opt move are dropped, and the others are bounded by a single call
+				# and sorted by argsort (stable, so the children with the same bound keep the same order)
+				if batchedLowerBound is not None and len(list_nodes_to_be_visited) >= min_batched_vertices:
+					if improvable is not no_improvable_children:
+						children[:] = [child_node for child_node in list_nodes_to_be_visited if not improvable[child_node]]
+						if collect_statistics:
+							children_two_opt_prunned_at_depth[depth + 1] += len(list_nodes_to_be_visited) - len(children)
+					# END IF
+
+					if len(children) > 0:
+						lower_bounds = batchedLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_of_current_node, children)
+						order = argsort(lower_bounds, kind='mergesort').tolist()
+						lower_bounds = lower_bounds.tolist()
+						for i in xrange(len(children)):
+							bounds[children[i]] = lower_bounds[i]
+						# END FOR
+						children[:] = map(children.__getitem__, order)
+					# END IF
+
+				# ONE CALL FOR EACH CHILD
+				else:
+					# Every child is taken out of the list of nodes to be visited and appended to the list of
+					# nodes visited, in turn, before calling the lower bound function.
+					# The children are iterated from the back of the list to be visited: the slot of the
+					# next child is filled with the previous child, so each step costs a single assignment.
+					# In the end, the list holds every vertex but the first one, which is inserted back.
+					child_node = list_nodes_to_be_visited.pop()
+					list_nodes_visited.append(child_node)
+					if improvable[child_node]:
+						bounds[child_node] = infinite_bound
+					else:
+						bounds[child_node] = lowerBoundFunction(	context,
+																	list_nodes_visited,
+																	list_nodes_to_be_visited,
+																	cost_of_current_node + weights_from_current_node[child_node])
+
+					for position in xrange(len(list_nodes_to_be_visited) - 1, -1, -1):
+						previous_child_node = child_node
+						child_node = list_nodes_to_be_visited[position]
+						list_nodes_to_be_visited[position] = previous_child_node
+						list_nodes_visited[-1] = child_node
+						if improvable[child_node]:
+							bounds[child_node] = infinite_bound
+						else:
+							bounds[child_node] = lowerBoundFunction(	context,
+																		list_nodes_visited,
+																		list_nodes_to_be_visited,
+																		cost_of_current_node + weights_from_current_node[child_node])
+					# END FOR
+
+					list_nodes_visited.pop()
+					list_nodes_to_be_visited.insert(0, child_node)
+
+					children.sort(key=bound_key_at_depth[depth])
+
+					# The children shortened by a 2-opt move, sorted last, are dropped
+					if improvable is not no_improvable_children:
+						while len(children) > 0 and improvable[children[-1]]:
+							children.pop()
+							if collect_statistics:
+								children_two_opt_prunned_at_depth[depth + 1] += 1
+						# END WHILE
+					# END IF
+				# END IF
+			# END IF
+		# END IF
+
+		# -----------------------
+		# STEP 2: PICK THE NEXT CHILD OF THE NODE AT THE TOP OF THE STACK, POSSIBLY PRUNNING IT
+		# -----------------------
+		children = children_at_depth[depth]
+		i = next_child_at_depth[depth]
+
+		# DO THE PRUNNING
+		# We will only descend into the child if its lower bound is smaller than the upper bound so far.
+		# Since the children are sorted by lower bound, once a child is prunned all the children
+		# after it are prunned as well.
+		if i < len(children) and bound_at_depth[depth][children[i]] < context.min_cost_so_far:
+
+			next_child_at_depth[depth] = i + 1
+			child_node = children[i]
+			cost_of_that_child = cost_at_depth[depth] + edge_weight[list_nodes_visited[-1]][child_node]
+			mask_of_that_child = mask_at_depth[depth] | vertex_bit[child_node]
+
+			# DO THE DOMINANCE PRUNNING
+			if first_dominance_depth <= depth + 1 <= last_dominance_depth:
+				if isDominated(context, depth + 1, mask_of_that_child * context.num_vertices + child_node, cost_of_that_child):
+					continue
+			# END IF
+
+			# Descends into the child
+			position = position_to_be_visited[child_node]
+			last_node = list_nodes_to_be_visited.pop()
+			if last_node != child_node:
+				list_nodes_to_be_visited[position] = last_node
+				position_to_be_visited[last_node] = position
+			cost_at_depth[depth + 1] = cost_of_that_child
+			mask_at_depth[depth + 1] = mask_of_that_child
+			list_nodes_visited.append(child_node)
+			depth = depth + 1
+			entering_node = True
+
+		else:
+
+			# Every child of the node has been searched (or prunned): goes back up to its parent
+			if collect_statistics and depth < leaf_depth:
+				children_prunned_at_depth[depth + 1] += len(children) - i
+
+			if depth == root_depth:
+				break
+
+			child_node = list_nodes_visited.pop()
+			position = position_to_be_visited[child_node]
+			if position < len(list_nodes_to_be_visited):
+				last_node = list_nodes_to_be_visited[position]
+				list_nodes_to_be_visited[position] = child_node
+				position_to_be_visited[last_node] = len(list_nodes_to_be_visited)
+				list_nodes_to_be_visited.append(last_node)
+			else:
+				list_nodes_to_be_visited.append(child_node)
+			depth = depth - 1
+		# END IF
+	# END WHILE
+
+	context.open_node_sources.pop()
+	return
+
+'''
+CONSTANT
+	MAX_OPEN_NODES
+DESCRIPTION:
+	The maximum number of open nodes (nodes whose lower bound is known, but whose children are not)
+	kept by bestFirstSearch. Each open node takes about 200 bytes.
+	While that many nodes are open, the nodes taken out of the priority queue are searched depth-first
+	by bruteForceWithPrunning instead of being expanded, so the memory stops growing.
+'''
+MAX_OPEN_NODES = 1000000
+
+'''
+CONSTANT
+	DIVE_OPEN_NODES_FRACTION
+DESCRIPTION:
+	The fraction of max_open_nodes over which the hybrid search dives depth-first instead of expanding best-first
+	(see bestFirstSearch)
+'''
+DIVE_OPEN_NODES_FRACTION = 0.5
+
+'''
+ATTRIBUTE OF SearchContext
+	max_open_nodes
+DESCRIPTION:
+	The maximum number of open nodes of this search (MAX_OPEN_NODES by default)
+'''
+
+'''
+FUNCTION
+	bestFirstSearch
+DESCRIPTION:
+	Searches the same permutation tree of bruteForceWithPrunning, with the same parameters, but always
+	expands the open node with the lowest lower bound (best-first), using a priority queue (heapq).
+	Ties are broken by the deepest node.
+	Once the lowest lower bound of the open nodes is not lower than min_cost_so_far, the best permutation
+	has been found, and the search ends. For a given lower bound function, no search expands fewer nodes.
+
+	An open node is a tuple
+		(lower bound, -depth, number of the node, cost of the partial permutation, prefix)
+	where the prefix is the partial permutation encoded as a linked list of tuples (last vertex, prefix of the parent),
+	so the children of a node share its prefix instead of copying it.
+	The list of visited vertices and the list of vertices to be visited are rebuilt when the node is expanded.
+
+	The number of open nodes is limited by max_open_nodes (see MAX_OPEN_NODES).
+	With dive_first, the search dives depth-first (always expanding the child with the lowest lower bound,
+	keeping its siblings open) while there is no permutation to prune with, or while more than
+	DIVE_OPEN_NODES_FRACTION of max_open_nodes are open, and expands best-first while the memory allows it.
+	A dive adds fewer open nodes than best-first for each leaf reached, and its leaves give permutations
+	to prune with, so the priority queue grows slower before the search falls back to bruteForceWithPrunning.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	list_nodes_visited
+		The list of visited vertices so far in that partial permutation
+	list_nodes_to_be_visited
+		The list of vertices that have not been visited yet in that partial permutation
+	cost_so_far
+		The cost so far of the edges that connect the vertices in that partial permutation
+	lowerBoundFunction
+		The lower bound function to be used (see bruteForceWithPrunning)
+	dive_first
+		True to dive depth-first when there is no permutation found or too many open nodes
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		edge_weight
+		num_vertices
+		shared_upper_bound
+		max_open_nodes
+	TO WRITE:
+		min_cost_so_far
+		min_path_so_far
+		num_leaves_visited_so_far
+		shared_upper_bound
+'''
+def bestFirstSearch(	context,
+						list_nodes_visited,
+						list_nodes_to_be_visited,
+						cost_so_far,
+						lowerBoundFunction,
+						dive_first=False):
+
+	edge_weight = context.edge_weight
+	shared_upper_bound = context.shared_upper_bound
+	heappush = heapq.heappush
+	heappop = heapq.heappop
+	collect_statistics = context.statistics_file is not None
+	nodes_expanded_at_depth = context.statistics_nodes_expanded_at_depth
+	children_prunned_at_depth = context.statistics_children_prunned_at_depth
+
+	root_depth = len(list_nodes_visited) - 1
+	leaf_depth = root_depth + len(list_nodes_to_be_visited)
+	start_node = list_nodes_visited[0]
+
+	# The number of open nodes over which the hybrid search dives
+	max_open_nodes = context.max_open_nodes
+	dive_open_nodes = int(DIVE_OPEN_NODES_FRACTION * max_open_nodes)
+
+	# Partial permutations that are already leaves (or have a single child) are left to the depth first search
+	if leaf_depth - root_depth < 2:
+		bruteForceWithPrunning(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, lowerBoundFunction)
+		return
+
+	root_prefix = None
+	for vertex in list_nodes_visited:
+		root_prefix = (vertex, root_prefix)
+	# END FOR
+
+	# The vertices of the partial permutation being expanded are marked with its number in is_in_path
+	is_in_path = [-1] * context.num_vertices
+	path = [0] * (leaf_depth + 1)
+
+	open_nodes = []
+	num_nodes = 0
+	next_node = (float('-inf'), -root_depth, num_nodes, cost_so_far, root_prefix)
+	nodes_until_time_check = 0
+
+	# Lists the open nodes for the checkpoints (see bestFirstOpenNodes)
+	taken_node = [None]
+	context.open_node_sources.append( (bestFirstOpenNodes, (context, open_nodes, taken_node, lowerBoundFunction)) )
+
+	while True:
+
+		# -----------------------
+		# STEP 1: TAKE THE NEXT NODE (THE CHILD OF THE DIVE OR THE BEST OPEN NODE)
+		# -----------------------
+		is_dive = next_node is not None
+		if is_dive:
+			node = next_node
+			next_node = None
+		elif len(open_nodes) > 0:
+			node = heappop(open_nodes)
+		else:
+			break
+		# END IF
+
+		nodes_until_time_check = nodes_until_time_check - 1
+		if nodes_until_time_check < 0:
+			taken_node[0] = node
+			nodes_until_time_check = checkTimeLimit(context)
+			taken_node[0] = None
+		# END IF
+
+		# Another process may have found a better permutation
+		if shared_upper_bound is not None and shared_upper_bound.value < context.min_cost_so_far:
+			context.min_cost_so_far = shared_upper_bound.value
+
+		lower_bound, negative_depth, node_number, cost_of_current_node, prefix = node
+
+		# DO THE PRUNNING
+		# The open nodes are sorted by lower bound: once the best one is prunned, all of them are
+		if lower_bound >= context.min_cost_so_far:
+			if collect_statistics:
+				children_prunned_at_depth[-negative_depth] += 1
+				if not is_dive:
+					for open_node in open_nodes:
+						children_prunned_at_depth[-open_node[1]] += 1
+			# END IF
+			if is_dive:
+				continue
+			break
+		# END IF
+
+		# Rebuilds the partial permutation of the node from its prefix
+		depth = -negative_depth
+		position = depth
+		while prefix is not None:
+			vertex, prefix = prefix
+			path[position] = vertex
+			is_in_path[vertex] = node_number
+			position = position - 1
+		# END WHILE
+		nodes_visited = path[:depth + 1]
+		nodes_to_be_visited = [vertex for vertex in list_nodes_to_be_visited if is_in_path[vertex] != node_number]
+		current_node = nodes_visited[-1]
+		prefix = node[4]
+
+		# -----------------------
+		# STEP 2: TOO MANY OPEN NODES: SEARCH THE SUBTREE OF THE NODE DEPTH-FIRST
+		# -----------------------
+		if len(open_nodes) >= max_open_nodes:
+			bruteForceWithPrunning(context, nodes_visited, nodes_to_be_visited, cost_of_current_node, lowerBoundFunction)
+			continue
+		# END IF
+
+		# -----------------------
+		# STEP 3: THE CHILDREN ARE LEAVES
+		# -----------------------
+		if depth + 1 == leaf_depth:
+			child_node = nodes_to_be_visited[0]
+			cost_total = cost_of_current_node + edge_weight[current_node][child_node] + edge_weight[child_node][start_node]
+			context.num_leaves_visited_so_far = context.num_leaves_visited_so_far + 1
+
+			if(cost_total < context.min_cost_so_far):
+				nodes_visited.append(child_node)
+				registerNewBestPermutation(context, nodes_visited, cost_total)
+			# END IF
+			continue
+		# END IF
+
+		# -----------------------
+		# STEP 4: EXPAND THE NODE
+		# -----------------------
+		# Same rotation of the children of bruteForceWithPrunning: the slot of the next child is filled
+		# with the previous child, so each step costs a single assignment.
+		weights_from_current_node = edge_weight[current_node]
+		best_child = None
+
+		if collect_statistics:
+			nodes_expanded_at_depth[depth] += 1
+
+		child_node = nodes_to_be_visited.pop()
+		nodes_visited.append(child_node)
+		for position in xrange(len(nodes_to_be_visited), -1, -1):
+			if position < len(nodes_to_be_visited):
+				previous_child_node = child_node
+				child_node = nodes_to_be_visited[position]
+				nodes_to_be_visited[position] = previous_child_node
+				nodes_visited[-1] = child_node
+			# END IF
+
+			cost_of_that_child = cost_of_current_node + weights_from_current_node[child_node]
+			lower_bound_of_that_child = lowerBoundFunction(context, nodes_visited, nodes_to_be_visited, cost_of_that_child)
+
+			if lower_bound_of_that_child < context.min_cost_so_far:
+				num_nodes = num_nodes + 1
+				child = (lower_bound_of_that_child, negative_depth - 1, num_nodes, cost_of_that_child, (child_node, prefix))
+				if best_child is None:
+					best_child = child
+				elif child < best_child:
+					heappush(open_nodes, best_child)
+					best_child = child
+				else:
+					heappush(open_nodes, child)
+			elif collect_statistics:
+				children_prunned_at_depth[depth + 1] += 1
+			# END IF
+		# END FOR
+
+		# Dives into the best child while no permutation has been found or the memory is short
+		if best_child is not None:
+			if dive_first and (len(context.min_path_so_far) == 0 or len(open_nodes) >= dive_open_nodes):
+				next_node = best_child
+			else:
+				heappush(open_nodes, best_child)
+		# END IF
+	# END WHILE
+
+	context.open_node_sources.pop()
+	return
+
+'''
+FUNCTION
+	hybridSearch
+DESCRIPTION:
+	bestFirstSearch diving depth-first until the first permutation is found, and while more than
+	DIVE_OPEN_NODES_FRACTION of max_open_nodes are open (see bestFirstSearch).
+PARAMETERS:
+	The same of bruteForceWithPrunning
+RETURNS
+	<nothing>
+'''
+def hybridSearch(	context,
+					list_nodes_visited,
+					list_nodes_to_be_visited,
+					cost_so_far,
+					lowerBoundFunction):
+
+	bestFirstSearch(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far, lowerBoundFunction, True)
+
+'''
+CONSTANT
+	SEARCH_STRATEGIES
+DESCRIPTION:
+	The functions that search the permutation tree, by name. All of them receive the same parameters.
+'''
+SEARCH_STRATEGIES = {
+	'depth-first': bruteForceWithPrunning,
+	'best-first': bestFirstSearch,
+	'hybrid': hybridSearch,
+}
+
+'''
+FUNCTION
+	prepareSearch
+DESCRIPTION:
+	Creates the SearchContext of a search: sets the input of the problem, builds the edge index, allocates the buffers
+	of the lower bounds, the dominance table and the statistics, prepares the 2-opt prunning and creates the output file.
+PARAMETERS:
+	cities
+		The list of cities [id, x, y], used to draw the permutations
+	costMatrix
+		The matrix of the weights of the edges (see edge_weight), a list of lists or a numpy array
+		(such as the memory-mapped one of tsplib.readCachedInstance, see edge_weight_array)
+	output_file
+		The path to the output file, or None for a search that writes nothing
+RETURNS
+	a SearchContext
+		The context of the search, to be given to runBruteForceWithPrunning (or to the search functions)
+CONTEXT ATTRIBUTES USED:
+	TO WRITE:
+		edge_weight
+		edge_weight_array
+		(and the ones of prepareReport)
+'''
+def prepareSearch(cities, costMatrix, output_file):
+
+	context = prepareReport(cities, len(costMatrix), output_file)
+
+	if isinstance(costMatrix, numpy.ndarray):
+		context.edge_weight_array = costMatrix
+		context.edge_weight = costMatrix.tolist()
+	else:
+		context.edge_weight = costMatrix
+		context.edge_weight_array = numpy.array(costMatrix).reshape(len(costMatrix), len(costMatrix))
+	# END IF
+
+	buildEdgeIndex(context)
+	allocateLowerBoundBuffers(context)
+	resetDominanceTable(context)
+	prepareTwoOptPrunning(context)
+	resetStatistics(context)
+
+	return context
+
+'''
+FUNCTION
+	prepareReport
+DESCRIPTION:
+	Creates a SearchContext with what is used to report the permutations found (and no permutation found yet),
+	starts the clock and creates the output file.
+	Used by any algorithm that reports its permutations with registerNewBestPermutation, such as the heuristics
+	of heuristic.py, which have no cost matrix.
+PARAMETERS:
+	cities
+		The list of cities [id, x, y], used to draw the permutations
+	num_vertices
+		The number of vertices
+	output_file
+		The path to the output file, or None for a search that writes nothing
+RETURNS
+	a SearchContext
+		The context, with the clock started at its creation
+CONTEXT ATTRIBUTES USED:
+	TO WRITE:
+		num_vertices
+		cities
+		city_pixels
+		output_file
+'''
+def prepareReport(cities, num_vertices, output_file):
+
+	context = SearchContext()
+
+	context.cities = cities
+	context.output_file = output_file
+	context.num_vertices = num_vertices
+	if REPORT_IMAGES:
+		context.city_pixels = projectCities(cities, num_vertices)
+
+	if context.output_file is not None:
+		output_directory = os.path.dirname(context.output_file)
+		if output_directory and not os.path.isdir(output_directory):
+			os.makedirs(output_directory)
+
+		file_out = open(context.output_file,"w")
+		file_out.write("BEST PERMUTATIONS FOUND SO FAR\n")
+		file_out.close()
+	# END IF
+
+	return context
+
+'''
+FUNCTION
+	setInitialPermutation
+DESCRIPTION:
+	Keeps a permutation found by other means (such as a heuristic) as the best one found so far.
+	Its cost is the upper bound the search starts with. The search only keeps permutations that are
+	strictly cheaper, so it ends with this one if no other is better.
+PARAMETERS:
+	context
+		The SearchContext of the search
+	path
+		The permutation (a list with every vertex once), rotated here to start at vertex zero
+RETURNS
+	<nothing>
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		edge_weight
+		num_vertices
+	TO WRITE:
+		min_cost_so_far
+		min_path_so_far
+'''
+def setInitialPermutation(context, path):
+
+	if sorted(path) != range(context.num_vertices):
+		raise ValueError("the initial permutation should have every vertex once")
+
+	start = path.index(0)
+	path = path[start:] + path[:start]
+
+	cost_total = 0
+	for i in xrange(context.num_vertices):
+		cost_total = cost_total + context.edge_weight[path[i - 1]][path[i]]
+	# END FOR
+
+	if cost_total < context.min_cost_so_far:
+		registerNewBestPermutation(context, path, cost_total)
+
+'''
+FUNCTION
+	runBruteForceWithPrunning
+DESCRIPTION:
+	Runs the brute force algorithm with the prunning of a SearchContext made by prepareSearch, from the first node
+	(node zero) of the complete graph.
+	The search stops at the deadline or after a stop signal (see ANYTIME SEARCH), and then returns with the best
+	permutation found so far, writing the lower bound of the best permutation and the gap to the output file.
+	stop_reason tells whether it stopped, and search_lower_bound is the lower bound.
+	With a checkpoint file, checkpoints are written to it (see writeCheckpoint), and it is removed when the search ends
+	(but not when it stops, so it can be resumed).
+	With resume, the search continues from that file, if it exists.
+	Everything the search writes is in the context, so several searches, each with its own context, can run
+	in different threads of the same process (see solver.py). It prints nothing.
+PARAMETERS:
+	context
+		The SearchContext of the search, which holds the results in the end
+	lowerBoundFunction
+		The lower bound function to be used. This function should receive as parameters the following:
+				context
+					The SearchContext of the search
+				list_nodes_visited
+					The list of visited vertices so far in that partial permutation
+				list_nodes_to_be_visited
+					The list of vertices that have not been visited yet in that partial permutation
+				cost_so_far
+					The cost so far of the edges that connect the vertices in that partial permutation
+	search_strategy
+		The name of the search of the permutation tree (see SEARCH_STRATEGIES)
+	initial_path
+		A permutation to start with as the best one found so far (see setInitialPermutation), or None
+	checkpoint_file
+		The path to the checkpoint file, or None for no checkpoints
+	resume
+		True to continue the search of the checkpoint file
+RETURNS
+	a string
+		The lines written to the output file when the search ended (see end_message): the time of the search,
+		or why it stopped, the lower bound and the gap
+CONTEXT ATTRIBUTES USED:
+	TO READ:
+		num_vertices
+		edge_weight
+		output_file
+		statistics_file
+	TO WRITE:
+		min_cost_so_far
+		min_path_so_far
+		num_leaves_visited_so_far
+		checkpoint_file
+		last_checkpoint_time_in_seconds
+		search_lower_bound
+		end_message
+'''
+def runBruteForceWithPrunning(context, lowerBoundFunction, search_strategy='depth-first', initial_path=None, checkpoint_file=None, resume=False):
+
+	context.checkpoint_file = checkpoint_file
+	context.last_checkpoint_time_in_seconds = context.start_time_in_seconds
+
+	# The open nodes of the checkpoint, or else the root: only node zero has already been visited,
+	# all the other nodes have not been visited yet, and the permutation with only the vertex zero has no cost
+	if resume and checkpoint_file is not None and os.path.isfile(checkpoint_file):
+		open_nodes = readCheckpoint(context, checkpoint_file)
+		if context.output_file is not None:
+			file_out = open(context.output_file,"a")
+			file_out.write("Resumed from " + checkpoint_file + " after " + str(context.time_searched_before_in_seconds) + "s\n")
+			file_out.close()
+	else:
+		open_nodes = [ (float('-inf'), [0], 0) ]
+	# END IF
+
+	# A good permutation to start with (see heuristic.py) prunes from the first node of the search,
+	# instead of from the first leaf
+	if initial_path is not None:
+		setInitialPermutation(context, initial_path)
+
+	if context.statistics_file is not None:
+		lowerBoundFunction = instrumentedLowerBound(context, lowerBoundFunction)
+
+	# Starts the search, until it ends or stops (checkTimeLimit then writes the checkpoint and the statistics)
+	searchFunction = SEARCH_STRATEGIES[search_strategy]
+	previous_handlers = installStopSignalHandlers(context)
+	try:
+		searchOpenNodes(context, open_nodes, searchFunction, lowerBoundFunction)
+		context.search_lower_bound = context.min_cost_so_far
+	except SearchStopped:
+		del context.open_node_sources[:]
+	finally:
+		restoreSignalHandlers(context, previous_handlers)
+
+	time_elapsed_in_seconds = time.time() - context.start_time_in_seconds
+
+	if context.stop_reason is None:
+		end_message = "Search end in " + str(time_elapsed_in_seconds) + "s\n"
+		if context.statistics_file is not None:
+			writeStatistics(context, True)
+		if checkpoint_file is not None and os.path.isfile(checkpoint_file):
+			os.remove(checkpoint_file)
+	else:
+		end_message = stopMessage(context) + gapMessage(context)
+	# END IF
+	context.end_message = end_message
+
+	finishReports(context)
+	if context.output_file is not None:
+		file_out = open(context.output_file,"a")
+		file_out.write(end_message)
+		file_out.close()
+
+	return end_message
+
+'''
+FUNCTION
+	initBruteForceWithPrunning
+DESCRIPTION:
+	Prepares a search (see prepareSearch) and runs it (see runBruteForceWithPrunning)
+PARAMETERS:
+	cities
+		The list of cities [id, x, y], used to draw the permutations
+	costMatrix
+		The matrix of the weights of the edges (see prepareSearch)
+	lowerBoundFunction
+		The lower bound function to be used (see runBruteForceWithPrunning)
+	output_file
+		The path to the output file, or None for a search that writes nothing
+	search_strategy
+	initial_path
+	checkpoint_file
+	resume
+		The same of runBruteForceWithPrunning
+RETURNS
+	a SearchContext
+		The context of the search, with the best permutation found and the other results (see the report functions)
+'''
+def initBruteForceWithPrunning(cities, costMatrix, lowerBoundFunction, output_file, search_strategy='depth-first', initial_path=None, checkpoint_file=None, resume=False):
+
+	print("Algorithm started...")
+	context = prepareSearch(cities, costMatrix, output_file)
+	runBruteForceWithPrunning(context, lowerBoundFunction, search_strategy, initial_path, checkpoint_file, resume)
+	return context
+
+def reportNumberPermutations(context):
+	return math.factorial(context.num_vertices-1)
+
+def reportLowestCost(context):
+	return context.min_cost_so_far
+
+def reportLowestCostPath(context):
+	return context.min_path_so_far
+
+def reportNumberOfLeavesVisisted(context):
+	return context.num_leaves_visited_so_far
+
+def reportPruningPercentage(context):
+	number_of_possible_permutations = math.factorial(context.num_vertices-1)
+	return (1.0 - float(context.num_leaves_visited_so_far)/float(number_of_possible_permutations))*100.0
+'''
+=============================================================================
 MAIN FUNCTION
 =============================================================================
 '''
 
 def main():
 
-	number_of_possible_permutations = math.factorial(NUM_VERTICES-1)
+	number_of_possible_permutations = math.factorial(len(EXAMPLE_EDGE_WEIGHT)-1)
 
 	print("--------")
 	print "NUMBER OF POSSIBLE PERMUTATIONS = " + str(number_of_possible_permutations)
 
-	initBruteForceWithPrunning(zeroLowerBound)
-	print("--------")
-	print "LOWER BOUND USED: Zero Lower Bound"
-	print "Lowest Cost = " + str(min_cost_so_far)
-	print "Correspondent Permutation = " + str(min_path_so_far)
-	print "Number of Leaves Visited = " + str(num_leaves_visited_so_far)
-	print "Percentage of Permutations prunned = " + str((1.0 - float(num_leaves_visited_so_far)/float(number_of_possible_permutations))*100.0) + "%"
-
-	initBruteForceWithPrunning(sumMinEdgesBound)
-	print("--------")
-	print "LOWER BOUND USED: Sum Min Edges"
-	print "Lowest Cost = " + str(min_cost_so_far)
-	print "Correspondent Permutation = " + str(min_path_so_far)
-	print "Number of Leaves Visited = " + str(num_leaves_visited_so_far)
-	print "Percentage of Permutations prunned = " + str((1.0 - float(num_leaves_visited_so_far)/float(number_of_possible_permutations))*100.0) + "%"
-
-	initBruteForceWithPrunning(qRouteLowerBound)
-	print("--------")
-	print "LOWER BOUND USED: Q Route"
-	print "Lowest Cost = " + str(min_cost_so_far)
-	print "Correspondent Permutation = " + str(min_path_so_far)
-	print "Number of Leaves Visited = " + str(num_leaves_visited_so_far)
-	print "Percentage of Permutations prunned = " + str((1.0 - float(num_leaves_visited_so_far)/float(number_of_possible_permutations))*100.0) + "%"
+	for lowerBoundFunction, name in [	(zeroLowerBound, "Zero Lower Bound"),
+										(sumMinEdgesBound, "Sum Min Edges"),
+										(qRouteLowerBound, "Q Route") ]:
+		context = initBruteForceWithPrunning([], EXAMPLE_EDGE_WEIGHT, lowerBoundFunction, None)
+		print("--------")
+		print "LOWER BOUND USED: " + name
+		print "Lowest Cost = " + str(reportLowestCost(context))
+		print "Correspondent Permutation = " + str(reportLowestCostPath(context))
+		print "Number of Leaves Visited = " + str(reportNumberOfLeavesVisisted(context))
+		print "Percentage of Permutations prunned = " + str(reportPruningPercentage(context)) + "%"
+	# END FOR
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,313 @@
+import multiprocessing
+import signal
+import time
+
+import heuristic
+import prunning
+import tsplib
+
+'''
+=============================================================================
+SOLVER LIBRARY
+=============================================================================
+The brute force with prunning as a library: Solver.solve searches an instance and returns a
+SearchResult, instead of a prunning.SearchContext for the report functions of prunning.
+
+Each solve searches with its own SearchContext, with the settings of its Solver, and changes nothing in prunning,
+so solves from several threads run at the same time, each with its own settings, and a solve can be called while
+another one runs (the search is pure Python, so the threads share the interpreter lock: they are concurrent, but not
+faster than one after the other).
+Only a solve of the main thread handles the stop signals (see prunning.installStopSignalHandlers): a stop signal
+stops it, and the solves of the other threads go on until their time limit.
+Solver.solveBatch runs many instances at once in a pool of processes, as parallel.py does with the subproblems
+of a single instance.
+'''
+
+'''
+CONSTANT
+	POLL_INTERVAL_IN_SECONDS
+DESCRIPTION:
+	The longest Solver.solveBatch waits for the pool at once, so Ctrl+C interrupts the wait
+	(a wait without a timeout cannot be interrupted by a signal in Python 2)
+'''
+POLL_INTERVAL_IN_SECONDS = 0.1
+
+'''
+CONSTANT
+	LOWER_BOUNDS
+DESCRIPTION:
+	The lower bound functions of prunning, by name (the names of the output directories of tsp.py)
+'''
+LOWER_BOUNDS = {
+	'zero': prunning.zeroLowerBound,
+	'sumMinEdges': prunning.sumMinEdgesBound,
+	'qRoute': prunning.qRouteNoTwoCycleLowerBound,
+	'minTree': prunning.incrementalMinimumTreeBound,
+	'heldKarp': prunning.heldKarpBound,
+}
+
+'''
+CLASS
+	SearchResult
+DESCRIPTION:
+	The result of a solve
+ATTRIBUTES:
+	name
+		The name of the instance
+	cost
+		The cost of the best permutation found, or None if none was found
+	path
+		The best permutation found, starting at vertex zero (empty if none was found)
+	leaves_visited
+		The number of leaves of the permutation tree visited
+	time_in_seconds
+		The time of the search, without the warm start
+	timed_out
+		True if the search stopped before the end, at the time limit or by a stop signal (see prunning.STOP_SIGNALS),
+		so the permutation may not be the best one
+	lower_bound
+		A lower bound of the cost of the best permutation (the cost itself if the search did not stop),
+		or None if there is none
+'''
+class SearchResult(object):
+
+	__slots__ = ('name', 'cost', 'path', 'leaves_visited', 'time_in_seconds', 'timed_out', 'lower_bound')
+
+	def __init__(self, name, cost, path, leaves_visited, time_in_seconds, timed_out, lower_bound):
+		self.name = name
+		self.cost = cost
+		self.path = path
+		self.leaves_visited = leaves_visited
+		self.time_in_seconds = time_in_seconds
+		self.timed_out = timed_out
+		self.lower_bound = lower_bound
+
+	def __repr__(self):
+		return "SearchResult(name=%r, cost=%r, leaves_visited=%r, time_in_seconds=%.3f, timed_out=%r, lower_bound=%r)" % (	self.name,
+																															self.cost,
+																															self.leaves_visited,
+																															self.time_in_seconds,
+																															self.timed_out,
+																															self.lower_bound)
+
+	'''
+	METHOD
+		gap
+	DESCRIPTION:
+		How far from the best permutation the permutation found can be: (cost - lower bound) / lower bound
+	RETURNS
+		a float, or None if there is no cost or no positive lower bound
+	'''
+	def gap(self):
+		if self.cost is None or not self.lower_bound:
+			return None
+		return (self.cost - self.lower_bound) / float(self.lower_bound)
+
+	'''
+	METHOD
+		asTuple
+	DESCRIPTION:
+		The attributes, in the order of __slots__ (the arguments of the constructor)
+	'''
+	def asTuple(self):
+		return tuple([getattr(self, attribute) for attribute in self.__slots__])
+
+'''
+CLASS
+	Solver
+DESCRIPTION:
+	The configuration of the searches: the default lower bound and time limit of solve, the search strategy,
+	the warm start and the settings of the prunning
+ATTRIBUTES:
+	bound
+		The default lower bound: a name of LOWER_BOUNDS or a lower bound function (see prunning.bruteForceWithPrunning)
+	time_limit
+		The default time limit of each search, in seconds
+	search_strategy
+		The name of the search of the permutation tree (see prunning.SEARCH_STRATEGIES)
+	warm_start
+		True to start each search with the tour of heuristic.warmStartTour
+	max_open_nodes
+	dominance_table_size
+	two_opt_prunning
+	batched_bounds
+		The settings of each search (see prunning.SEARCH_SETTINGS), the constants of prunning by default
+'''
+class Solver(object):
+
+	__slots__ = (	'bound', 'time_limit', 'search_strategy', 'warm_start',
+					'max_open_nodes', 'dominance_table_size', 'two_opt_prunning', 'batched_bounds')
+
+	def __init__(	self,
+					bound='sumMinEdges',
+					time_limit=prunning.TIME_TO_RUN_ALGORITHM_IN_SECONDS,
+					search_strategy='depth-first',
+					warm_start=True,
+					max_open_nodes=prunning.MAX_OPEN_NODES,
+					dominance_table_size=prunning.DOMINANCE_TABLE_SIZE,
+					two_opt_prunning=prunning.TWO_OPT_PRUNNING,
+					batched_bounds=prunning.BATCHED_BOUNDS):
+		self.bound = bound
+		self.time_limit = time_limit
+		self.search_strategy = search_strategy
+		self.warm_start = warm_start
+		self.max_open_nodes = max_open_nodes
+		self.dominance_table_size = dominance_table_size
+		self.two_opt_prunning = two_opt_prunning
+		self.batched_bounds = batched_bounds
+
+	'''
+	METHOD
+		solve
+	DESCRIPTION:
+		Searches an instance for its best permutation, with the brute force with prunning.
+		Can be called from several threads (see the header of this file).
+	PARAMETERS:
+		instance
+			The path to a TSPLIB file, an instance read by tsplib.readInstance, or a cost matrix (a list of lists)
+		bound
+			The lower bound (see the attribute bound), or None for the default one
+		time_limit
+			The time limit in seconds, or None for the default one
+	RETURNS
+		a SearchResult
+	'''
+	def solve(self, instance, bound=None, time_limit=None):
+
+		if bound is None:
+			bound = self.bound
+		if time_limit is None:
+			time_limit = self.time_limit
+		lowerBoundFunction = LOWER_BOUNDS.get(bound, bound)
+
+		name, cities, costMatrix = loadInstance(instance)
+
+		context = prunning.prepareSearch(cities, costMatrix, None)
+
+		initial_path = None
+		if self.warm_start:
+			# From the neighbours the context has already sorted (see prunning.buildEdgeIndex).
+			# The clock of the search starts after it, as if the context was made now.
+			initial_path = heuristic.warmStartTour(costMatrix, context.sorted_neighbours)
+			context.start_time_in_seconds = time.time()
+			context.last_time_check_in_seconds = context.start_time_in_seconds
+
+		context.time_limit = time_limit
+		context.max_open_nodes = self.max_open_nodes
+		context.dominance_table_size = self.dominance_table_size
+		context.two_opt_prunning = self.two_opt_prunning
+		context.batched_bounds = self.batched_bounds
+		context.statistics_file = None
+
+		# Returns at the time limit too, with the best permutation found so far (see prunning.checkTimeLimit)
+		prunning.runBruteForceWithPrunning(context, lowerBoundFunction, self.search_strategy, initial_path)
+
+		cost = context.min_cost_so_far
+		if cost == float('inf'):
+			cost = None
+		lower_bound = context.search_lower_bound
+		if lower_bound in (float('inf'), float('-inf')):
+			lower_bound = None
+		return SearchResult(	name,
+								cost,
+								list(context.min_path_so_far),
+								context.num_leaves_visited_so_far,
+								time.time() - context.start_time_in_seconds,
+								context.stop_reason is not None,
+								lower_bound)
+
+	'''
+	METHOD
+		solveBatch
+	DESCRIPTION:
+		Solves many instances at once, in a pool of processes (see the header of this file).
+		The lower bound should be a name of LOWER_BOUNDS or a function defined at the top level of a module,
+		so it can be sent to the processes.
+	PARAMETERS:
+		instances
+			The instances (see solve)
+		num_processes
+			The number of processes of the pool (by default, the number of CPUs)
+		bound
+			The lower bound (see solve)
+		time_limit
+			The time limit of each search (see solve)
+	RETURNS
+		a list
+			The SearchResult of each instance, in the order of instances
+	'''
+	def solveBatch(self, instances, num_processes=None, bound=None, time_limit=None):
+
+		if bound is None:
+			bound = self.bound
+		if time_limit is None:
+			time_limit = self.time_limit
+		if num_processes is None:
+			num_processes = multiprocessing.cpu_count()
+
+		tasks = [(self, bound, time_limit, instance) for instance in instances]
+		pool = multiprocessing.Pool(num_processes, initBatchWorker)
+		try:
+			batch = pool.map_async(solveBatchTask, tasks, 1)
+			while not batch.ready():
+				batch.wait(POLL_INTERVAL_IN_SECONDS)
+			results = batch.get()
+			pool.close()
+		finally:
+			pool.terminate()
+			pool.join()
+
+		return [SearchResult(*result) for result in results]
+
+'''
+FUNCTION
+	initBatchWorker
+DESCRIPTION:
+	Runs once in every process of the pool of Solver.solveBatch
+RETURNS
+	<nothing>
+'''
+def initBatchWorker():
+
+	# Ctrl+C is handled by the main process, which terminates the pool (with SIGTERM, which must not be handled)
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	prunning.STOP_SIGNALS = []
+
+'''
+FUNCTION
+	solveBatchTask
+DESCRIPTION:
+	Runs in a process of the pool of Solver.solveBatch: solves one instance
+PARAMETERS:
+	task
+		A tuple (Solver, bound, time limit, instance), the parameters of Solver.solve
+RETURNS
+	a tuple
+		The SearchResult as a tuple (see SearchResult.asTuple)
+'''
+def solveBatchTask(task):
+
+	solver, bound, time_limit, instance = task
+	return solver.solve(instance, bound, time_limit).asTuple()
+
+'''
+FUNCTION
+	loadInstance
+DESCRIPTION:
+	The input of a search
+PARAMETERS:
+	instance
+		The instance (see Solver.solve)
+RETURNS
+	a tuple
+		(the name of the instance, the list of cities [id, x, y] (possibly empty), the cost matrix as a list of lists,
+		or as the memory-mapped numpy array of the cache of a TSPLIB file (see prunning.prepareSearch))
+'''
+def loadInstance(instance):
+
+	if isinstance(instance, basestring):
+		instance, costMatrix = tsplib.readCachedInstance(instance)
+		return instance['name'], instance['cities'], costMatrix
+	if isinstance(instance, dict):
+		return instance['name'], instance['cities'], tsplib.constructCostMatrix(instance)
+	return None, [], [list(row) for row in instance]
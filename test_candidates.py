@@ -0,0 +1,88 @@
+import random
+import unittest
+
+import numpy
+
+import candidates
+import heldkarp
+import tsplib
+
+
+def planarInstance(edgeWeightType, points):
+    cities = [[i + 1, float(x), float(y)] for i, (x, y) in enumerate(points)]
+    return {"name": "candidates",
+            "dimension": len(cities),
+            "edgeWeightType": edgeWeightType,
+            "edgeWeightFormat": "FUNCTION",
+            "cities": cities,
+            "explicitWeights": None}
+
+
+def quadrantsOf(difference):
+    dx, dy = difference
+    return [dx > 0 and dy >= 0, dx <= 0 and dy > 0, dx < 0 and dy <= 0, dx >= 0 and dy < 0]
+
+
+class CandidateListsTest(unittest.TestCase):
+
+    def assertNearestNeighbours(self, instance, numNearest=4, numQuadrant=2):
+        # Against the brute force over the whole cost matrix. With ties, other vertices at the same distance may
+        # have been chosen, so the distances are compared.
+        costMatrix = tsplib.constructCostMatrix(instance)
+        coordinates = tsplib.coordinatesArray(instance["cities"])
+        norm = candidates.NORM_OF_EDGE_WEIGHT_TYPE[instance["edgeWeightType"]]
+        numVertices = len(costMatrix)
+        neighbours = candidates.candidateLists(instance, numNearest, numQuadrant)
+
+        self.assertEqual(len(neighbours), numVertices)
+        for vertex in xrange(numVertices):
+            others = [other for other in xrange(numVertices) if other != vertex]
+            self.assertEqual(len(set(neighbours[vertex])), len(neighbours[vertex]))
+            self.assertNotIn(vertex, neighbours[vertex])
+
+            weights = [costMatrix[vertex][other] for other in neighbours[vertex]]
+            self.assertEqual(weights, sorted(weights))
+            nearest = min(numNearest, numVertices - 1)
+            self.assertEqual(weights[:nearest], sorted([costMatrix[vertex][other] for other in others])[:nearest])
+
+            norms = dict([(other, numpy.linalg.norm(coordinates[other] - coordinates[vertex], ord=norm)) for other in others])
+            for quadrant in xrange(4):
+                inQuadrant = [other for other in others if quadrantsOf(coordinates[other] - coordinates[vertex])[quadrant]]
+                found = [other for other in neighbours[vertex] if other in inQuadrant]
+                expected = sorted([norms[other] for other in inQuadrant])[:numQuadrant]
+                self.assertEqual(sorted([norms[other] for other in found])[:len(expected)], expected)
+
+    def testRandomCities(self):
+        rng = random.Random(20)
+        for edgeWeightType in sorted(candidates.NORM_OF_EDGE_WEIGHT_TYPE):
+            points = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for i in xrange(150)]
+            self.assertNearestNeighbours(planarInstance(edgeWeightType, points))
+
+    def testClusteredCities(self):
+        # Clusters far from each other: the quadrant neighbours leave the cluster
+        rng = random.Random(21)
+        centers = [(0, 0), (5000, 0), (0, 5000), (5000, 5000)]
+        points = [(cx + rng.gauss(0, 10), cy + rng.gauss(0, 10)) for cx, cy in centers for i in xrange(30)]
+        self.assertNearestNeighbours(planarInstance("EUC_2D", points))
+
+    def testDegenerateCities(self):
+        rng = random.Random(22)
+        line = [(rng.randint(0, 100), 7) for i in xrange(60)]
+        diagonal = [(i, i) for i in xrange(40)]
+        integerGrid = [(x, y) for x in xrange(8) for y in xrange(8)]
+        duplicates = [(rng.choice([0, 10]), rng.choice([0, 10])) for i in xrange(30)]
+        for points in (line, diagonal, integerGrid, duplicates, [(3, 3)] * 10, [(0, 0), (1, 1)]):
+            for edgeWeightType in ("EUC_2D", "MAN_2D", "MAX_2D"):
+                self.assertNearestNeighbours(planarInstance(edgeWeightType, points))
+
+    def testNearestNeighbourLowerBound(self):
+        rng = random.Random(23)
+        for trial in xrange(5):
+            instance = planarInstance("EUC_2D", [(rng.uniform(0, 100), rng.uniform(0, 100)) for i in xrange(10)])
+            costMatrix = tsplib.constructCostMatrix(instance)
+            bound = candidates.nearestNeighbourLowerBound(lambda u, v: costMatrix[u][v], candidates.candidateLists(instance))
+            self.assertLessEqual(bound, heldkarp.heldKarpTour(costMatrix)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
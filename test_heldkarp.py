@@ -0,0 +1,19 @@
+import unittest
+
+import heldkarp
+from test_prunning import bestCost, randomInstances
+
+
+class HeldKarpTourTest(unittest.TestCase):
+
+    def testOptimalTour(self):
+        for symmetric in [True, False]:
+            for matrix in randomInstances(20, 10, symmetric):
+                cost, tour = heldkarp.heldKarpTour(matrix)
+                self.assertEqual(cost, bestCost(matrix))
+                self.assertEqual(sorted(tour), range(len(matrix)))
+                self.assertEqual(sum([matrix[tour[i - 1]][tour[i]] for i in xrange(len(tour))]), cost)
+
+
+if __name__ == "__main__":
+    unittest.main()
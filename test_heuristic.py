@@ -0,0 +1,69 @@
+import random
+import unittest
+
+import heuristic
+import prunning
+
+
+def randomMatrix(rng, num_vertices, symmetric):
+    matrix = [[0] * num_vertices for i in xrange(num_vertices)]
+    for i in xrange(num_vertices):
+        for j in xrange(num_vertices):
+            if i != j:
+                matrix[i][j] = rng.randint(1, 50)
+    if symmetric:
+        for i in xrange(num_vertices):
+            for j in xrange(i):
+                matrix[i][j] = matrix[j][i]
+    return matrix
+
+
+class WarmStartTourTest(unittest.TestCase):
+
+    def assertTour(self, tour, num_vertices):
+        self.assertEqual(sorted(tour), range(num_vertices))
+        self.assertEqual(tour[0], 0)
+
+    def testAsymmetricMatrix(self):
+        # The moves of the local search assume a symmetric matrix: on this one they looped forever
+        matrix = [[0, 12, 3, 1], [43, 0, 17, 9], [8, 33, 0, 49], [26, 46, 26, 0]]
+        tour = heuristic.warmStartTour(matrix)
+        self.assertTour(tour, 4)
+        self.assertEqual(tour, heuristic.nearestNeighbourTour(matrix))
+
+    def testRandomAsymmetricMatrices(self):
+        rng = random.Random(8)
+        for trial in xrange(50):
+            num_vertices = rng.randint(4, 9)
+            self.assertTour(heuristic.warmStartTour(randomMatrix(rng, num_vertices, False)), num_vertices)
+
+    def testSymmetricMatrixIsImproved(self):
+        rng = random.Random(8)
+        for trial in xrange(50):
+            num_vertices = rng.randint(4, 9)
+            matrix = randomMatrix(rng, num_vertices, True)
+            tour = heuristic.warmStartTour(matrix)
+            self.assertTour(tour, num_vertices)
+            self.assertLessEqual(heuristic.tourCost(tour, matrix),
+                                 heuristic.tourCost(heuristic.nearestNeighbourTour(matrix), matrix))
+
+    def testNeighboursOfTheSearchContext(self):
+        rng = random.Random(12)
+        for num_vertices in (4, 15, 40):
+            # Distinct weights, so the neighbours of the context and of heuristic are the same
+            weights = rng.sample(xrange(1, 10 * num_vertices * num_vertices), num_vertices * num_vertices)
+            matrix = [[0] * num_vertices for i in xrange(num_vertices)]
+            for i in xrange(num_vertices):
+                for j in xrange(i):
+                    matrix[i][j] = matrix[j][i] = weights[i * num_vertices + j]
+
+            sorted_neighbours = prunning.prepareSearch([], matrix, None).sorted_neighbours
+            for vertex in xrange(num_vertices):
+                row = sorted_neighbours[vertex].tolist()
+                self.assertEqual(sorted(row), [other for other in xrange(num_vertices) if other != vertex])
+                self.assertEqual([matrix[vertex][other] for other in row], sorted([matrix[vertex][other] for other in row]))
+            self.assertEqual(heuristic.warmStartTour(matrix, sorted_neighbours), heuristic.warmStartTour(matrix))
+
+
+if __name__ == "__main__":
+    unittest.main()
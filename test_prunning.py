@@ -0,0 +1,269 @@
+import itertools
+import math
+import os
+import random
+import shutil
+import signal
+import tempfile
+import threading
+import unittest
+
+import heuristic
+import prunning
+from test_heuristic import randomMatrix
+
+
+BOUNDS = [prunning.zeroLowerBound, prunning.sumMinEdgesBound, prunning.qRouteLowerBound,
+          prunning.qRouteNoTwoCycleLowerBound, prunning.minimumTreeBound, prunning.incrementalMinimumTreeBound,
+          prunning.heldKarpBound]
+
+# The spanning tree and 1-tree bounds assume a symmetric matrix
+SYMMETRIC_BOUNDS = [prunning.minimumTreeBound, prunning.incrementalMinimumTreeBound, prunning.heldKarpBound]
+
+TOGGLES = ["BATCHED_BOUNDS", "TWO_OPT_PRUNNING", "DOMINANCE_TABLE_SIZE"]
+
+
+def bestCost(matrix):
+    # The exact answer, by enumerating every permutation that starts at vertex zero
+    num_vertices = len(matrix)
+    best = None
+    for rest in itertools.permutations(range(1, num_vertices)):
+        tour = (0,) + rest
+        cost = sum([matrix[tour[i - 1]][tour[i]] for i in xrange(num_vertices)])
+        if best is None or cost < best:
+            best = cost
+    return best
+
+
+def randomInstances(seed, count, symmetric):
+    rng = random.Random(seed)
+    return [randomMatrix(rng, rng.randint(1, 9), symmetric) for trial in xrange(count)]
+
+
+class PrunningTestCase(unittest.TestCase):
+    # Restores the module toggles a test changes
+
+    def setUp(self):
+        self.toggles = [getattr(prunning, toggle) for toggle in TOGGLES]
+
+    def tearDown(self):
+        for toggle, value in zip(TOGGLES, self.toggles):
+            setattr(prunning, toggle, value)
+
+    def search(self, matrix, lowerBoundFunction, search_strategy="depth-first", initial_path=None):
+        context = prunning.prepareSearch([], matrix, None)
+        prunning.runBruteForceWithPrunning(context, lowerBoundFunction, search_strategy, initial_path)
+        return context
+
+    def assertBest(self, context, matrix, expected_cost):
+        path = context.min_path_so_far
+        self.assertEqual(context.min_cost_so_far, expected_cost)
+        self.assertEqual(sorted(path), range(len(matrix)))
+        self.assertEqual(sum([matrix[path[i - 1]][path[i]] for i in xrange(len(path))]), expected_cost)
+        self.assertIsNone(context.stop_reason)
+        self.assertEqual(context.search_lower_bound, expected_cost)
+
+
+class LowerBoundTest(PrunningTestCase):
+
+    def testBounds(self):
+        for symmetric in [True, False]:
+            for matrix in randomInstances(18, 12, symmetric):
+                expected_cost = bestCost(matrix)
+                for lowerBoundFunction in BOUNDS:
+                    if lowerBoundFunction in SYMMETRIC_BOUNDS and not symmetric:
+                        continue
+                    self.assertBest(self.search(matrix, lowerBoundFunction), matrix, expected_cost)
+
+    def testStopAtTheRoot(self):
+        # A search stopped at its first time check bounds the root itself for its open nodes
+        for symmetric in [True, False]:
+            for matrix in randomInstances(26, 6, symmetric):
+                expected_cost = bestCost(matrix)
+                for lowerBoundFunction in BOUNDS:
+                    if lowerBoundFunction in SYMMETRIC_BOUNDS and not symmetric:
+                        continue
+                    for search_strategy in sorted(prunning.SEARCH_STRATEGIES):
+                        context = prunning.prepareSearch([], matrix, None)
+                        context.time_limit = -1
+                        prunning.runBruteForceWithPrunning(context, lowerBoundFunction, search_strategy)
+                        if len(matrix) > 2:
+                            self.assertEqual(context.stop_reason, "deadline")
+                        self.assertLessEqual(context.search_lower_bound, expected_cost)
+
+
+class SearchStrategyTest(PrunningTestCase):
+
+    def testStrategies(self):
+        for symmetric in [True, False]:
+            for matrix in randomInstances(23, 8, symmetric):
+                expected_cost = bestCost(matrix)
+                for lowerBoundFunction in BOUNDS:
+                    if lowerBoundFunction in SYMMETRIC_BOUNDS and not symmetric:
+                        continue
+                    for search_strategy in sorted(prunning.SEARCH_STRATEGIES):
+                        self.assertBest(self.search(matrix, lowerBoundFunction, search_strategy), matrix, expected_cost)
+
+
+class DominanceTableTest(PrunningTestCase):
+
+    def testSameOptimum(self):
+        # A table too small for the instances forgets entries, which only prunes less
+        for symmetric in [True, False]:
+            for matrix in randomInstances(24, 6, symmetric):
+                expected_cost = bestCost(matrix)
+                for dominance_table_size in [0, 7, 1000000]:
+                    prunning.DOMINANCE_TABLE_SIZE = dominance_table_size
+                    for search_strategy in sorted(prunning.SEARCH_STRATEGIES):
+                        context = self.search(matrix, prunning.sumMinEdgesBound, search_strategy)
+                        self.assertBest(context, matrix, expected_cost)
+
+
+class SearchContextTest(PrunningTestCase):
+
+    def testSearchesDoNotShareState(self):
+        # A search run from inside the lower bound of another one leaves the outer one as it was
+        rng = random.Random(21)
+        outer_matrix = randomMatrix(rng, 8, False)
+        inner_matrix = randomMatrix(rng, 8, False)
+        inner_contexts = []
+
+        def nestedBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+            if len(inner_contexts) == 0:
+                inner_contexts.append(self.search(inner_matrix, prunning.sumMinEdgesBound))
+            return prunning.sumMinEdgesBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far)
+
+        self.assertBest(self.search(outer_matrix, nestedBound), outer_matrix, bestCost(outer_matrix))
+        self.assertBest(inner_contexts[0], inner_matrix, bestCost(inner_matrix))
+
+    def testSettingsOfTheContext(self):
+        # The zero bound prunes nothing, so only the dominance table and the 2-opt prunning drop leaves
+        matrix = randomMatrix(random.Random(27), 8, True)
+        context = prunning.prepareSearch([], matrix, None)
+        context.dominance_table_size = 0
+        context.two_opt_prunning = False
+        prunning.runBruteForceWithPrunning(context, prunning.zeroLowerBound)
+        self.assertBest(context, matrix, bestCost(matrix))
+        self.assertEqual(context.num_leaves_visited_so_far, math.factorial(len(matrix) - 1))
+
+        context = self.search(matrix, prunning.zeroLowerBound)
+        self.assertBest(context, matrix, bestCost(matrix))
+        self.assertLess(context.num_leaves_visited_so_far, math.factorial(len(matrix) - 1))
+
+    def testStopSignalOnlyStopsTheSearchOfTheMainThread(self):
+        if signal.getsignal(signal.SIGINT) != signal.default_int_handler:
+            self.skipTest("SIGINT is not handled by Python")
+        matrix = randomMatrix(random.Random(28), 9, False)
+        signal_sent = threading.Event()
+        thread_contexts = []
+
+        # The search of the thread is running when the signal is sent
+        def waitingBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+            signal_sent.wait()
+            return prunning.sumMinEdgesBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far)
+
+        def signallingBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+            if not signal_sent.is_set():
+                os.kill(os.getpid(), signal.SIGINT)
+                signal_sent.set()
+            return prunning.zeroLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far)
+
+        thread = threading.Thread(target=lambda: thread_contexts.append(self.search(matrix, waitingBound)))
+        thread.start()
+        try:
+            context = self.search(matrix, signallingBound)
+        finally:
+            signal_sent.set()
+            thread.join()
+
+        self.assertEqual(context.stop_reason, "signal")
+        self.assertEqual(context.stop_signal, signal.SIGINT)
+        self.assertLessEqual(context.search_lower_bound, bestCost(matrix))
+        self.assertBest(thread_contexts[0], matrix, bestCost(matrix))
+        self.assertEqual(prunning.stop_signal_contexts, [])
+
+
+class TwoOptPrunningTest(PrunningTestCase):
+
+    def testSameOptimum(self):
+        # The 2-opt prunning only drops permutations that a shorter one replaces, so the optimum stays the same
+        for symmetric in [True, False]:
+            for matrix in randomInstances(19, 6, symmetric):
+                expected_cost = bestCost(matrix)
+                for two_opt in [True, False]:
+                    prunning.TWO_OPT_PRUNNING = two_opt
+                    for initial_path in [None, heuristic.warmStartTour(matrix)]:
+                        for lowerBoundFunction in [prunning.sumMinEdgesBound, prunning.incrementalMinimumTreeBound]:
+                            if lowerBoundFunction in SYMMETRIC_BOUNDS and not symmetric:
+                                continue
+                            for search_strategy in ["depth-first", "hybrid"]:
+                                context = self.search(matrix, lowerBoundFunction, search_strategy, initial_path)
+                                self.assertBest(context, matrix, expected_cost)
+
+
+
+class CheckpointTest(PrunningTestCase):
+
+    def setUp(self):
+        PrunningTestCase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.checkpoint_file = os.path.join(self.directory, "search.checkpoint")
+
+    def tearDown(self):
+        PrunningTestCase.tearDown(self)
+        shutil.rmtree(self.directory)
+
+    def testRoundTrip(self):
+        matrix = randomMatrix(random.Random(22), 9, False)
+        expected_cost = bestCost(matrix)
+
+        # The zero bound prunes nothing, so without the dominance table and the 2-opt prunning the search visits
+        # every leaf once: the open nodes of the checkpoint lose none of them, and repeat none
+        prunning.DOMINANCE_TABLE_SIZE = 0
+        prunning.TWO_OPT_PRUNNING = False
+
+        for search_strategy in sorted(prunning.SEARCH_STRATEGIES):
+            calls = [0]
+
+            # Reaches the deadline after some nodes, so the checkpoint has open nodes at several depths
+            def stoppingBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far):
+                calls[0] = calls[0] + 1
+                if calls[0] == 2000:
+                    context.time_limit = -1
+                return prunning.zeroLowerBound(context, list_nodes_visited, list_nodes_to_be_visited, cost_so_far)
+
+            context = prunning.prepareSearch([], matrix, None)
+            prunning.runBruteForceWithPrunning(context, stoppingBound, search_strategy, None, self.checkpoint_file)
+            self.assertEqual(context.stop_reason, "deadline")
+            self.assertTrue(os.path.isfile(self.checkpoint_file))
+            self.assertLessEqual(context.search_lower_bound, expected_cost)
+            self.assertGreaterEqual(context.min_cost_so_far, expected_cost)
+
+            resumed = prunning.prepareSearch([], matrix, None)
+            prunning.runBruteForceWithPrunning(resumed, prunning.zeroLowerBound, search_strategy, None, self.checkpoint_file, True)
+            self.assertIsNone(resumed.stop_reason)
+            self.assertEqual(resumed.min_cost_so_far, expected_cost)
+            self.assertEqual(resumed.num_leaves_visited_so_far, math.factorial(len(matrix) - 1))
+            self.assertGreater(resumed.time_searched_before_in_seconds, 0)
+            self.assertFalse(os.path.isfile(self.checkpoint_file))
+
+
+
+class BatchedBoundsTest(PrunningTestCase):
+
+    def testSameOptimum(self):
+        for symmetric in [True, False]:
+            for matrix in randomInstances(25, 6, symmetric):
+                expected_cost = bestCost(matrix)
+                for batched in [True, False]:
+                    prunning.BATCHED_BOUNDS = batched
+                    for lowerBoundFunction in BOUNDS:
+                        if lowerBoundFunction in SYMMETRIC_BOUNDS and not symmetric:
+                            continue
+                        for search_strategy in ["depth-first", "hybrid"]:
+                            context = self.search(matrix, lowerBoundFunction, search_strategy)
+                            self.assertBest(context, matrix, expected_cost)
+
+
+if __name__ == "__main__":
+    unittest.main()
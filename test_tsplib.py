@@ -0,0 +1,171 @@
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import heldkarp
+import tsplib
+
+
+INSTANCES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instancias")
+
+# Optimal tours of TSPLIB (its .opt.tour files) and their costs
+OPTIMAL_TOURS = {
+    "att48": (10628, [  1, 8, 38, 31, 44, 18, 7, 28, 6, 37, 19, 27, 17, 43, 30, 36, 46, 33, 20, 47, 21, 32, 39, 48,
+                        5, 42, 24, 10, 45, 35, 4, 26, 2, 29, 34, 41, 16, 22, 3, 23, 14, 25, 13, 11, 12, 15, 40, 9]),
+    "ulysses22": (7013, [1, 14, 13, 12, 7, 6, 15, 5, 11, 9, 10, 19, 20, 21, 16, 3, 2, 17, 22, 4, 18, 8]),
+}
+
+EXPLICIT_INSTANCE = """NAME : explicit
+TYPE : TSP
+DIMENSION : %d
+EDGE_WEIGHT_TYPE : EXPLICIT
+EDGE_WEIGHT_FORMAT : %s
+EDGE_WEIGHT_SECTION
+%s
+EOF
+"""
+
+# The (row, column) of the weights of each EDGE_WEIGHT_FORMAT, in their order in EDGE_WEIGHT_SECTION
+EXPLICIT_FORMATS = {
+    "FULL_MATRIX": lambda n: [(i, j) for i in xrange(n) for j in xrange(n)],
+    "UPPER_ROW": lambda n: [(i, j) for i in xrange(n) for j in xrange(i + 1, n)],
+    "LOWER_ROW": lambda n: [(i, j) for i in xrange(n) for j in xrange(i)],
+    "UPPER_DIAG_ROW": lambda n: [(i, j) for i in xrange(n) for j in xrange(i, n)],
+    "LOWER_DIAG_ROW": lambda n: [(i, j) for i in xrange(n) for j in xrange(i + 1)],
+    "UPPER_COL": lambda n: [(i, j) for j in xrange(n) for i in xrange(j)],
+    "LOWER_COL": lambda n: [(i, j) for j in xrange(n) for i in xrange(j + 1, n)],
+    "UPPER_DIAG_COL": lambda n: [(i, j) for j in xrange(n) for i in xrange(j + 1)],
+    "LOWER_DIAG_COL": lambda n: [(i, j) for j in xrange(n) for i in xrange(j, n)],
+}
+
+
+EUC_2D_INSTANCE = """NAME : square
+TYPE : TSP
+DIMENSION : 5
+EDGE_WEIGHT_TYPE : EUC_2D
+NODE_COORD_SECTION
+1 0 0
+2 0 %d
+3 30 40
+4 40 30
+5 40 0
+EOF
+"""
+
+
+def readCachedMatrix(filepath):
+    return numpy.asarray(tsplib.readCachedInstance(filepath)[1]).tolist()
+
+
+def instanceMatrix(name):
+    return tsplib.constructCostMatrix(tsplib.readInstance(os.path.join(INSTANCES_DIRECTORY, name + ".tsp")))
+
+
+def tourCost(costMatrix, tour):
+    return sum([costMatrix[tour[i - 1]][tour[i]] for i in xrange(len(tour))])
+
+
+class EdgeWeightTypeTest(unittest.TestCase):
+
+    def testGeoOptimum(self):
+        self.assertEqual(heldkarp.heldKarpTour(instanceMatrix("ulysses16"))[0], 6859)
+
+    def testOptimalTours(self):
+        for name, (cost, tour) in sorted(OPTIMAL_TOURS.items()):
+            self.assertEqual(tourCost(instanceMatrix(name), [city - 1 for city in tour]), cost, name)
+
+    def testExplicitFormats(self):
+        rng = random.Random(5)
+        n = 7
+        matrix = [[0] * n for i in xrange(n)]
+        for i, j in itertools.combinations(xrange(n), 2):
+            matrix[i][j] = matrix[j][i] = rng.randint(1, 100)
+        bestCost = min([tourCost(matrix, (0,) + permutation) for permutation in itertools.permutations(xrange(1, n))])
+
+        directory = tempfile.mkdtemp()
+        try:
+            for edgeWeightFormat, positions in sorted(EXPLICIT_FORMATS.items()):
+                filepath = os.path.join(directory, edgeWeightFormat + ".tsp")
+                f = open(filepath, "w")
+                f.write(EXPLICIT_INSTANCE % (n, edgeWeightFormat, " ".join([str(matrix[i][j]) for i, j in positions(n)])))
+                f.close()
+                costMatrix = tsplib.constructCostMatrix(tsplib.readInstance(filepath))
+                self.assertEqual(costMatrix, matrix, edgeWeightFormat)
+                self.assertEqual(heldkarp.heldKarpTour(costMatrix)[0], bestCost, edgeWeightFormat)
+        finally:
+            shutil.rmtree(directory)
+
+
+class InstanceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, "square.tsp")
+        self.cacheFilepath = self.filepath + tsplib.CACHE_SUFFIX
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def writeInstance(self, y):
+        f = open(self.filepath, "w")
+        f.write(EUC_2D_INSTANCE % y)
+        f.close()
+
+    def assertMatrixOfFile(self, costMatrix):
+        self.assertEqual(numpy.asarray(costMatrix).tolist(), tsplib.constructCostMatrix(tsplib.readInstance(self.filepath)))
+
+    def testCacheIsWrittenAndReused(self):
+        self.writeInstance(40)
+        instance, costMatrix = tsplib.readCachedInstance(self.filepath)
+        self.assertTrue(os.path.isfile(self.cacheFilepath))
+        self.assertIsInstance(costMatrix, numpy.memmap)
+        self.assertMatrixOfFile(costMatrix)
+        self.assertEqual(instance['cities'], tsplib.readInstance(self.filepath)['cities'])
+
+        modificationTime = os.path.getmtime(self.cacheFilepath)
+        instance, costMatrix = tsplib.readCachedInstance(self.filepath)
+        self.assertEqual(os.path.getmtime(self.cacheFilepath), modificationTime)
+        self.assertMatrixOfFile(costMatrix)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["square.tsp", "square.tsp.cache"])
+
+    def testCacheOfAnotherContentIsRewritten(self):
+        self.writeInstance(40)
+        before = readCachedMatrix(self.filepath)
+        self.writeInstance(70)
+        instance, costMatrix = tsplib.readCachedInstance(self.filepath)
+        self.assertMatrixOfFile(costMatrix)
+        self.assertNotEqual(numpy.asarray(costMatrix).tolist(), before)
+
+    def testTruncatedCacheIsRewritten(self):
+        self.writeInstance(40)
+        tsplib.readCachedInstance(self.filepath)
+        f = open(self.cacheFilepath, "r+b")
+        f.truncate(os.path.getsize(self.cacheFilepath) - 4)
+        f.close()
+        instance, costMatrix = tsplib.readCachedInstance(self.filepath)
+        self.assertMatrixOfFile(costMatrix)
+
+    def testConcurrentLoaders(self):
+        # Every loader writes the cache to a temporary file of its own, and none of them fails
+        self.writeInstance(40)
+        expected = tsplib.constructCostMatrix(tsplib.readInstance(self.filepath))
+        pool = multiprocessing.Pool(4)
+        try:
+            for trial in xrange(3):
+                if os.path.exists(self.cacheFilepath):
+                    os.remove(self.cacheFilepath)
+                self.assertEqual(pool.map(readCachedMatrix, [self.filepath] * 8), [expected] * 8)
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEqual(sorted(os.listdir(self.directory)), ["square.tsp", "square.tsp.cache"])
+
+
+if __name__ == "__main__":
+    unittest.main()
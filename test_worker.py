@@ -0,0 +1,141 @@
+import json
+import multiprocessing
+import multiprocessing.queues
+import os
+import shutil
+import StringIO
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import worker
+
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+
+COST_MATRIX = [[0, 1, 9, 1],
+               [1, 0, 1, 9],
+               [9, 1, 0, 1],
+               [1, 9, 1, 0]]
+
+# The corners of a 30 x 40 rectangle: the best tour goes around it
+CITIES = [[0, 0], [30, 40], [0, 40], [30, 0]]
+
+TSP_INSTANCE = """NAME : rectangle
+TYPE : TSP
+DIMENSION : 4
+EDGE_WEIGHT_TYPE : EUC_2D
+NODE_COORD_SECTION
+1 0 0
+2 30 40
+3 0 40
+4 30 0
+EOF
+"""
+
+
+def resultsById(output):
+    results = [json.loads(line) for line in output.splitlines()]
+    return dict([(result["id"], result) for result in results])
+
+
+class WorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def runWorker(self, arguments, jobs=""):
+        process = subprocess.Popen([sys.executable, WORKER, "--processes", "2", "--time-limit", "10"] + arguments,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        output = process.communicate(jobs)[0]
+        self.assertEqual(process.returncode, 0)
+        return resultsById(output)
+
+    def writeFile(self, name, content):
+        f = open(os.path.join(self.directory, name), "w")
+        f.write(content)
+        f.close()
+
+    def assertSolved(self, result, cost):
+        self.assertNotIn("error", result)
+        self.assertEqual(result["cost"], cost)
+        self.assertFalse(result["timed_out"])
+        self.assertEqual(sorted(result["path"]), range(4))
+
+    def testStdinRoundTrip(self):
+        jobs = [json.dumps({"id": "matrix", "cost_matrix": COST_MATRIX, "bound": "minTree"}),
+                json.dumps({"id": "cities", "cities": CITIES}),
+                "not a job",
+                json.dumps({"id": "bound", "cost_matrix": COST_MATRIX, "bound": "none"})]
+        results = self.runWorker([], "\n".join(jobs) + "\n")
+
+        self.assertEqual(sorted(results), [3, "bound", "cities", "matrix"])
+        self.assertSolved(results["matrix"], 4)
+        self.assertSolved(results["cities"], 140)
+        self.assertIn("invalid job", results[3]["error"])
+        self.assertIn("unknown bound", results["bound"]["error"])
+
+    def testSpoolRoundTrip(self):
+        # a.json and a.tsp have the same name without their extension
+        self.writeFile("a.json", json.dumps({"id": "matrix", "cost_matrix": COST_MATRIX}))
+        self.writeFile("a.tsp", TSP_INSTANCE)
+        self.writeFile("b.json", "not a job")
+        # Cannot be read
+        os.mkdir(os.path.join(self.directory, "c.json"))
+        results = self.runWorker(["--spool", self.directory, "--once"])
+
+        self.assertEqual(sorted(results), ["a.tsp", "b.json", "c.json", "matrix"])
+        self.assertSolved(results["matrix"], 4)
+        self.assertSolved(results["a.tsp"], 140)
+        self.assertIn("invalid job", results["b.json"]["error"])
+        self.assertIn("invalid job", results["c.json"]["error"])
+        self.assertEqual(os.listdir(os.path.join(self.directory, worker.SPOOL_PROCESSING_DIRECTORY)), [])
+
+        doneDirectory = os.path.join(self.directory, worker.SPOOL_DONE_DIRECTORY)
+        self.assertEqual(sorted(os.listdir(doneDirectory)), [   "a.json", "a.json.result.json", "a.tsp", "a.tsp.result.json",
+                                                                "b.json", "b.json.result.json", "c.json", "c.json.result.json"])
+        self.assertEqual(json.load(open(os.path.join(doneDirectory, "a.json.result.json"))), results["matrix"])
+        self.assertEqual(json.load(open(os.path.join(doneDirectory, "a.tsp.result.json"))), results["a.tsp"])
+
+    def testSpoolJobOfADeadProcess(self):
+        # The process solving the job "dies" is killed; the pool replaces it and the other jobs go on
+        solveTask = worker.solveTask
+
+        def dyingSolveTask(task):
+            if task[0].get("id") == "dies":
+                os._exit(1)
+            return solveTask(task)
+
+        self.writeFile("a.json", json.dumps({"id": "dies", "cost_matrix": COST_MATRIX}))
+        self.writeFile("b.json", json.dumps({"id": "matrix", "cost_matrix": COST_MATRIX}))
+        defaults = {"bound": "sumMinEdges", "time_limit": 10.0, "strategy": "depth-first", "warm_start": True}
+
+        worker.solveTask = dyingSolveTask
+        stdout = sys.stdout
+        try:
+            startedJobsQueue = multiprocessing.queues.SimpleQueue()
+            pool = multiprocessing.Pool(1, worker.initWorker, (startedJobsQueue,))
+            sys.stdout = StringIO.StringIO()
+            try:
+                worker.serveSpool(pool, startedJobsQueue, defaults, self.directory, 1, 0.1, True)
+                output = sys.stdout.getvalue()
+            finally:
+                sys.stdout = stdout
+                pool.terminate()
+                pool.join()
+        finally:
+            worker.solveTask = solveTask
+
+        results = resultsById(output)
+        self.assertEqual(sorted(results), ["dies", "matrix"])
+        self.assertIn("died", results["dies"]["error"])
+        self.assertSolved(results["matrix"], 4)
+        self.assertEqual(os.listdir(os.path.join(self.directory, worker.SPOOL_PROCESSING_DIRECTORY)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,80 +1,152 @@
 #!/usr/bin/env python2.7
 from __future__ import print_function
-import sys
-import math
+import argparse
+import heldkarp
+import heuristic
+import parallel
 import prunning
+import tsplib
 
-def readFile(filepath):
-    f = open(filepath)
-
-    line  =  f.readline()
-    while not line.startswith('NODE_COORD_SECTION'):
-        if line.startswith('DIMENSION'):
-            header, nItems = line.split(':')
-            nItems = int(nItems)
-        line =  f.readline()
-
-    items = []
-
-    for i in xrange(nItems):
-        city, x, y = f.readline().split()
-        items.append([int(city), float(x), float(y)])
+def printMatrix(matrix):
+    for i in range(len(matrix)):
+        print(matrix[i])
 
-    return items
+# algorithm number -> (lower bound function, output directory)
+ALGORITHMS = {
+    1: (prunning.zeroLowerBound, "./out/zero/"),
+    2: (prunning.sumMinEdgesBound, "./out/sumMinEdges/"),
+    3: (prunning.qRouteNoTwoCycleLowerBound, "./out/qRoute/"),
+    4: (prunning.incrementalMinimumTreeBound, "./out/minTree/"),
+    5: (prunning.heldKarpBound, "./out/heldKarp/"),
+}
 
-def constructCostMatrix(items):
-    costMatrix = []
+# Not exact: 2-opt/Or-opt tour for instances too large for the brute force
+HEURISTIC_ALGORITHM = 6
+HEURISTIC_OUTPUT_DIRECTORY = "./out/heuristic/"
 
-    for i in xrange(len(items)):
-        costMatrix.append([0]*len(items))
-        for j in xrange(i+1):
-            distance = calculateDistance(items[i], items[j])
-            costMatrix[i][j] = distance
-            costMatrix[j][i] = distance
+# Exact dynamic programming, for instances of up to heldkarp.MAX_VERTICES cities
+DYNAMIC_PROGRAMMING_ALGORITHM = 7
+DYNAMIC_PROGRAMMING_OUTPUT_DIRECTORY = "./out/dynamicProgramming/"
 
-    return costMatrix
+def main():
+    parser = argparse.ArgumentParser(usage="tsp.py {filepath} {numero algoritmo} [opcoes]",
+                                     description="1 -> forca bruta\n3-> Q-route\n4->minimum spanning tree\n5 -> held-karp\n6 -> heuristica (2-opt/Or-opt)\n7 -> programacao dinamica (Held-Karp, ate 24 cidades)",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filepath")
+    parser.add_argument("algorithm", type=int, choices=sorted(ALGORITHMS) + [HEURISTIC_ALGORITHM, DYNAMIC_PROGRAMMING_ALGORITHM])
+    parser.add_argument("--time-limit", type=float, default=prunning.TIME_TO_RUN_ALGORITHM_IN_SECONDS,
+                        help="seconds the search runs before it stops and reports the best permutation found, "
+                             "a lower bound and the gap (also on SIGINT/SIGTERM) (default: %(default)s)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of processes searching the permutation tree (default: 1)")
+    parser.add_argument("--split-depth", type=int, default=parallel.SPLIT_DEPTH,
+                        help="depth at which the tree is split among the processes (default: %(default)s)")
+    parser.add_argument("--strategy", default="depth-first", choices=sorted(prunning.SEARCH_STRATEGIES),
+                        help="order in which the permutation tree is searched (default: %(default)s)")
+    parser.add_argument("--max-open-nodes", type=int, default=prunning.MAX_OPEN_NODES,
+                        help="open nodes kept by best-first/hybrid before searching depth-first (default: %(default)s)")
+    parser.add_argument("--dominance-table-size", type=int, default=prunning.DOMINANCE_TABLE_SIZE,
+                        help="partial permutations remembered to prune the dominated ones, 0 to disable (default: %(default)s)")
+    parser.add_argument("--no-two-opt-prunning", action="store_true",
+                        help="do not prune the partial permutations shortened by a 2-opt move")
+    parser.add_argument("--no-batched-bounds", action="store_true",
+                        help="bound the children of a node one by one instead of with a single vectorized call")
+    parser.add_argument("--no-warm-start", action="store_true",
+                        help="do not start the search with the tour of the 2-opt/Or-opt heuristic")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse the instance and build its cost matrix, instead of loading them from its binary cache")
+    parser.add_argument("--checkpoint-interval", type=float, default=prunning.CHECKPOINT_INTERVAL_IN_SECONDS,
+                        help="seconds between two checkpoints of the search, also written on timeout (default: %(default)s)")
+    parser.add_argument("--no-checkpoint", action="store_true",
+                        help="do not write checkpoints of the search")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the search from its checkpoint, if there is one")
+    parser.add_argument("--statistics", metavar="FILE",
+                        help="append the counters of the search to FILE as JSON lines (single process only)")
+    parser.add_argument("--statistics-interval", type=float, default=prunning.STATISTICS_INTERVAL_IN_SECONDS,
+                        help="seconds between two lines of statistics (default: %(default)s)")
+    parser.add_argument("--report", default=prunning.REPORT_MODE, choices=["every", "throttled", "final"],
+                        help="which of the permutations found are written and drawn (default: %(default)s)")
+    parser.add_argument("--no-images", action="store_true",
+                        help="only write the permutations found, without drawing them")
+    parser.add_argument("--print-matrix", action="store_true",
+                        help="print the cost matrix before the search")
+    parser.add_argument("--image-interval", type=float, default=prunning.REPORT_IMAGE_INTERVAL_IN_SECONDS,
+                        help="minimum seconds between two images in the throttled report (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.processes > 1 and args.resume:
+        parser.error("--resume is only supported with a single process")
+
+    prunning.TIME_TO_RUN_ALGORITHM_IN_SECONDS = args.time_limit
+    prunning.MAX_OPEN_NODES = args.max_open_nodes
+    prunning.DOMINANCE_TABLE_SIZE = args.dominance_table_size
+    prunning.TWO_OPT_PRUNNING = not args.no_two_opt_prunning
+    prunning.BATCHED_BOUNDS = not args.no_batched_bounds
+    prunning.CHECKPOINT_INTERVAL_IN_SECONDS = args.checkpoint_interval
+    prunning.STATISTICS_FILE = args.statistics
+    prunning.STATISTICS_INTERVAL_IN_SECONDS = args.statistics_interval
+    prunning.REPORT_MODE = args.report
+    prunning.REPORT_IMAGE_INTERVAL_IN_SECONDS = args.image_interval
+    prunning.REPORT_IMAGES = not args.no_images
+
+    filename = args.filepath
+
+    # The heuristic needs no cost matrix, so no cache either
+    if args.algorithm == HEURISTIC_ALGORITHM:
+        instance = tsplib.readInstance(filename)
+        context = heuristic.initHeuristicSolver(instance, HEURISTIC_OUTPUT_DIRECTORY+filename+".txt")
+        prunning.reportLowestCost(context)
+        prunning.reportLowestCostPath(context)
+        return
 
+    if args.algorithm == DYNAMIC_PROGRAMMING_ALGORITHM and tsplib.readInstance(filename)['dimension'] > heldkarp.MAX_VERTICES:
+        parser.error("algorithm 7 solves instances of up to %d cities" % heldkarp.MAX_VERTICES)
 
-def calculateDistance(cityInfoA, cityInfoB):
-    if cityInfoB[0] == cityInfoA[0]:
-        return 0
-    return int(math.sqrt((cityInfoA[1]-cityInfoB[1])**2 + (cityInfoA[2]-cityInfoB[2])**2)+0.5)
+    # A numpy array, memory-mapped from the cache, given as it is to the searches (see prunning.prepareSearch)
+    if args.no_cache:
+        instance = tsplib.readInstance(filename)
+        costMatrix = tsplib.constructCostMatrixArray(instance)
+    else:
+        instance, costMatrix = tsplib.readCachedInstance(filename)
+    items = instance['cities']
 
-def printMatrix(matrix):
-    for i in range(len(matrix)):
-        print(matrix[i])
+    if args.print_matrix:
+        printMatrix(costMatrix.tolist())
 
-def main():
-    if len(sys.argv) != 3:
-        print("!Uso: tsp.py {filepath} {numero algoritmo}")
-        print("1 -> forca bruta\n3-> Q-route\n4->minimum spanning tree")
+    if args.algorithm == DYNAMIC_PROGRAMMING_ALGORITHM:
+        context = heldkarp.initHeldKarpSolver(items, costMatrix, DYNAMIC_PROGRAMMING_OUTPUT_DIRECTORY+filename+".txt")
+        prunning.reportLowestCost(context)
+        prunning.reportLowestCostPath(context)
         return
-    
-    script, filename, algorithm = sys.argv
-    items = readFile(filename)
-    costMatrix = constructCostMatrix(items)
-
-    printMatrix(costMatrix)
-
-    algorithm = int(algorithm)
-
-    if algorithm == 1:
-        prunning.initBruteForceWithPrunning(items, costMatrix, prunning.zeroLowerBound,"./out/zero/"+filename+".txt")
-    elif algorithm == 2:
-        prunning.initBruteForceWithPrunning(items, costMatrix, prunning.sumMinEdgesBound,"./out/sumMinEdges/"+filename+".txt")
-    elif algorithm == 3:
-        prunning.initBruteForceWithPrunning(items, costMatrix, prunning.qRouteLowerBound,"./out/qRoute/"+filename+".txt")
-    elif algorithm == 4:
-        prunning.initBruteForceWithPrunning(items, costMatrix, prunning.minimumTreeBound,"./out/minTree/"+filename+".txt")
-        
-        
-    # elif algorithm == 3:
 
-    prunning.reportNumberPermutations()
-    prunning.reportLowestCost()
-    prunning.reportLowestCostPath()
-    prunning.reportNumberOfLeavesVisisted()
-    prunning.reportPruningPercentage()
+    lowerBoundFunction, outputDirectory = ALGORITHMS[args.algorithm]
+
+    initialPath = None
+    if not args.no_warm_start:
+        initialPath = heuristic.warmStartTour(costMatrix)
+
+    # Checkpoints of the search in a single process, next to its output file
+    checkpointFile = None
+    if not args.no_checkpoint:
+        checkpointFile = outputDirectory+filename+".checkpoint"
+
+    if args.processes > 1:
+        context = parallel.initParallelBruteForceWithPrunning(items, costMatrix, lowerBoundFunction, outputDirectory+filename+".txt",
+                                                              args.processes, args.split_depth, args.strategy, initialPath)
+    else:
+        context = prunning.initBruteForceWithPrunning(items, costMatrix, lowerBoundFunction, outputDirectory+filename+".txt",
+                                                      args.strategy, initialPath, checkpointFile, args.resume)
+
+    # The search only writes why it stopped to the output file
+    if context.stop_reason is not None:
+        print(context.end_message.rstrip())
+
+    prunning.reportNumberPermutations(context)
+    prunning.reportLowestCost(context)
+    prunning.reportLowestCostPath(context)
+    prunning.reportNumberOfLeavesVisisted(context)
+    prunning.reportPruningPercentage(context)
         
 
 if __name__ == "__main__":
@@ -0,0 +1,425 @@
+from __future__ import print_function
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+import tempfile
+import numpy
+
+# Number of rows of the cost matrix computed at once by the vectorized builders.
+# Each block needs a few float64 temporaries of COST_MATRIX_BLOCK_ROWS x n.
+COST_MATRIX_BLOCK_ROWS = 256
+
+# Keywords that start a data section. The section goes on until the next line that starts with a keyword.
+SECTIONS = ['NODE_COORD_SECTION', 'EDGE_WEIGHT_SECTION', 'DISPLAY_DATA_SECTION',
+            'DEPOT_SECTION', 'DEMAND_SECTION', 'FIXED_EDGES_SECTION', 'TOUR_SECTION']
+
+# Binary cache of an instance, next to its file: CACHE_MAGIC, the length of a JSON header (uint32), the header,
+# padding to a multiple of 8 bytes, the cities as a float64 array of [id, x, y] rows and the int32 cost matrix.
+# The header holds the SHA-1 of the .tsp file the cache was made from. Changing the format changes CACHE_MAGIC.
+CACHE_SUFFIX = ".cache"
+CACHE_MAGIC = "TSPCACH1"
+
+# Constants of the TSPLIB GEO distance
+GEO_PI = 3.141592
+GEO_EARTH_RADIUS = 6378.388
+
+
+def readInstance(filepath):
+    # Reads a TSPLIB file into a dictionary with:
+    #   name, dimension, edgeWeightType, edgeWeightFormat (strings, from the header)
+    #   cities: list of [id, x, y] from NODE_COORD_SECTION (or DISPLAY_DATA_SECTION), possibly empty
+    #   explicitWeights: n x n int32 array from EDGE_WEIGHT_SECTION, or None
+    f = open(filepath)
+    lines = f.readlines()
+    f.close()
+
+    header = {}
+    sections = {}
+    section = None
+
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) == 0:
+            continue
+
+        # Some files of instancias/ have data after an EOF line, so EOF is just skipped
+        if tokens[0] == 'EOF':
+            section = None
+        elif tokens[0].rstrip(':') in SECTIONS:
+            section = tokens[0].rstrip(':')
+            sections[section] = []
+        elif not tokens[0][0].isalpha():
+            if section is not None:
+                sections[section].extend(tokens)
+        else:
+            section = None
+            if ':' in line:
+                key, value = line.split(':', 1)
+                header[key.strip()] = value.strip()
+
+    instance = {}
+    instance['name'] = header.get('NAME', filepath)
+    instance['dimension'] = int(header['DIMENSION'])
+    instance['edgeWeightType'] = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    instance['edgeWeightFormat'] = header.get('EDGE_WEIGHT_FORMAT', 'FUNCTION')
+
+    if 'NODE_COORD_SECTION' in sections:
+        instance['cities'] = readCities(sections['NODE_COORD_SECTION'], instance['dimension'])
+    elif 'DISPLAY_DATA_SECTION' in sections:
+        instance['cities'] = readCities(sections['DISPLAY_DATA_SECTION'], instance['dimension'])
+    else:
+        instance['cities'] = []
+
+    instance['explicitWeights'] = None
+    if instance['edgeWeightType'] == 'EXPLICIT':
+        if 'EDGE_WEIGHT_SECTION' in sections:
+            instance['explicitWeights'] = readExplicitWeights(sections['EDGE_WEIGHT_SECTION'],
+                                                              instance['dimension'],
+                                                              instance['edgeWeightFormat'])
+        elif len(instance['cities']) > 0:
+            # Nothing else can be done with it: the coordinates are used as if they were EUC_2D
+            print("Warning: " + filepath + " has no EDGE_WEIGHT_SECTION, using EUC_2D distances of its coordinates",
+                  file=sys.stderr)
+            instance['edgeWeightType'] = 'EUC_2D'
+        else:
+            raise ValueError(filepath + ": EXPLICIT edge weights without EDGE_WEIGHT_SECTION")
+    elif instance['edgeWeightType'] not in DISTANCE_KERNELS:
+        raise ValueError(filepath + ": EDGE_WEIGHT_TYPE " + instance['edgeWeightType'] + " is not supported")
+    elif len(instance['cities']) != instance['dimension']:
+        raise ValueError(filepath + ": NODE_COORD_SECTION should have " + str(instance['dimension']) + " cities")
+
+    return instance
+
+
+def readCities(tokens, dimension):
+    items = []
+    for i in xrange(min(dimension, len(tokens) // 3)):
+        city, x, y = tokens[3 * i:3 * i + 3]
+        items.append([int(city), float(x), float(y)])
+    return items
+
+
+def readExplicitWeights(tokens, dimension, edgeWeightFormat):
+    # The weights of a symmetric matrix are listed row by row (or column by column) of one of its triangles.
+    # The columns of the upper triangle are the rows of the lower triangle and vice versa.
+    if edgeWeightFormat == 'FULL_MATRIX':
+        rows, columns = numpy.indices((dimension, dimension))
+        rows = rows.ravel()
+        columns = columns.ravel()
+    elif edgeWeightFormat in ('UPPER_ROW', 'LOWER_COL'):
+        rows, columns = numpy.triu_indices(dimension, 1)
+    elif edgeWeightFormat in ('LOWER_ROW', 'UPPER_COL'):
+        rows, columns = numpy.tril_indices(dimension, -1)
+    elif edgeWeightFormat in ('UPPER_DIAG_ROW', 'LOWER_DIAG_COL'):
+        rows, columns = numpy.triu_indices(dimension)
+    elif edgeWeightFormat in ('LOWER_DIAG_ROW', 'UPPER_DIAG_COL'):
+        rows, columns = numpy.tril_indices(dimension)
+    else:
+        raise ValueError("EDGE_WEIGHT_FORMAT " + edgeWeightFormat + " is not supported")
+
+    if len(tokens) < len(rows):
+        raise ValueError("EDGE_WEIGHT_SECTION should have " + str(len(rows)) + " weights")
+
+    weights = numpy.array(tokens[:len(rows)], dtype=numpy.float64).astype(numpy.int32)
+    costMatrix = numpy.zeros((dimension, dimension), dtype=numpy.int32)
+    costMatrix[columns, rows] = weights
+    costMatrix[rows, columns] = weights
+    return costMatrix
+
+
+def constructCostMatrix(instance):
+    # List of lists, which is faster than a numpy array to index one element at a time
+    return constructCostMatrixArray(instance).tolist()
+
+
+def constructCostMatrixArray(instance):
+    # The whole cost matrix as a contiguous int32 numpy array, built one block of rows at a time
+    if instance['explicitWeights'] is not None:
+        return numpy.ascontiguousarray(instance['explicitWeights'], dtype=numpy.int32)
+
+    costMatrix = numpy.empty((instance['dimension'], instance['dimension']), dtype=numpy.int32)
+    for firstRow, block in iterateCostMatrixBlocks(instance):
+        costMatrix[firstRow:firstRow + len(block)] = block
+    return costMatrix
+
+
+def iterateCostMatrixBlocks(instance, blockRows=COST_MATRIX_BLOCK_ROWS):
+    # Yields (firstRow, block), where block holds the rows firstRow, firstRow + 1, ... of the cost matrix.
+    # Only one block is alive at a time, so the full matrix never has to fit in memory.
+    if instance['explicitWeights'] is not None:
+        for firstRow in xrange(0, instance['dimension'], blockRows):
+            yield firstRow, instance['explicitWeights'][firstRow:firstRow + blockRows]
+        return
+
+    kernel = DISTANCE_KERNELS[instance['edgeWeightType']]
+    coordinates = coordinatesArray(instance['cities'])
+    for firstRow in xrange(0, len(coordinates), blockRows):
+        block = kernel(coordinates[firstRow:firstRow + blockRows], coordinates)
+        # The distance of a city to itself is zero (GEO would give 1)
+        diagonal = numpy.arange(len(block))
+        block[diagonal, firstRow + diagonal] = 0
+        yield firstRow, block
+
+
+def distanceFunction(instance):
+    # A function (i, j) -> the distance between the cities i and j, computed on demand.
+    # For the instances whose cost matrix does not fit in memory. Gives the same values as the distance kernels.
+    if instance['explicitWeights'] is not None:
+        weights = instance['explicitWeights'].tolist()
+        return lambda i, j: weights[i][j]
+
+    x = [item[1] for item in instance['cities']]
+    y = [item[2] for item in instance['cities']]
+    edgeWeightType = instance['edgeWeightType']
+    sqrt = math.sqrt
+
+    if edgeWeightType == 'EUC_2D':
+        def distance(i, j):
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            return int(sqrt(dx * dx + dy * dy) + 0.5)
+    elif edgeWeightType == 'CEIL_2D':
+        def distance(i, j):
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            return int(math.ceil(sqrt(dx * dx + dy * dy)))
+    elif edgeWeightType == 'ATT':
+        def distance(i, j):
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            r = sqrt((dx * dx + dy * dy) / 10.0)
+            rounded = math.floor(r + 0.5)
+            if rounded < r:
+                rounded += 1
+            return int(rounded)
+    elif edgeWeightType == 'MAN_2D':
+        def distance(i, j):
+            return int(abs(x[i] - x[j]) + abs(y[i] - y[j]) + 0.5)
+    elif edgeWeightType == 'MAX_2D':
+        def distance(i, j):
+            return max(int(abs(x[i] - x[j]) + 0.5), int(abs(y[i] - y[j]) + 0.5))
+    elif edgeWeightType == 'GEO':
+        latitude, longitude = geographicalRadians(coordinatesArray(instance['cities']))
+        latitude = latitude.tolist()
+        longitude = longitude.tolist()
+        cos = math.cos
+
+        def distance(i, j):
+            if i == j:
+                return 0
+            q1 = cos(longitude[i] - longitude[j])
+            q2 = cos(latitude[i] - latitude[j])
+            q3 = cos(latitude[i] + latitude[j])
+            cosine = min(1.0, max(-1.0, 0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3)))
+            return int(GEO_EARTH_RADIUS * math.acos(cosine) + 1.0)
+    else:
+        raise ValueError("EDGE_WEIGHT_TYPE " + edgeWeightType + " is not supported")
+
+    return distance
+
+
+def readCachedInstance(filepath):
+    # The instance of readInstance and its cost matrix, as a read-only int32 numpy.memmap of the cache of the file
+    # (filepath + CACHE_SUFFIX), so the file is parsed and the matrix computed once, not on every run.
+    # The cache is (re)written when it is missing, unreadable or made from another content of the file.
+    # If it cannot be written, or what was written cannot be read back, the matrix is built in memory.
+    f = open(filepath, "rb")
+    contentHash = hashlib.sha1(f.read()).hexdigest()
+    f.close()
+
+    cacheFilepath = filepath + CACHE_SUFFIX
+    cached = readInstanceCache(cacheFilepath, contentHash)
+    if cached is not None:
+        return cached
+
+    instance = readInstance(filepath)
+    try:
+        writeInstanceCache(cacheFilepath, contentHash, instance)
+    except (IOError, OSError) as error:
+        print("Warning: could not write the cache " + cacheFilepath + ": " + str(error), file=sys.stderr)
+        return instance, constructCostMatrixArray(instance)
+
+    # Another process may have renamed the cache of another content of the file over this one since
+    cached = readInstanceCache(cacheFilepath, contentHash)
+    if cached is None:
+        print("Warning: could not read back the cache " + cacheFilepath, file=sys.stderr)
+        return instance, constructCostMatrixArray(instance)
+    return cached
+
+
+def readInstanceCache(cacheFilepath, contentHash):
+    # (instance, memmap of the cost matrix) from the cache, or None if it is missing, unreadable or stale
+    try:
+        f = open(cacheFilepath, "rb")
+    except IOError:
+        return None
+    try:
+        prefix = f.read(len(CACHE_MAGIC) + 4)
+        if len(prefix) < len(CACHE_MAGIC) + 4 or prefix[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+            return None
+        headerLength, = struct.unpack("<I", prefix[len(CACHE_MAGIC):])
+        header = json.loads(f.read(headerLength))
+    except ValueError:
+        return None
+    finally:
+        f.close()
+
+    if header.get("sha1") != contentHash:
+        return None
+
+    dimension = header["dimension"]
+    numCities = header["numCities"]
+    citiesOffset = cacheDataOffset(headerLength)
+    matrixOffset = citiesOffset + 8 * 3 * numCities
+    if os.path.getsize(cacheFilepath) != matrixOffset + 4 * dimension * dimension:
+        return None
+
+    cities = []
+    if numCities > 0:
+        cities = numpy.memmap(cacheFilepath, dtype="<f8", mode="r", offset=citiesOffset, shape=(numCities, 3)).tolist()
+    costMatrix = numpy.memmap(cacheFilepath, dtype="<i4", mode="r", offset=matrixOffset, shape=(dimension, dimension))
+
+    instance = {
+        'name': str(header["name"]),
+        'dimension': dimension,
+        'edgeWeightType': str(header["edgeWeightType"]),
+        'edgeWeightFormat': str(header["edgeWeightFormat"]),
+        'cities': [[int(city), x, y] for city, x, y in cities],
+        'explicitWeights': costMatrix if header["edgeWeightType"] == 'EXPLICIT' else None,
+    }
+    return instance, costMatrix
+
+
+def writeInstanceCache(cacheFilepath, contentHash, instance):
+    # Writes the cache of the instance to a temporary file of its own, renamed over the cache once complete,
+    # so processes that write the same cache at once never write to the same file.
+    # The cost matrix is written one block of rows at a time (see iterateCostMatrixBlocks).
+    header = json.dumps({
+        "sha1": contentHash,
+        "name": instance['name'],
+        "dimension": instance['dimension'],
+        "edgeWeightType": instance['edgeWeightType'],
+        "edgeWeightFormat": instance['edgeWeightFormat'],
+        "numCities": len(instance['cities']),
+    })
+    cities = numpy.array(instance['cities'], dtype="<f8").reshape(-1, 3)
+
+    fileDescriptor, temporaryFilepath = tempfile.mkstemp(suffix=".tmp",
+                                                         prefix=os.path.basename(cacheFilepath) + ".",
+                                                         dir=os.path.dirname(cacheFilepath) or ".")
+    try:
+        f = os.fdopen(fileDescriptor, "wb")
+        try:
+            f.write(CACHE_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write("\0" * (cacheDataOffset(len(header)) - len(CACHE_MAGIC) - 4 - len(header)))
+            f.write(cities.tostring())
+            for firstRow, block in iterateCostMatrixBlocks(instance):
+                f.write(numpy.ascontiguousarray(block, dtype="<i4").tostring())
+        finally:
+            f.close()
+        # mkstemp makes the file readable by its owner only
+        os.chmod(temporaryFilepath, 0o644)
+        os.rename(temporaryFilepath, cacheFilepath)
+    except:
+        os.remove(temporaryFilepath)
+        raise
+
+
+def cacheDataOffset(headerLength):
+    # The offset of the cities in a cache whose header has headerLength bytes, a multiple of 8
+    return (len(CACHE_MAGIC) + 4 + headerLength + 7) // 8 * 8
+
+
+def coordinatesArray(items):
+    return numpy.array([[item[1], item[2]] for item in items], dtype=numpy.float64).reshape(-1, 2)
+
+
+# -----------------------
+# DISTANCE KERNELS
+# -----------------------
+# Each kernel receives two arrays of coordinates (one city per row) and returns the int32 matrix
+# of the TSPLIB distances between every city of coordinatesA and every city of coordinatesB.
+
+def euclideanDistanceKernel(coordinatesA, coordinatesB):
+    # EUC_2D: nint(sqrt(dx^2 + dy^2))
+    distance = squaredEuclideanDistance(coordinatesA, coordinatesB)
+    numpy.sqrt(distance, out=distance)
+    distance += 0.5
+    return distance.astype(numpy.int32)
+
+
+def ceilingDistanceKernel(coordinatesA, coordinatesB):
+    # CEIL_2D: ceil(sqrt(dx^2 + dy^2))
+    distance = squaredEuclideanDistance(coordinatesA, coordinatesB)
+    numpy.sqrt(distance, out=distance)
+    numpy.ceil(distance, out=distance)
+    return distance.astype(numpy.int32)
+
+
+def pseudoEuclideanDistanceKernel(coordinatesA, coordinatesB):
+    # ATT: r = sqrt((dx^2 + dy^2) / 10), rounded up when nint(r) < r
+    distance = squaredEuclideanDistance(coordinatesA, coordinatesB)
+    distance /= 10.0
+    numpy.sqrt(distance, out=distance)
+    rounded = numpy.floor(distance + 0.5)
+    rounded[rounded < distance] += 1
+    return rounded.astype(numpy.int32)
+
+
+def manhattanDistanceKernel(coordinatesA, coordinatesB):
+    # MAN_2D: nint(|dx| + |dy|)
+    distance = numpy.abs(coordinatesA[:, 0, numpy.newaxis] - coordinatesB[numpy.newaxis, :, 0])
+    distance += numpy.abs(coordinatesA[:, 1, numpy.newaxis] - coordinatesB[numpy.newaxis, :, 1])
+    distance += 0.5
+    return distance.astype(numpy.int32)
+
+
+def maximumDistanceKernel(coordinatesA, coordinatesB):
+    # MAX_2D: max(nint(|dx|), nint(|dy|))
+    dx = numpy.abs(coordinatesA[:, 0, numpy.newaxis] - coordinatesB[numpy.newaxis, :, 0]) + 0.5
+    dy = numpy.abs(coordinatesA[:, 1, numpy.newaxis] - coordinatesB[numpy.newaxis, :, 1]) + 0.5
+    return numpy.maximum(dx.astype(numpy.int32), dy.astype(numpy.int32))
+
+
+def geographicalDistanceKernel(coordinatesA, coordinatesB):
+    # GEO: the coordinates are latitude and longitude in DDD.MM format (degrees and minutes),
+    # and the distance is the one over an idealized sphere, truncated and plus one
+    latitudeA, longitudeA = geographicalRadians(coordinatesA)
+    latitudeB, longitudeB = geographicalRadians(coordinatesB)
+    q1 = numpy.cos(longitudeA[:, numpy.newaxis] - longitudeB[numpy.newaxis, :])
+    q2 = numpy.cos(latitudeA[:, numpy.newaxis] - latitudeB[numpy.newaxis, :])
+    q3 = numpy.cos(latitudeA[:, numpy.newaxis] + latitudeB[numpy.newaxis, :])
+    cosine = 0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3)
+    numpy.clip(cosine, -1.0, 1.0, out=cosine)
+    distance = GEO_EARTH_RADIUS * numpy.arccos(cosine) + 1.0
+    return distance.astype(numpy.int32)
+
+
+def geographicalRadians(coordinates):
+    degrees = numpy.trunc(coordinates)
+    minutes = coordinates - degrees
+    radians = GEO_PI * (degrees + 5.0 * minutes / 3.0) / 180.0
+    return radians[:, 0], radians[:, 1]
+
+
+def squaredEuclideanDistance(coordinatesA, coordinatesB):
+    dx = coordinatesA[:, 0, numpy.newaxis] - coordinatesB[numpy.newaxis, :, 0]
+    dy = coordinatesA[:, 1, numpy.newaxis] - coordinatesB[numpy.newaxis, :, 1]
+    distance = dx * dx
+    distance += dy * dy
+    return distance
+
+
+DISTANCE_KERNELS = {
+    'EUC_2D': euclideanDistanceKernel,
+    'CEIL_2D': ceilingDistanceKernel,
+    'ATT': pseudoEuclideanDistanceKernel,
+    'MAN_2D': manhattanDistanceKernel,
+    'MAX_2D': maximumDistanceKernel,
+    'GEO': geographicalDistanceKernel,
+}
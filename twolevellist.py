@@ -0,0 +1,384 @@
+import math
+
+'''
+=============================================================================
+TWO-LEVEL DOUBLY-LINKED LIST
+=============================================================================
+A tour of n vertices split in segments of about sqrt(n) consecutive vertices.
+Each segment is a doubly-linked list of its vertices, with a bit that says if it is
+traversed backwards, and the segments are themselves a doubly-linked list in the order
+of the tour.
+Reversing a path of the tour (the 2-opt move) splits at most two segments and then
+reverses whole segments: flips their bits and relinks them, which costs O(sqrt(n))
+instead of the O(n) of reversing a path in an array.
+A split creates a new segment. Once there are too many, the segments are built again,
+which costs O(n) but happens once every O(sqrt(n)) moves.
+
+The list is kept in the global variables below, so there is a single tour at a time.
+'''
+
+'''
+VARIABLES
+	segment_of
+	node_next
+	node_prev
+DESCRIPTION:
+	For each vertex: its segment, and the next and previous vertices in the (unreversed) order of its segment
+	(-1 at the ends of the segment).
+'''
+segment_of = []
+node_next = []
+node_prev = []
+
+'''
+VARIABLES
+	segment_first
+	segment_last
+	segment_size
+	segment_reversed
+	segment_next
+	segment_prev
+DESCRIPTION:
+	For each segment: the first and last vertices in its unreversed order, its number of vertices,
+	True if it is traversed backwards, and the next and previous segments in the order of the tour.
+'''
+segment_first = []
+segment_last = []
+segment_size = []
+segment_reversed = []
+segment_next = []
+segment_prev = []
+
+'''
+VARIABLES
+	num_segments
+	max_segments
+	segment_length
+DESCRIPTION:
+	The number of segments of the tour, the number of segments that makes the list be built again,
+	and the number of vertices of the segments when the list is built.
+'''
+num_segments = 0
+max_segments = 0
+segment_length = 0
+
+'''
+FUNCTION
+	build
+DESCRIPTION:
+	Builds the list from a tour
+PARAMETERS:
+	tour
+		A list with every vertex once (at least 3 vertices)
+RETURNS
+	<nothing>
+'''
+def build(tour):
+
+	global segment_of, node_next, node_prev
+	global segment_first, segment_last, segment_size, segment_reversed, segment_next, segment_prev
+	global num_segments, max_segments, segment_length
+
+	num_vertices = len(tour)
+	segment_length = max(2, int(math.sqrt(num_vertices)))
+	num_segments = (num_vertices + segment_length - 1) // segment_length
+	max_segments = 2 * num_segments + 4
+
+	segment_of = [0] * num_vertices
+	node_next = [-1] * num_vertices
+	node_prev = [-1] * num_vertices
+
+	segment_first = []
+	segment_last = []
+	segment_size = []
+	segment_reversed = []
+	segment_next = []
+	segment_prev = []
+
+	for segment in xrange(num_segments):
+		vertices = tour[segment * segment_length:(segment + 1) * segment_length]
+		for i in xrange(len(vertices)):
+			vertex = vertices[i]
+			segment_of[vertex] = segment
+			if i > 0:
+				node_prev[vertex] = vertices[i - 1]
+			if i + 1 < len(vertices):
+				node_next[vertex] = vertices[i + 1]
+		# END FOR
+
+		segment_first.append(vertices[0])
+		segment_last.append(vertices[-1])
+		segment_size.append(len(vertices))
+		segment_reversed.append(False)
+		segment_next.append((segment + 1) % num_segments)
+		segment_prev.append((segment - 1) % num_segments)
+	# END FOR
+
+'''
+FUNCTION
+	toList
+DESCRIPTION:
+	The tour, as a list that starts at the given vertex
+PARAMETERS:
+	start
+		The first vertex of the list
+RETURNS
+	a list
+		The tour
+'''
+def toList(start=0):
+
+	tour = [start]
+	vertex = successor(start)
+	while vertex != start:
+		tour.append(vertex)
+		vertex = successor(vertex)
+	# END WHILE
+	return tour
+
+'''
+FUNCTION
+	successor
+DESCRIPTION:
+	The vertex after the given one in the tour
+'''
+def successor(vertex):
+
+	segment = segment_of[vertex]
+	if segment_reversed[segment]:
+		if vertex == segment_first[segment]:
+			return firstOf(segment_next[segment])
+		return node_prev[vertex]
+	if vertex == segment_last[segment]:
+		return firstOf(segment_next[segment])
+	return node_next[vertex]
+
+'''
+FUNCTION
+	predecessor
+DESCRIPTION:
+	The vertex before the given one in the tour
+'''
+def predecessor(vertex):
+
+	segment = segment_of[vertex]
+	if segment_reversed[segment]:
+		if vertex == segment_last[segment]:
+			return lastOf(segment_prev[segment])
+		return node_next[vertex]
+	if vertex == segment_first[segment]:
+		return lastOf(segment_prev[segment])
+	return node_prev[vertex]
+
+'''
+FUNCTION
+	firstOf
+DESCRIPTION:
+	The first vertex of a segment in the order of the tour
+'''
+def firstOf(segment):
+	if segment_reversed[segment]:
+		return segment_last[segment]
+	return segment_first[segment]
+
+'''
+FUNCTION
+	lastOf
+DESCRIPTION:
+	The last vertex of a segment in the order of the tour
+'''
+def lastOf(segment):
+	if segment_reversed[segment]:
+		return segment_first[segment]
+	return segment_last[segment]
+
+'''
+FUNCTION
+	make2OptMove
+DESCRIPTION:
+	Replaces the edges (a, b) and (c, d) of the tour by the edges (a, c) and (b, d).
+	Either b is after a and d after c, or b is before a and d before c.
+PARAMETERS:
+	a, b, c, d
+		The vertices
+RETURNS
+	<nothing>
+'''
+def make2OptMove(a, b, c, d):
+
+	if successor(a) == b:
+		reversePath(b, c)
+	else:
+		reversePath(a, d)
+
+'''
+FUNCTION
+	reversePath
+DESCRIPTION:
+	Reverses the path of the tour from the vertex first to the vertex last (going forward).
+	The path is made of whole segments by splitting the segments of its ends. Then either the segments
+	of the path or the ones of the rest of the tour (whichever are fewer) are reversed: both give the same cycle.
+PARAMETERS:
+	first
+		The first vertex of the path
+	last
+		The last vertex of the path
+RETURNS
+	<nothing>
+'''
+def reversePath(first, last):
+
+	after_last = successor(last)
+	if after_last == first or first == last:
+		return
+
+	splitBefore(first)
+	splitBefore(after_last)
+
+	first_segment = segment_of[first]
+	last_segment = segment_of[last]
+
+	# Counts the segments of the path, up to half of them
+	num_path_segments = 1
+	segment = first_segment
+	while segment != last_segment and 2 * num_path_segments <= num_segments:
+		segment = segment_next[segment]
+		num_path_segments = num_path_segments + 1
+	# END WHILE
+
+	if segment == last_segment:
+		reverseSegments(first_segment, last_segment)
+	else:
+		reverseSegments(segment_of[after_last], segment_of[predecessor(first)])
+
+	if num_segments > max_segments:
+		build(toList(first))
+
+'''
+FUNCTION
+	reverseSegments
+DESCRIPTION:
+	Reverses the whole segments from first_segment to last_segment (going forward in the list of segments),
+	keeping the rest of the tour (which should not be empty) as it is.
+'''
+def reverseSegments(first_segment, last_segment):
+
+	before = segment_prev[first_segment]
+	after = segment_next[last_segment]
+
+	segments = [first_segment]
+	while segments[-1] != last_segment:
+		segments.append(segment_next[segments[-1]])
+	# END WHILE
+
+	segments.reverse()
+	for i in xrange(len(segments)):
+		segment = segments[i]
+		segment_reversed[segment] = not segment_reversed[segment]
+		if i > 0:
+			segment_prev[segment] = segments[i - 1]
+		if i + 1 < len(segments):
+			segment_next[segment] = segments[i + 1]
+	# END FOR
+
+	segment_next[before] = last_segment
+	segment_prev[last_segment] = before
+	segment_next[first_segment] = after
+	segment_prev[after] = first_segment
+
+'''
+FUNCTION
+	splitBefore
+DESCRIPTION:
+	Splits the segment of the vertex so that the vertex is the first of its segment in the order of the tour.
+	The smaller part goes to a new segment.
+'''
+def splitBefore(vertex):
+
+	global num_segments
+
+	segment = segment_of[vertex]
+	if vertex == firstOf(segment):
+		return
+
+	# The segment is cut between left_end and right_end, in its unreversed order
+	if segment_reversed[segment]:
+		left_end = vertex
+		right_end = node_next[vertex]
+	else:
+		left_end = node_prev[vertex]
+		right_end = vertex
+	# END IF
+
+	# Counts the vertices of the left part, up to half of the segment.
+	# If the left part is the bigger one, counts the right part instead.
+	left_size = 1
+	node = left_end
+	while node != segment_first[segment] and 2 * left_size < segment_size[segment]:
+		node = node_prev[node]
+		left_size = left_size + 1
+	# END WHILE
+	move_left = node == segment_first[segment]
+	if not move_left:
+		right_size = 1
+		node = right_end
+		while node != segment_last[segment]:
+			node = node_next[node]
+			right_size = right_size + 1
+		# END WHILE
+		left_size = segment_size[segment] - right_size
+	# END IF
+
+	new_segment = len(segment_first)
+	segment_reversed.append(segment_reversed[segment])
+	segment_next.append(-1)
+	segment_prev.append(-1)
+
+	if move_left:
+		segment_first.append(segment_first[segment])
+		segment_last.append(left_end)
+		segment_size.append(left_size)
+		segment_first[segment] = right_end
+		segment_size[segment] = segment_size[segment] - left_size
+		node = left_end
+		while node != -1:
+			segment_of[node] = new_segment
+			node = node_prev[node]
+		# END WHILE
+	else:
+		segment_first.append(right_end)
+		segment_last.append(segment_last[segment])
+		segment_size.append(segment_size[segment] - left_size)
+		segment_last[segment] = left_end
+		segment_size[segment] = left_size
+		node = right_end
+		while node != -1:
+			segment_of[node] = new_segment
+			node = node_next[node]
+		# END WHILE
+	# END IF
+
+	node_next[left_end] = -1
+	node_prev[right_end] = -1
+	num_segments = num_segments + 1
+
+	# The left part comes first in the tour, unless the segment is reversed
+	left_segment = segment_of[left_end]
+	right_segment = segment_of[right_end]
+	if segment_reversed[segment]:
+		first_segment, second_segment = right_segment, left_segment
+	else:
+		first_segment, second_segment = left_segment, right_segment
+	# END IF
+
+	if new_segment == first_segment:
+		before = segment_prev[second_segment]
+		segment_next[before] = first_segment
+		segment_prev[first_segment] = before
+	else:
+		after = segment_next[first_segment]
+		segment_prev[after] = second_segment
+		segment_next[second_segment] = after
+	# END IF
+	segment_next[first_segment] = second_segment
+	segment_prev[second_segment] = first_segment
@@ -0,0 +1,360 @@
+#!/usr/bin/env python2.7
+from __future__ import print_function
+import argparse
+import glob
+import json
+import multiprocessing
+import multiprocessing.queues
+import os
+import Queue
+import signal
+import sys
+import threading
+import time
+
+# A long-running process that solves many small instances with the brute force with prunning, so the
+# interpreter starts and the modules are imported once, instead of once per file with tsp.py.
+#
+# A job is a JSON object with:
+#   "id": echoed in its result (default: the path, or the number of the line or the name of the file of the job)
+#   the instance, one of:
+#     "path": the path to a TSPLIB file, with "cache": false to parse it instead of using its cache (see tsplib.readCachedInstance)
+#     "cities": [[x, y], ...], with "edge_weight_type" (default: EUC_2D, see tsplib.DISTANCE_KERNELS)
+#     "cost_matrix": [[...], ...]
+#   "bound": a name of solver.LOWER_BOUNDS (default: --bound)
+#   "time_limit": in seconds (default: --time-limit)
+# Its result is a JSON object with "id", "cost", "path", "leaves_visited", "time", "timed_out" and "lower_bound"
+# (see solver.SearchResult), or "id" and "error" if the job could not be solved.
+#
+# The jobs are read from stdin, one per line, and the results written to stdout as they end (in any order).
+# With --spool DIR, the jobs are the *.json (and *.tsp) files put in DIR, which is polled: a job is claimed by
+# moving it to DIR/processing/ and ends in DIR/done/ with its result, <file name>.result.json (a.json.result.json).
+
+SPOOL_PROCESSING_DIRECTORY = "processing"
+SPOOL_DONE_DIRECTORY = "done"
+RESULT_SUFFIX = ".result.json"
+
+# The longest the main process waits for the pool at once: a wait without a timeout cannot be interrupted by Ctrl+C
+# in Python 2
+WAIT_INTERVAL_IN_SECONDS = 0.1
+
+# In the processes of the pool of a spool: the queue of the (claimed file, process id) of the jobs they start,
+# so the main process knows which jobs are lost when a process dies (see serveSpool)
+startedJobs = None
+
+
+def initWorker(startedJobsQueue=None):
+    # Ctrl+C is handled by the main process, which terminates the pool (with SIGTERM, so the search must not handle it)
+    global startedJobs
+    import prunning
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    prunning.STOP_SIGNALS = []
+    startedJobs = startedJobsQueue
+
+
+def solveJob(task):
+    # Runs in a process of the pool: (job, defaults) -> its result
+    import solver
+
+    job, defaults = task
+    jobId = job.get("id")
+    try:
+        instance = jobInstance(job)
+        bound = job.get("bound", defaults["bound"])
+        if bound not in solver.LOWER_BOUNDS:
+            raise ValueError("unknown bound " + repr(bound))
+        timeLimit = float(job.get("time_limit", defaults["time_limit"]))
+        result = solver.Solver(bound, timeLimit, defaults["strategy"], defaults["warm_start"]).solve(instance)
+    except Exception as error:
+        return {"id": jobId, "error": "%s: %s" % (type(error).__name__, error)}
+
+    return {"id": jobId,
+            "cost": result.cost,
+            "path": result.path,
+            "leaves_visited": result.leaves_visited,
+            "time": result.time_in_seconds,
+            "timed_out": result.timed_out,
+            "lower_bound": result.lower_bound}
+
+
+def jobInstance(job):
+    # The instance of a job, as accepted by solver.Solver.solve
+    import tsplib
+
+    if "path" in job:
+        if job.get("cache", True):
+            return job["path"]
+        return tsplib.readInstance(job["path"])
+    if "cost_matrix" in job:
+        return job["cost_matrix"]
+    if "cities" in job:
+        edgeWeightType = str(job.get("edge_weight_type", "EUC_2D"))
+        if edgeWeightType not in tsplib.DISTANCE_KERNELS:
+            raise ValueError("EDGE_WEIGHT_TYPE " + edgeWeightType + " is not supported")
+        cities = [[i + 1, float(x), float(y)] for i, (x, y) in enumerate(job["cities"])]
+        return {"name": str(job.get("id")),
+                "dimension": len(cities),
+                "edgeWeightType": edgeWeightType,
+                "edgeWeightFormat": "FUNCTION",
+                "cities": cities,
+                "explicitWeights": None}
+    raise ValueError("the job has no path, cities or cost_matrix")
+
+
+def readStdinJobs():
+    # The jobs of stdin, one per line; a line that is not a job gets an error result
+    lineNumber = 0
+    for line in iter(sys.stdin.readline, ""):
+        lineNumber += 1
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("a job should be a JSON object")
+        except ValueError as error:
+            job = {"id": lineNumber, "invalid": str(error)}
+        job.setdefault("id", job.get("path", lineNumber))
+        yield job
+
+
+def claimSpoolJobs(spoolDirectory, maxJobs):
+    # Moves up to maxJobs files of the spool (the oldest first) to its processing directory.
+    # The move is atomic, so several workers can share a spool. Returns a list of (job, claimed file).
+    processingDirectory = os.path.join(spoolDirectory, SPOOL_PROCESSING_DIRECTORY)
+    filepaths = glob.glob(os.path.join(spoolDirectory, "*.json")) + glob.glob(os.path.join(spoolDirectory, "*.tsp"))
+    datedFilepaths = []
+    for filepath in filepaths:
+        try:
+            datedFilepaths.append((os.path.getmtime(filepath), filepath))
+        except OSError:
+            # Claimed by another worker since the glob
+            continue
+    datedFilepaths.sort()
+
+    claimed = []
+    for modificationTime, filepath in datedFilepaths[:maxJobs]:
+        claimedFilepath = os.path.join(processingDirectory, os.path.basename(filepath))
+        try:
+            os.rename(filepath, claimedFilepath)
+        except OSError:
+            # Claimed by another worker
+            continue
+
+        name = os.path.basename(filepath)
+        if filepath.endswith(".tsp"):
+            # Solved once, so not worth a cache
+            job = {"path": claimedFilepath, "cache": False}
+        else:
+            try:
+                job = json.load(open(claimedFilepath))
+                if not isinstance(job, dict):
+                    raise ValueError("a job should be a JSON object")
+            except (IOError, ValueError) as error:
+                job = {"invalid": str(error)}
+        job.setdefault("id", name)
+        claimed.append((job, claimedFilepath))
+    return claimed
+
+
+def finishSpoolJob(spoolDirectory, claimedFilepath, result):
+    # Writes the result next to the job in the done directory, then moves the job there.
+    # The result keeps the whole name of the file, so the results of a.json and a.tsp are not the same file.
+    doneDirectory = os.path.join(spoolDirectory, SPOOL_DONE_DIRECTORY)
+    name = os.path.basename(claimedFilepath)
+    resultFilepath = os.path.join(doneDirectory, name + RESULT_SUFFIX)
+    temporaryFilepath = resultFilepath + ".tmp"
+    resultFile = open(temporaryFilepath, "w")
+    json.dump(result, resultFile)
+    resultFile.close()
+    os.rename(temporaryFilepath, resultFilepath)
+    os.rename(claimedFilepath, os.path.join(doneDirectory, name))
+
+
+def writeResult(result):
+    sys.stdout.write(json.dumps(result) + "\n")
+    sys.stdout.flush()
+
+
+def serveStdin(pool, defaults):
+    # stdin is read by a thread of its own, which can be left waiting for a line when the worker stops:
+    # the pool takes its tasks in a thread that pool.terminate waits for, so they must not wait for stdin
+    jobs = Queue.Queue()
+    stopped = threading.Event()
+    reader = threading.Thread(target=readStdinJobsInto, args=(jobs,))
+    reader.daemon = True
+    reader.start()
+
+    def tasks():
+        while not stopped.is_set():
+            try:
+                job = jobs.get(True, WAIT_INTERVAL_IN_SECONDS)
+            except Queue.Empty:
+                continue
+            if job is None:
+                return
+            yield (job, defaults)
+
+    results = pool.imap_unordered(solveTask, tasks())
+    try:
+        while True:
+            try:
+                result = results.next(WAIT_INTERVAL_IN_SECONDS)
+            except multiprocessing.TimeoutError:
+                continue
+            except StopIteration:
+                return
+            writeResult(result)
+    finally:
+        stopped.set()
+
+
+def readStdinJobsInto(jobs):
+    # The jobs of stdin, then None
+    for job in readStdinJobs():
+        jobs.put(job)
+    jobs.put(None)
+
+
+def serveSpool(pool, startedJobsQueue, defaults, spoolDirectory, numProcesses, pollInterval, once):
+    # The pool should be made with initWorker(startedJobsQueue), a multiprocessing.queues.SimpleQueue
+    for directory in (SPOOL_PROCESSING_DIRECTORY, SPOOL_DONE_DIRECTORY):
+        if not os.path.isdir(os.path.join(spoolDirectory, directory)):
+            os.makedirs(os.path.join(spoolDirectory, directory))
+
+    # A few jobs per process, so the pool is kept busy without claiming jobs other workers could take.
+    # A new job is claimed as soon as one ends, so a long job does not hold back the others.
+    maxPendingJobs = 2 * numProcesses
+    pendingJobs = []
+    processOfJob = {}
+    while True:
+        if len(pendingJobs) < maxPendingJobs:
+            for job, claimedFilepath in claimSpoolJobs(spoolDirectory, maxPendingJobs - len(pendingJobs)):
+                asyncResult = pool.apply_async(solveSpoolTask, ((job, defaults), claimedFilepath))
+                pendingJobs.append((claimedFilepath, job.get("id"), asyncResult))
+
+        if len(pendingJobs) == 0:
+            if once:
+                return
+            time.sleep(pollInterval)
+            continue
+
+        while not startedJobsQueue.empty():
+            claimedFilepath, processId = startedJobsQueue.get()
+            processOfJob[claimedFilepath] = processId
+
+        finishedJobs = [pendingJob for pendingJob in pendingJobs if isJobFinished(pendingJob, processOfJob)]
+        if len(finishedJobs) == 0:
+            # A short wait, so Ctrl+C is noticed and the spool is polled while the jobs run
+            time.sleep(WAIT_INTERVAL_IN_SECONDS)
+            continue
+
+        for pendingJob in finishedJobs:
+            claimedFilepath, jobId, asyncResult = pendingJob
+            pendingJobs.remove(pendingJob)
+            processOfJob.pop(claimedFilepath, None)
+            result = spoolJobResult(jobId, asyncResult)
+            finishSpoolJob(spoolDirectory, claimedFilepath, result)
+            writeResult(result)
+
+
+def isJobFinished(pendingJob, processOfJob):
+    # True if the job of the spool has its result, or if the process that was solving it has died (killed, out of
+    # memory...): the pool replaces the process, but the job is lost and its result would never come
+    claimedFilepath, jobId, asyncResult = pendingJob
+    if asyncResult.ready():
+        return True
+    processId = processOfJob.get(claimedFilepath)
+    if processId is None:
+        return False
+    try:
+        # The pool reaps its processes that ended, so a dead one has no process id anymore
+        os.kill(processId, 0)
+    except OSError:
+        # The result of a job the process finished right before dying may still be on its way
+        asyncResult.wait(WAIT_INTERVAL_IN_SECONDS)
+        return True
+    return False
+
+
+def spoolJobResult(jobId, asyncResult):
+    # The result of a finished job of the spool (see isJobFinished)
+    if not asyncResult.ready():
+        return {"id": jobId, "error": "the process solving the job died"}
+    try:
+        return asyncResult.get(0)
+    except Exception as error:
+        return {"id": jobId, "error": "%s: %s" % (type(error).__name__, error)}
+
+
+def solveSpoolTask(task, claimedFilepath):
+    # Runs in a process of the pool: tells the main process which process solves the job, then solves it
+    startedJobs.put((claimedFilepath, os.getpid()))
+    return solveTask(task)
+
+
+def solveTask(task):
+    # A job that could not be read gets its error as result
+    job, defaults = task
+    if "invalid" in job:
+        return {"id": job.get("id"), "error": "invalid job: " + job["invalid"]}
+    return solveJob(task)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solves the jobs of stdin (JSON lines) or of a spool directory, "
+                                                 "writing their results to stdout as JSON lines")
+    parser.add_argument("--spool", metavar="DIR",
+                        help="poll DIR for job files instead of reading stdin")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="seconds between two polls of the spool when it is empty (default: %(default)s)")
+    parser.add_argument("--once", action="store_true",
+                        help="exit when the spool is empty, instead of polling it")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="number of jobs solved at once (default: %(default)s)")
+    parser.add_argument("--bound", default="sumMinEdges",
+                        help="default lower bound of the jobs, a name of solver.LOWER_BOUNDS (default: %(default)s)")
+    parser.add_argument("--time-limit", type=float, default=60.0,
+                        help="default seconds each job is searched (default: %(default)s)")
+    parser.add_argument("--strategy", default="depth-first",
+                        help="order in which the permutation tree is searched (default: %(default)s)")
+    parser.add_argument("--no-warm-start", action="store_true",
+                        help="do not start the searches with the tour of the 2-opt/Or-opt heuristic")
+    args = parser.parse_args()
+
+    # Imported once here, after the arguments are checked: the processes of the pool are forked
+    # from this one, so they start with the modules loaded
+    import solver
+    import prunning
+
+    if args.bound not in solver.LOWER_BOUNDS:
+        parser.error("unknown bound %s (choose from %s)" % (args.bound, ", ".join(sorted(solver.LOWER_BOUNDS))))
+    if args.strategy not in prunning.SEARCH_STRATEGIES:
+        parser.error("unknown strategy %s (choose from %s)" % (args.strategy, ", ".join(sorted(prunning.SEARCH_STRATEGIES))))
+    if args.processes < 1:
+        parser.error("--processes should be at least 1")
+
+    defaults = {"bound": args.bound,
+                "time_limit": args.time_limit,
+                "strategy": args.strategy,
+                "warm_start": not args.no_warm_start}
+
+    startedJobsQueue = multiprocessing.queues.SimpleQueue()
+    pool = multiprocessing.Pool(args.processes, initWorker, (startedJobsQueue,))
+    try:
+        if args.spool:
+            serveSpool(pool, startedJobsQueue, defaults, args.spool, args.processes, args.poll_interval, args.once)
+        else:
+            serveStdin(pool, defaults)
+        pool.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+if __name__ == "__main__":
+    main()